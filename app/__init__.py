@@ -2,6 +2,8 @@ from flask import Flask, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
+from app.json_provider import OrjsonProvider, orjson
+from app.compression import init_compression
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -13,12 +15,15 @@ def create_app(config=None):
     # Initialize Flask with explicit static folder
     static_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
     app = Flask(__name__, static_folder=static_folder, static_url_path='')
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
     
     # Default configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev_key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'postgresql://bot_admin:wewffikp@db:5432/telegram_bot_db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 24 * 3600  # 24 hours
+    app.config['API_KEY_SECRET'] = os.getenv('API_KEY_SECRET', app.config['SECRET_KEY'])
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching for development
 
     if config:
@@ -28,6 +33,7 @@ def create_app(config=None):
     db.init_app(app)
     migrate.init_app(app, db)
     CORS(app)
+    init_compression(app)
 
     # Set up logging
     if not os.path.exists('logs'):
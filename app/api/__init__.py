@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('api', __name__)
 
-from app.api import auth, bots, advertisements, analytics
\ No newline at end of file
+from app.api import auth, bots, advertisements, analytics, media, users, search, batch
\ No newline at end of file
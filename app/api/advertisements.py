@@ -6,12 +6,28 @@ from app.models.bot import Bot
 from app import db
 from datetime import datetime
 from app.tasks.ad_tasks import broadcast_advertisement as broadcast_task
+from app.services.pagination_service import pagination_service
+from app.services.etag_service import etag_service
 
 @bp.route('/advertisements', methods=['GET'])
 @token_required
+@etag_service.conditional(
+    lambda current_user: etag_service.row_version(Advertisement, Advertisement.user_id == current_user.id)
+)
 def get_advertisements(current_user):
-    ads = Advertisement.query.filter_by(user_id=current_user.id).order_by(Advertisement.created_at.desc()).all()
-    return jsonify([ad.to_dict() for ad in ads])
+    try:
+        page = pagination_service.paginate(
+            Advertisement.query.filter_by(user_id=current_user.id),
+            (Advertisement.created_at, Advertisement.id),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', pagination_service.MAX_LIMIT, type=int),
+            descending=True,
+            total=request.args.get('total')
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    page['advertisements'] = [ad.to_dict() for ad in page.pop('items')]
+    return jsonify(page)
 
 @bp.route('/advertisements', methods=['POST'])
 @token_required
@@ -117,7 +133,7 @@ def get_advertisement_status(current_user, ad_id):
     # Get broadcast metrics if available
     metrics = None
     if ad.status in ['broadcasting', 'completed', 'partially_completed']:
-        metrics = get_broadcast_metrics(ad.id)
+        metrics = get_broadcast_metrics(ad.id, since=ad.created_at)
 
     return jsonify({
         'status': ad.status,
@@ -126,14 +142,18 @@ def get_advertisement_status(current_user, ad_id):
         'completed_at': ad.completed_at.isoformat() if ad.completed_at else None
     })
 
-def get_broadcast_metrics(ad_id):
+def get_broadcast_metrics(ad_id, since=None):
     """Get aggregated metrics for an advertisement broadcast"""
     from app.models.analytics import Analytics
     
-    metrics = Analytics.query.filter(
+    query = Analytics.query.filter(
         Analytics.metric_type == 'broadcast_metrics',
-        Analytics.metric_value['ad_id'].astext.cast(db.Integer) == ad_id
-    ).all()
+        Analytics.ad_id == ad_id
+    )
+    if since:
+        # Broadcast rows are never older than the ad; lets Postgres prune partitions
+        query = query.filter(Analytics.timestamp >= since)
+    metrics = query.all()
 
     if not metrics:
         return None
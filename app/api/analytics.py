@@ -1,105 +1,55 @@
-from flask import jsonify, request, current_app, send_file
+from flask import jsonify, request, current_app, send_file, redirect, Response, stream_with_context
 from app.api import bp
 from app.api.auth import token_required
 from app.models.analytics import Analytics
 from app.models.bot import Bot
 from app.models.advertisement import Advertisement
 from app.services.analytics_service import analytics_service
+from app.services.cache_service import cache_service
+from app.services.cohort_service import cohort_service
+from app.services.etag_service import etag_service
+from app.services.media_service import media_service
+from app.tasks.analytics_tasks import submit_export, get_export_status, get_export_file
 from app import db
 from datetime import datetime, timedelta
-import io
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
 
 @bp.route('/analytics/dashboard', methods=['GET'])
 @token_required
+@etag_service.conditional(
+    lambda current_user: analytics_service.get_dashboard_version(current_user.id)
+)
 def get_dashboard_metrics(current_user):
     try:
-        # Get time range
         time_range = request.args.get('range', '24h')
-        if time_range == '7d':
-            since = datetime.utcnow() - timedelta(days=7)
-        elif time_range == '30d':
-            since = datetime.utcnow() - timedelta(days=30)
-        else:  # 24h default
-            since = datetime.utcnow() - timedelta(hours=24)
-
-        # Get user's bots
-        bots = Bot.query.filter_by(user_id=current_user.id).all()
-        bot_ids = [bot.id for bot in bots]
-
-        # Get metrics
-        metrics = Analytics.query.filter(
-            Analytics.bot_id.in_(bot_ids),
-            Analytics.timestamp >= since
-        ).order_by(Analytics.timestamp.desc()).all()
-
-        # Aggregate metrics
-        aggregated = {
-            'total_users': 0,
-            'total_messages': 0,
-            'active_bots': len([bot for bot in bots if bot.status == 'running']),
-            'total_bots': len(bots),
-            'metrics_by_bot': {},
-            'message_types': {},
-            'user_activity': [],
-            'bot_performance': []
-        }
-
-        for metric in metrics:
-            if metric.metric_type == 'users':
-                aggregated['total_users'] += metric.metric_value.get('count', 0)
-            elif metric.metric_type == 'messages':
-                aggregated['total_messages'] += metric.metric_value.get('count', 0)
-                # Aggregate message types
-                for msg_type, count in metric.metric_value.get('types', {}).items():
-                    aggregated['message_types'][msg_type] = (
-                        aggregated['message_types'].get(msg_type, 0) + count
-                    )
-
-            # Group metrics by bot
-            if metric.bot_id not in aggregated['metrics_by_bot']:
-                bot = next((b for b in bots if b.id == metric.bot_id), None)
-                if bot:
-                    aggregated['metrics_by_bot'][metric.bot_id] = {
-                        'id': bot.id,
-                        'name': bot.bot_name,
-                        'metrics': []
-                    }
-            if metric.bot_id in aggregated['metrics_by_bot']:
-                aggregated['metrics_by_bot'][metric.bot_id]['metrics'].append(metric.to_dict())
-
-        # Format for charts
-        for bot_id, data in aggregated['metrics_by_bot'].items():
-            bot_metrics = {
-                'id': data['id'],
-                'name': data['name'],
-                'users': 0,
-                'messages': 0,
-                'success_rate': 0
-            }
-            for metric in data['metrics']:
-                if metric['metric_type'] == 'users':
-                    bot_metrics['users'] += metric['metric_value'].get('count', 0)
-                elif metric['metric_type'] == 'messages':
-                    bot_metrics['messages'] += metric['metric_value'].get('count', 0)
-            
-            if bot_metrics['messages'] > 0:
-                bot_metrics['success_rate'] = (
-                    (bot_metrics['messages'] - metric['metric_value'].get('failed', 0))
-                    / bot_metrics['messages'] * 100
-                )
-            
-            aggregated['bot_performance'].append(bot_metrics)
-
-        return jsonify(aggregated)
+        if time_range not in analytics_service.DASHBOARD_RANGES:
+            time_range = '24h'
+
+        metrics = analytics_service.get_dashboard_metrics(current_user.id, time_range)
+        return jsonify(metrics)
     except Exception as e:
         logger.error(f'Error getting dashboard metrics: {str(e)}')
         return jsonify({'message': 'Failed to get dashboard metrics'}), 500
 
+@bp.route('/analytics/cache/stats', methods=['GET'])
+@token_required
+def get_cache_stats(current_user):
+    """Get cache hit/miss counters for this worker (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    return jsonify(cache_service.get_stats())
+
 @bp.route('/analytics/bots/<int:bot_id>', methods=['GET'])
 @token_required
+@etag_service.conditional(
+    lambda current_user, bot_id: analytics_service.get_bot_metrics_version(
+        bot_id, current_user.id, open_ended=not request.args.get('end_date')
+    )
+)
 def get_bot_analytics(current_user, bot_id):
     try:
         bot = Bot.query.filter_by(id=bot_id, user_id=current_user.id).first()
@@ -114,7 +64,9 @@ def get_bot_analytics(current_user, bot_id):
         if end_date:
             end_date = datetime.fromisoformat(end_date)
 
-        metrics = analytics_service.get_bot_metrics(bot_id, start_date, end_date)
+        max_points = request.args.get('max_points', analytics_service.DEFAULT_MAX_POINTS, type=int)
+
+        metrics = analytics_service.get_bot_metrics(bot_id, start_date, end_date, max_points=max_points)
         return jsonify(metrics)
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
@@ -122,6 +74,26 @@ def get_bot_analytics(current_user, bot_id):
         logger.error(f'Error getting bot analytics: {str(e)}')
         return jsonify({'message': 'Failed to get bot analytics'}), 500
 
+@bp.route('/analytics/bots/<int:bot_id>/retention', methods=['GET'])
+@token_required
+@etag_service.conditional(
+    lambda current_user, bot_id: cohort_service.get_retention_version(bot_id, current_user.id)
+)
+def get_bot_retention(current_user, bot_id):
+    """Get weekly subscriber retention cohorts for a bot"""
+    try:
+        bot = Bot.query.filter_by(id=bot_id, user_id=current_user.id).first()
+        if not bot:
+            return jsonify({'message': 'Bot not found!'}), 404
+
+        weeks = request.args.get('weeks', cohort_service.DEFAULT_WEEKS, type=int)
+        return jsonify(cohort_service.get_retention(bot_id, weeks))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f'Error getting bot retention: {str(e)}')
+        return jsonify({'message': 'Failed to get bot retention'}), 500
+
 @bp.route('/analytics/bots/<int:bot_id>/export', methods=['GET'])
 @token_required
 def export_bot_analytics(current_user, bot_id):
@@ -140,46 +112,123 @@ def export_bot_analytics(current_user, bot_id):
         if end_date:
             end_date = datetime.fromisoformat(end_date)
 
-        # Get export data
-        export_data = analytics_service.export_bot_analytics(
-            bot_id,
-            format=format,
-            start_date=start_date,
-            end_date=end_date
-        )
-
-        # Prepare response
-        if format == 'json':
-            return jsonify(export_data)
-        else:
-            # Create in-memory file
-            file_data = io.BytesIO()
-            if format == 'csv':
-                file_data.write(export_data.encode('utf-8'))
-                mimetype = 'text/csv'
-                extension = 'csv'
-            else:  # excel
-                file_data.write(export_data)
-                mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                extension = 'xlsx'
+        if format == 'csv':
+            # Stream CSV so memory stays flat however many messages are exported
+            filename = f'bot_{bot_id}_analytics_{datetime.now().strftime("%Y%m%d")}.csv'
+            return Response(
+                stream_with_context(analytics_service.stream_bot_analytics_csv(
+                    bot_id,
+                    start_date=start_date,
+                    end_date=end_date
+                )),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
 
+        if format in analytics_service.STREAMING_EXPORT_FORMATS:
+            # Spooled to disk so large exports never sit in worker memory
+            file_data = tempfile.TemporaryFile()
+            analytics_service.export_bot_analytics(
+                bot_id,
+                format=format,
+                start_date=start_date,
+                end_date=end_date,
+                output=file_data
+            )
             file_data.seek(0)
+            extension, mimetype = analytics_service.EXPORT_FILE_TYPES[format]
             filename = f'bot_{bot_id}_analytics_{datetime.now().strftime("%Y%m%d")}.{extension}'
-            
             return send_file(
                 file_data,
                 mimetype=mimetype,
                 as_attachment=True,
                 download_name=filename
             )
+
+        # Get export data
+        export_data = analytics_service.export_bot_analytics(
+            bot_id,
+            format=format,
+            start_date=start_date,
+            end_date=end_date
+        )
+
+        return jsonify(export_data)
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
     except Exception as e:
         logger.error(f'Error exporting bot analytics: {str(e)}')
         return jsonify({'message': 'Failed to export analytics'}), 500
 
+@bp.route('/analytics/bots/<int:bot_id>/export', methods=['POST'])
+@token_required
+def submit_bot_analytics_export(current_user, bot_id):
+    """Start a background export job"""
+    try:
+        bot = Bot.query.filter_by(id=bot_id, user_id=current_user.id).first()
+        if not bot:
+            return jsonify({'message': 'Bot not found!'}), 404
+
+        data = request.get_json(silent=True) or {}
+        format = data.get('format', 'csv')
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+
+        if start_date:
+            start_date = datetime.fromisoformat(start_date)
+        if end_date:
+            end_date = datetime.fromisoformat(end_date)
+
+        job_id = submit_export(current_user.id, bot_id, format, start_date, end_date)
+        return jsonify(get_export_status(current_user.id, job_id)), 202
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f'Error submitting analytics export: {str(e)}')
+        return jsonify({'message': 'Failed to start export'}), 500
+
+@bp.route('/analytics/exports/<job_id>', methods=['GET'])
+@token_required
+def get_analytics_export(current_user, job_id):
+    """Get export job progress and, once finished, its download URL"""
+    try:
+        status = get_export_status(current_user.id, job_id)
+        if not status:
+            return jsonify({'message': 'Export not found!'}), 404
+        return jsonify(status)
+    except Exception as e:
+        logger.error(f'Error getting analytics export: {str(e)}')
+        return jsonify({'message': 'Failed to get export status'}), 500
+
+@bp.route('/analytics/exports/<job_id>/file', methods=['GET'])
+@token_required
+def get_analytics_export_file(current_user, job_id):
+    """Download a finished export"""
+    try:
+        job = get_export_file(current_user.id, job_id)
+        if not job:
+            return jsonify({'message': 'Export not found!'}), 404
+
+        url = media_service.get_export_url(job['storage_key'])
+        if url:
+            return redirect(url)
+        return send_file(
+            media_service.get_export_path(job['storage_key']),
+            mimetype=job['mime_type'],
+            as_attachment=True,
+            download_name=job['filename']
+        )
+    except FileNotFoundError:
+        return jsonify({'message': 'Export not found!'}), 404
+    except Exception as e:
+        logger.error(f'Error downloading analytics export: {str(e)}')
+        return jsonify({'message': 'Failed to download export'}), 500
+
 @bp.route('/analytics/advertisements/<int:ad_id>', methods=['GET'])
 @token_required
+@etag_service.conditional(
+    lambda current_user, ad_id: analytics_service.get_advertisement_metrics_version(ad_id, current_user.id)
+)
 def get_advertisement_analytics(current_user, ad_id):
     try:
         # Verify advertisement ownership
@@ -187,8 +236,16 @@ def get_advertisement_analytics(current_user, ad_id):
         if not ad:
             return jsonify({'message': 'Advertisement not found!'}), 404
 
-        metrics = analytics_service.get_advertisement_metrics(ad_id)
+        max_points = request.args.get('max_points', analytics_service.DEFAULT_MAX_POINTS, type=int)
+
+        metrics = analytics_service.get_advertisement_metrics(
+            ad_id,
+            since=ad.created_at,
+            max_points=max_points
+        )
         return jsonify(metrics)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         logger.error(f'Error getting advertisement analytics: {str(e)}')
         return jsonify({'message': 'Failed to get advertisement analytics'}), 500
\ No newline at end of file
@@ -1,6 +1,8 @@
-from flask import jsonify, request
+from flask import jsonify, request, g
 from app.api import bp
 from app.models.user import User
+from app.services.principal_cache_service import principal_cache_service
+from app.services.activity_tracker_service import activity_tracker_service
 from app import db
 import jwt
 import datetime
@@ -12,6 +14,20 @@ def token_required(f):
     def decorated(*args, **kwargs):
         token = None
 
+        # Sub-requests of /batch run as the user the batch authenticated
+        batch_user = g.get('batch_user')
+        if batch_user is not None:
+            return f(batch_user, *args, **kwargs)
+
+        # Machine clients authenticate with an API key instead of a JWT
+        api_key = request.headers.get('x-api-key')
+        if api_key:
+            current_user = principal_cache_service.get_api_key_user(api_key)
+            if not current_user:
+                return jsonify({'message': 'API key is invalid!'}), 401
+            activity_tracker_service.touch_user(current_user.id)
+            return f(current_user, *args, **kwargs)
+
         if 'x-access-token' in request.headers:
             token = request.headers['x-access-token']
 
@@ -20,10 +36,12 @@ def token_required(f):
 
         try:
             data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.filter_by(public_id=data['public_id']).first()
+            current_user = principal_cache_service.get_user(data['public_id'])
         except:
             return jsonify({'message': 'Token is invalid!'}), 401
 
+        if current_user:
+            activity_tracker_service.touch_user(current_user.id)
         return f(current_user, *args, **kwargs)
 
     return decorated
@@ -0,0 +1,155 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request, current_app, g
+from werkzeug.test import EnvironBuilder
+
+from app.api import bp
+from app.api.auth import token_required
+from app.services.principal_cache_service import principal_cache_service
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 25))
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+# Reads may run concurrently; everything else runs alone, in order
+CONCURRENT_METHODS = ('GET',)
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('BATCH_WORKERS', 4)),
+    thread_name_prefix='batch'
+)
+
+@bp.route('/batch', methods=['POST'])
+@token_required
+def batch(current_user):
+    """Run several API requests in one round trip.
+
+    Takes {"requests": [{"method", "path", "body", "headers", "id"}]} with
+    paths relative to the API root, and returns their responses in the
+    same order. All sub-requests run as the caller without
+    re-authenticating. Consecutive GETs run concurrently; any other method
+    waits for the requests before it and runs alone, so writes and the
+    reads after them stay in order.
+    """
+    if current_user is None:
+        return jsonify({'message': 'Token is invalid!'}), 401
+
+    try:
+        items = _validate_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    app = current_app._get_current_object()
+    prefix = request.path[:-len('/batch')]
+    environ_base = {'REMOTE_ADDR': request.remote_addr}
+    public_id = current_user.public_id
+
+    responses = [None] * len(items)
+    reads = []
+
+    def run_reads():
+        if len(reads) == 1:
+            responses[reads[0]] = _dispatch(app, prefix, environ_base, items[reads[0]])
+        else:
+            futures = {
+                index: executor.submit(_dispatch_concurrently, app, public_id, prefix, environ_base, items[index])
+                for index in reads
+            }
+            for index, future in futures.items():
+                responses[index] = future.result()
+        reads.clear()
+
+    # Requests share the app context when one is already pushed, so the
+    # user must not outlive the batch
+    g.batch_user = current_user
+    try:
+        for index, item in enumerate(items):
+            if item['method'] in CONCURRENT_METHODS:
+                reads.append(index)
+                continue
+            if reads:
+                run_reads()
+            responses[index] = _dispatch(app, prefix, environ_base, item)
+        if reads:
+            run_reads()
+    finally:
+        g.pop('batch_user', None)
+
+    return jsonify({'responses': responses})
+
+def _validate_batch(data):
+    """Get the normalized sub-requests of a batch, or raise ValueError"""
+    if not isinstance(data, dict) or not isinstance(data.get('requests'), list):
+        raise ValueError('Expected {"requests": [...]}')
+    items = data['requests']
+    if not 1 <= len(items) <= MAX_BATCH_REQUESTS:
+        raise ValueError(f'A batch takes between 1 and {MAX_BATCH_REQUESTS} requests')
+
+    normalized = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f'Request {position} must be an object')
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in BATCH_METHODS:
+            raise ValueError(f'Request {position}: method must be one of: {", ".join(BATCH_METHODS)}')
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise ValueError(f'Request {position}: path must start with /')
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise ValueError(f'Request {position}: headers must be an object')
+        normalized.append({
+            'id': item.get('id'),
+            'method': method,
+            'path': path,
+            'body': item.get('body'),
+            'headers': headers
+        })
+    return normalized
+
+def _dispatch_concurrently(app, public_id, prefix, environ_base, item):
+    """Run a read in an app context (and session) of its own"""
+    with app.app_context():
+        # Attached from the principal cache the batch just filled
+        g.batch_user = principal_cache_service.get_user(public_id)
+        return _dispatch(app, prefix, environ_base, item)
+
+def _dispatch(app, prefix, environ_base, item):
+    """Run one sub-request through the app and describe its response"""
+    result = {'id': item['id']} if item['id'] is not None else {}
+    builder = EnvironBuilder(
+        path=prefix + item['path'],
+        method=item['method'],
+        # Bodies are decoded here, so sub-responses must not be compressed
+        headers={
+            name: value for name, value in item['headers'].items()
+            if name.lower() != 'accept-encoding'
+        },
+        json=item['body'],
+        environ_base=environ_base
+    )
+    try:
+        with app.request_context(builder.get_environ()):
+            if request.routing_exception is not None:
+                result.update(status=request.routing_exception.code, body=None)
+                return result
+            if request.blueprint != 'api' or request.endpoint == 'api.batch':
+                result.update(status=404, body=None)
+                return result
+
+            response = app.full_dispatch_request()
+            result.update(
+                status=response.status_code,
+                body=response.get_json(silent=True) if response.is_json else None
+            )
+            if response.headers.get('ETag'):
+                result['etag'] = response.headers['ETag']
+            return result
+    except Exception as e:
+        logger.error(f'Error in batch request {item["method"]} {item["path"]}: {str(e)}')
+        result.update(status=500, body={'message': 'Request failed'})
+        return result
+    finally:
+        builder.close()
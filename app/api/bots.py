@@ -5,15 +5,31 @@ from app.models.bot import Bot
 from app.models.analytics import Analytics
 from app import db
 from app.services.bot_manager import BotManager
+from app.services.analytics_service import analytics_service
+from app.services.pagination_service import pagination_service
+from app.services.etag_service import etag_service
 import subprocess
 
 bot_manager = BotManager()
 
 @bp.route('/bots', methods=['GET'])
 @token_required
+@etag_service.conditional(
+    lambda current_user: etag_service.row_version(Bot, Bot.user_id == current_user.id)
+)
 def get_bots(current_user):
-    bots = Bot.query.filter_by(user_id=current_user.id).all()
-    return jsonify([bot.to_dict() for bot in bots])
+    try:
+        page = pagination_service.paginate(
+            Bot.query.filter_by(user_id=current_user.id),
+            (Bot.id,),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', pagination_service.MAX_LIMIT, type=int),
+            total=request.args.get('total')
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    page['bots'] = [bot.to_dict() for bot in page.pop('items')]
+    return jsonify(page)
 
 @bp.route('/bots', methods=['POST'])
 @token_required
@@ -34,6 +50,7 @@ def add_bot(current_user):
     
     db.session.add(new_bot)
     db.session.commit()
+    analytics_service.invalidate_dashboard(current_user.id)
 
     # Create supervisor config for the bot
     try:
@@ -57,6 +74,7 @@ def start_bot(current_user, bot_id):
     try:
         bot_manager.start_bot(bot)
         bot.update_status('running')
+        analytics_service.invalidate_dashboard(current_user.id)
     except Exception as e:
         current_app.logger.error(f'Failed to start bot: {str(e)}')
         return jsonify({'message': 'Failed to start bot!'}), 500
@@ -73,6 +91,7 @@ def stop_bot(current_user, bot_id):
     try:
         bot_manager.stop_bot(bot)
         bot.update_status('stopped')
+        analytics_service.invalidate_dashboard(current_user.id)
     except Exception as e:
         current_app.logger.error(f'Failed to stop bot: {str(e)}')
         return jsonify({'message': 'Failed to stop bot!'}), 500
@@ -89,6 +108,7 @@ def restart_bot(current_user, bot_id):
     try:
         bot_manager.restart_bot(bot)
         bot.update_status('running')
+        analytics_service.invalidate_dashboard(current_user.id)
     except Exception as e:
         current_app.logger.error(f'Failed to restart bot: {str(e)}')
         return jsonify({'message': 'Failed to restart bot!'}), 500
@@ -4,6 +4,10 @@ from app.api.auth import token_required
 from app.services.media_service import media_service
 import os
 
+def _can_access(current_user, key):
+    """Check current_user uploaded key, or is an admin"""
+    return current_user.role == 'admin' or media_service.get_owner_id(key) == current_user.id
+
 @bp.route('/media/upload', methods=['POST'])
 @token_required
 def upload_media(current_user):
@@ -16,7 +20,7 @@ def upload_media(current_user):
         return jsonify({'message': 'No file selected'}), 400
 
     try:
-        url, media_type, mime_type = media_service.save_file(file, file.filename)
+        url, media_type, mime_type = media_service.save_file(file, file.filename, current_user.id)
         return jsonify({
             'url': url,
             'media_type': media_type,
@@ -32,10 +36,13 @@ def upload_media(current_user):
 @bp.route('/media/<path:filename>')
 @token_required
 def serve_media(current_user, filename):
-    """Serve media files in development"""
-    if os.getenv('STORAGE_TYPE') != 'local':
+    """Serve locally stored media files to their owner"""
+    if media_service.storage_type != 'local':
         return jsonify({'message': 'Not available in production'}), 404
-    
+    # Exports are only served through their job, see get_analytics_export_file
+    if not _can_access(current_user, filename):
+        return jsonify({'message': 'File not found'}), 404
+
     try:
         return send_from_directory(
             os.path.join(current_app.root_path, 'uploads'),
@@ -53,6 +60,10 @@ def delete_media(current_user):
     if not url:
         return jsonify({'message': 'URL is required'}), 400
 
+    key = media_service.get_key(url)
+    if key is not None and not _can_access(current_user, key):
+        return jsonify({'message': 'File not found'}), 404
+
     try:
         if media_service.delete_file(url):
             return jsonify({'message': 'File deleted successfully'})
@@ -0,0 +1,37 @@
+from flask import jsonify, request, current_app
+from sqlalchemy.orm import selectinload
+from app.api import bp
+from app.api.auth import token_required
+from app.models.user import User
+from app.services.pagination_service import pagination_service
+from app.services.search_service import search_service
+
+@bp.route('/search/<kind>', methods=['GET'])
+@token_required
+def search(current_user, kind):
+    """Search users (admin only), bots or advertisements, best matches first"""
+    if kind == 'users' and current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    try:
+        page = search_service.search(
+            kind,
+            request.args.get('q', ''),
+            owner_id=current_user.id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', pagination_service.DEFAULT_LIMIT, type=int),
+            total=request.args.get('total'),
+            options=(selectinload(User.settings),) if kind == 'users' else ()
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f'Error searching {kind}: {str(e)}')
+        return jsonify({'message': 'Search failed'}), 500
+
+    items = page.pop('items')
+    results = User.to_dict_many(items) if kind == 'users' else [item.to_dict() for item in items]
+    for result, item in zip(results, items):
+        result['rank'] = item.search_rank
+    page['results'] = results
+    return jsonify(page)
@@ -1,13 +1,18 @@
 from flask import jsonify, request, current_app
 from app.api import bp
 from app.api.auth import token_required
-from app.models.user import User
+from app.models.user import User, UserSettings
+from app.services.principal_cache_service import principal_cache_service
+from app.services.pagination_service import pagination_service
+from app.services.search_service import search_service
+from app.services.etag_service import etag_service
 from app import db
 from datetime import datetime
+from sqlalchemy.orm import selectinload
 
 @bp.route('/users/me', methods=['GET'])
 @token_required
-def get_current_user(current_user):
+def get_current_user_profile(current_user):
     """Get current user profile"""
     return jsonify(current_user.to_dict())
 
@@ -29,6 +34,7 @@ def update_current_user(current_user):
 
     try:
         db.session.commit()
+        principal_cache_service.invalidate(current_user.public_id)
         return jsonify({
             'message': 'Profile updated successfully',
             'user': current_user.to_dict()
@@ -66,7 +72,8 @@ def create_api_key(current_user):
 def delete_api_key(current_user, key_id):
     """Delete API key"""
     try:
-        current_user.delete_api_key(key_id)
+        prefix = current_user.delete_api_key(key_id)
+        principal_cache_service.invalidate_api_key(prefix)
         return jsonify({'message': 'API key deleted successfully'})
     except ValueError as e:
         return jsonify({'message': str(e)}), 404
@@ -77,19 +84,25 @@ def delete_api_key(current_user, key_id):
 @bp.route('/users/me/activity', methods=['GET'])
 @token_required
 def get_activity_log(current_user):
-    """Get user activity log"""
+    """Get user activity log, newest first; pass next_cursor to get the next page"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        activities = current_user.get_activity_log(page, per_page)
+        activities = current_user.get_activity_log(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', pagination_service.DEFAULT_LIMIT, type=int),
+            total=request.args.get('total')
+        )
         return jsonify(activities)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f'Error getting activity log: {str(e)}')
         return jsonify({'message': 'Failed to get activity log'}), 500
 
 @bp.route('/users/me/settings', methods=['GET'])
 @token_required
+@etag_service.conditional(
+    lambda current_user: etag_service.row_version(UserSettings, UserSettings.user_id == current_user.id)
+)
 def get_user_settings(current_user):
     """Get user settings"""
     return jsonify(current_user.get_settings())
@@ -116,28 +129,38 @@ def update_user_settings(current_user):
 @bp.route('/users', methods=['GET'])
 @token_required
 def get_users(current_user):
-    """Get all users (admin only)"""
+    """Get all users, or those matching search best first (admin only)"""
     if current_user.role != 'admin':
         return jsonify({'message': 'Unauthorized'}), 403
 
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        search = request.args.get('search', '')
-
-        query = User.query
-        if search:
-            query = query.filter(User.username.ilike(f'%{search}%'))
-
-        pagination = query.paginate(page=page, per_page=per_page)
-        users = pagination.items
-
-        return jsonify({
-            'users': [user.to_dict() for user in users],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
-        })
+        search = request.args.get('search', '').strip()
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', pagination_service.DEFAULT_LIMIT, type=int)
+        total = request.args.get('total')
+
+        if len(search) >= search_service.MIN_TERM_LENGTH:
+            page = search_service.search(
+                'users', search, cursor=cursor, limit=limit, total=total,
+                options=(selectinload(User.settings),)
+            )
+        else:
+            query = User.query.options(selectinload(User.settings))
+            # Terms too short for trigrams are matched by a plain ILIKE scan
+            if search:
+                query = query.filter(User.username.ilike(f'%{search}%'))
+
+            page = pagination_service.paginate(
+                query,
+                (User.id,),
+                cursor=cursor,
+                limit=limit,
+                total=total
+            )
+        page['users'] = User.to_dict_many(page.pop('items'))
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f'Error getting users: {str(e)}')
         return jsonify({'message': 'Failed to get users'}), 500
@@ -162,6 +185,7 @@ def update_user(current_user, user_id):
             user.status = data['status']
         
         db.session.commit()
+        principal_cache_service.invalidate(user.public_id)
         return jsonify({
             'message': 'User updated successfully',
             'user': user.to_dict()
@@ -186,8 +210,10 @@ def delete_user(current_user, user_id):
         return jsonify({'message': 'User not found'}), 404
 
     try:
+        public_id = user.public_id
         db.session.delete(user)
         db.session.commit()
+        principal_cache_service.invalidate(public_id)
         return jsonify({'message': 'User deleted successfully'})
     except Exception as e:
         current_app.logger.error(f'Error deleting user: {str(e)}')
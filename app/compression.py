@@ -0,0 +1,60 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without Brotli
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv'
+}
+
+def init_compression(app):
+    """Compress buffered responses above COMPRESS_MIN_SIZE bytes.
+
+    The encoding is negotiated from Accept-Encoding, preferring Brotli.
+    Streamed and file responses are left alone, so exports keep streaming.
+    """
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    # Brotli's fast qualities compress better than gzip at similar speed
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code >= 300
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _negotiate_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        if encoding == 'br':
+            data = brotli.compress(data, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            data = gzip.compress(data, compresslevel=app.config['COMPRESS_GZIP_LEVEL'])
+
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+def _negotiate_encoding():
+    """Get the client's preferred supported encoding, Brotli on ties"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
@@ -0,0 +1,44 @@
+import decimal
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Falls back to Flask's stdlib provider without orjson
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider serializing with orjson.
+
+    datetime, date, UUID and numpy values are handled natively by orjson;
+    Decimal is written as a number. Keys are not sorted and dictionaries
+    with non-string keys are allowed, matching the stdlib provider's
+    output apart from key order. Calls with stdlib json options such as
+    indent fall back to the stdlib provider.
+    """
+
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, decimal.Decimal):
+            return float(obj)
+        return DefaultJSONProvider.default(obj)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self._default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self._default, option=self.OPTIONS),
+            mimetype=self.mimetype
+        )
@@ -3,6 +3,9 @@ from datetime import datetime
 
 class Advertisement(db.Model):
     __tablename__ = 'advertisements'
+    __table_args__ = (
+        db.Index('ix_advertisements_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -11,8 +14,11 @@ class Advertisement(db.Model):
     price = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='pending')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     scheduled_for = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
+    # Set by search_service on search results
+    search_rank = db.query_expression()
 
     def to_dict(self):
         return {
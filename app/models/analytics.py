@@ -1,14 +1,27 @@
 from app import db
 from datetime import datetime
 
+# Range-partitioned by month on timestamp (migration 005, PartitionService)
 class Analytics(db.Model):
     __tablename__ = 'analytics'
+    __table_args__ = (
+        db.Index('ix_analytics_bot_id_timestamp', 'bot_id', 'timestamp'),
+        db.Index('ix_analytics_metric_type_bot_id_timestamp', 'metric_type', 'bot_id', 'timestamp'),
+        db.Index('ix_analytics_timestamp_brin', 'timestamp', postgresql_using='brin'),
+        db.Index('ix_analytics_ad_id', 'ad_id', postgresql_where=db.text('ad_id IS NOT NULL')),
+        db.Index('ix_analytics_ingest_id_timestamp', 'ingest_id', 'timestamp', unique=True,
+                 postgresql_where=db.text('ingest_id IS NOT NULL'), sqlite_where=db.text('ingest_id IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     bot_id = db.Column(db.Integer, db.ForeignKey('bots.id'), nullable=False)
     metric_type = db.Column(db.String(50), nullable=False)
     metric_value = db.Column(db.JSON, nullable=False)
+    # Set for broadcast_metrics rows so ad lookups can use an index
+    ad_id = db.Column(db.Integer)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Set by IngestService so a replayed row is written once
+    ingest_id = db.Column(db.String(32))
 
     def to_dict(self):
         return {
@@ -1,8 +1,14 @@
 from app import db
 from datetime import datetime
+# Imported so the relationships below resolve
+from app.models.message import Message
+from app.models.log import Log
 
 class Bot(db.Model):
     __tablename__ = 'bots'
+    __table_args__ = (
+        db.Index('ix_bots_user_id_id', 'user_id', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -10,8 +16,11 @@ class Bot(db.Model):
     bot_name = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='stopped')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_active = db.Column(db.DateTime)
     instance_id = db.Column(db.String(50))
+    # Set by search_service on search results
+    search_rank = db.query_expression()
 
     # Relationships
     messages = db.relationship('Message', backref='bot', lazy='dynamic')
@@ -0,0 +1,27 @@
+from app import db
+from datetime import datetime
+
+class BotSubscriber(db.Model):
+    """A chat seen by a bot, numbered densely per bot for bitmaps"""
+    __tablename__ = 'bot_subscribers'
+    __table_args__ = (
+        db.UniqueConstraint('bot_id', 'ordinal', name='uq_bot_subscribers_bot_id_ordinal'),
+    )
+
+    bot_id = db.Column(db.Integer, db.ForeignKey('bots.id'), primary_key=True)
+    # The chat id, which is the user's id for private chats
+    telegram_user_id = db.Column(db.BigInteger, primary_key=True)
+    ordinal = db.Column(db.Integer, nullable=False)
+    first_seen_week = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CohortBitmap(db.Model):
+    """Subscriber ordinals first seen (or active) in a week, as a bitmap"""
+    __tablename__ = 'cohort_bitmaps'
+
+    bot_id = db.Column(db.Integer, db.ForeignKey('bots.id'), primary_key=True)
+    week = db.Column(db.Date, primary_key=True)
+    # 'first_seen' or 'active'
+    kind = db.Column(db.String(20), primary_key=True)
+    bitmap = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,24 @@
+from app import db
+from datetime import datetime
+
+class Log(db.Model):
+    __tablename__ = 'logs'
+    __table_args__ = (
+        db.Index('ix_logs_bot_id_timestamp', 'bot_id', 'timestamp'),
+        db.Index('ix_logs_timestamp_brin', 'timestamp', postgresql_using='brin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bot_id = db.Column(db.Integer, db.ForeignKey('bots.id'), nullable=False)
+    log_level = db.Column(db.String(20), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'bot_id': self.bot_id,
+            'log_level': self.log_level,
+            'message': self.message,
+            'timestamp': self.timestamp.isoformat()
+        }
@@ -0,0 +1,29 @@
+from app import db
+from datetime import datetime
+
+# Range-partitioned by month on sent_at (migration 005, PartitionService)
+class Message(db.Model):
+    __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_bot_id_sent_at', 'bot_id', 'sent_at'),
+        db.Index('ix_messages_sent_at_brin', 'sent_at', postgresql_using='brin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bot_id = db.Column(db.Integer, db.ForeignKey('bots.id'), nullable=False)
+    chat_id = db.Column(db.BigInteger, nullable=False)
+    message_type = db.Column(db.String(20), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    status = db.Column(db.String(20), nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'bot_id': self.bot_id,
+            'chat_id': self.chat_id,
+            'message_type': self.message_type,
+            'content': self.content,
+            'sent_at': self.sent_at.isoformat(),
+            'status': self.status
+        }
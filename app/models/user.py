@@ -1,24 +1,60 @@
 from app import db
+from app.services.audit_log_service import audit_log_service
+from app.services.activity_tracker_service import activity_tracker_service
+from app.services.pagination_service import pagination_service
+from app.models.bot import Bot
+from app.models.advertisement import Advertisement
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 import uuid
 import json
+import hmac
+import hashlib
 from datetime import datetime, timedelta
 import secrets
 
 class UserApiKey(db.Model):
+    """An API key, presented as tbk_<prefix>_<secret>.
+
+    The prefix is stored in clear and indexed so a key is found with one
+    lookup; the secret is stored as an HMAC-SHA256 keyed with the app's
+    API_KEY_SECRET, which is fast to check and useless without that key.
+    """
     __tablename__ = 'user_api_keys'
 
+    KEY_PREFIX = 'tbk_'
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    prefix = db.Column(db.String(16), unique=True, index=True)
     key_hash = db.Column(db.String(128), nullable=False)
     name = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     last_used_at = db.Column(db.DateTime)
     expires_at = db.Column(db.DateTime)
 
+    @staticmethod
+    def hash_secret(secret):
+        return hmac.new(
+            current_app.config['API_KEY_SECRET'].encode(),
+            secret.encode(),
+            hashlib.sha256
+        ).hexdigest()
+
+    @classmethod
+    def parse(cls, key):
+        """Split a presented key into (prefix, secret), or None if malformed"""
+        if not key or not key.startswith(cls.KEY_PREFIX):
+            return None
+        parts = key[len(cls.KEY_PREFIX):].split('_', 1)
+        if len(parts) != 2 or not all(parts):
+            return None
+        return parts[0], parts[1]
+
     def to_dict(self):
         return {
             'id': self.id,
+            'prefix': self.prefix,
             'name': self.name,
             'created_at': self.created_at.isoformat(),
             'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None,
@@ -27,6 +63,11 @@ class UserApiKey(db.Model):
 
 class UserActivity(db.Model):
     __tablename__ = 'user_activities'
+    __table_args__ = (
+        db.Index('ix_user_activities_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        db.Index('ix_user_activities_ingest_id', 'ingest_id', unique=True,
+                 postgresql_where=db.text('ingest_id IS NOT NULL'), sqlite_where=db.text('ingest_id IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -34,6 +75,8 @@ class UserActivity(db.Model):
     details = db.Column(db.JSON)
     ip_address = db.Column(db.String(45))
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Set by IngestService so a replayed row is written once
+    ingest_id = db.Column(db.String(32))
 
     def to_dict(self):
         return {
@@ -48,18 +91,32 @@ class UserSettings(db.Model):
     __tablename__ = 'user_settings'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    notification_preferences = db.Column(db.JSON, default=lambda: {
+    DEFAULT_NOTIFICATION_PREFERENCES = {
         'email': True,
         'web': True,
         'bot_status': True,
         'broadcast_status': True,
         'security_alerts': True
-    })
+    }
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    notification_preferences = db.Column(db.JSON, default=lambda: dict(UserSettings.DEFAULT_NOTIFICATION_PREFERENCES))
     theme = db.Column(db.String(20), default='light')
     timezone = db.Column(db.String(50), default='UTC')
     language = db.Column(db.String(10), default='en')
     dashboard_layout = db.Column(db.JSON)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def defaults(cls):
+        """Settings of a user who never saved any, without creating a row"""
+        return {
+            'notification_preferences': dict(cls.DEFAULT_NOTIFICATION_PREFERENCES),
+            'theme': 'light',
+            'timezone': 'UTC',
+            'language': 'en',
+            'dashboard_layout': None
+        }
 
     def to_dict(self):
         return {
@@ -83,6 +140,8 @@ class User(db.Model):
     status = db.Column(db.String(20), nullable=False, default='active')
     last_login = db.Column(db.DateTime)
     last_active = db.Column(db.DateTime)
+    # Set by search_service on search results
+    search_rank = db.query_expression()
 
     # Relationships
     bots = db.relationship('Bot', backref='owner', lazy='dynamic')
@@ -110,12 +169,14 @@ class User(db.Model):
 
     def create_api_key(self, name, expires_in=None):
         """Create a new API key"""
-        key = secrets.token_urlsafe(32)
-        key_hash = generate_password_hash(key)
+        prefix = secrets.token_hex(6)
+        secret = secrets.token_urlsafe(32)
+        key = f'{UserApiKey.KEY_PREFIX}{prefix}_{secret}'
         
         api_key = UserApiKey(
             user_id=self.id,
-            key_hash=key_hash,
+            prefix=prefix,
+            key_hash=UserApiKey.hash_secret(secret),
             name=name,
             expires_at=(datetime.utcnow() + timedelta(days=expires_in)) if expires_in else None
         )
@@ -131,47 +192,47 @@ class User(db.Model):
         }
 
     def delete_api_key(self, key_id):
-        """Delete an API key"""
+        """Delete an API key and return its prefix"""
         api_key = UserApiKey.query.filter_by(id=key_id, user_id=self.id).first()
         if not api_key:
             raise ValueError('API key not found')
         
+        prefix = api_key.prefix
         db.session.delete(api_key)
         db.session.commit()
+        return prefix
 
     def get_api_keys(self):
         """Get all API keys"""
         return [key.to_dict() for key in self.api_keys]
 
     def log_activity(self, action, details=None, ip_address=None):
-        """Log user activity"""
-        activity = UserActivity(
-            user_id=self.id,
-            action=action,
-            details=details,
-            ip_address=ip_address
-        )
-        db.session.add(activity)
-        db.session.commit()
+        """Log user activity; written in the background in batches"""
+        audit_log_service.log({
+            'user_id': self.id,
+            'action': action,
+            'details': details,
+            'ip_address': ip_address,
+            'timestamp': datetime.utcnow()
+        })
 
-    def get_activity_log(self, page=1, per_page=20):
-        """Get paginated activity log"""
-        pagination = self.activities.order_by(UserActivity.timestamp.desc())\
-            .paginate(page=page, per_page=per_page)
-        
-        return {
-            'activities': [activity.to_dict() for activity in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
-        }
+    def get_activity_log(self, cursor=None, limit=20, total=None):
+        """Get the activity log newest first, one keyset page at a time"""
+        page = pagination_service.paginate(
+            UserActivity.query.filter_by(user_id=self.id),
+            (UserActivity.timestamp, UserActivity.id),
+            cursor=cursor,
+            limit=limit,
+            descending=True,
+            total=total
+        )
+        page['activities'] = [activity.to_dict() for activity in page.pop('items')]
+        return page
 
     def get_settings(self):
-        """Get user settings"""
+        """Get user settings; defaults until the user saves some"""
         if not self.settings:
-            self.settings = UserSettings()
-            db.session.add(self.settings)
-            db.session.commit()
+            return UserSettings.defaults()
         return self.settings.to_dict()
 
     def update_settings(self, settings):
@@ -185,12 +246,36 @@ class User(db.Model):
                 setattr(self.settings, key, value)
 
     def update_last_active(self):
-        """Update last active timestamp"""
-        self.last_active = datetime.utcnow()
-        db.session.commit()
+        """Record activity; last_active is written by the next tracker flush"""
+        activity_tracker_service.touch_user(self.id)
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def get_summary_counts(cls, user_ids):
+        """Count bots and advertisements for many users, one query each"""
+        counts = {user_id: {'bots': 0, 'advertisements': 0} for user_id in user_ids}
+        if not counts:
+            return counts
+
+        for name, model in (('bots', Bot), ('advertisements', Advertisement)):
+            rows = db.session.query(model.user_id, db.func.count(model.id))\
+                .filter(model.user_id.in_(counts.keys()))\
+                .group_by(model.user_id)
+            for user_id, count in rows:
+                counts[user_id][name] = count
+        return counts
+
+    @classmethod
+    def to_dict_many(cls, users):
+        """Serialize users with their summary counts.
+
+        Load users with selectinload(User.settings) so a page costs a
+        constant number of queries: users, settings, bot and ad counts.
+        """
+        counts = cls.get_summary_counts([user.id for user in users])
+        return [user.to_dict(counts=counts[user.id]) for user in users]
+
+    def to_dict(self, counts=None):
+        data = {
             'id': self.id,
             'public_id': self.public_id,
             'username': self.username,
@@ -201,4 +286,7 @@ class User(db.Model):
             'last_login': self.last_login.isoformat() if self.last_login else None,
             'last_active': self.last_active.isoformat() if self.last_active else None,
             'settings': self.get_settings()
-        }
\ No newline at end of file
+        }
+        if counts is not None:
+            data['counts'] = counts
+        return data
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict
+
+import redis
+from sqlalchemy import Integer, DateTime, column, values
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+class ActivityTrackerService:
+    """Write-behind tracker for users.last_active and user_api_keys.last_used_at.
+
+    Requests record "seen now" in a Redis hash per table instead of updating
+    the row; each process also skips ids it already recorded within the last
+    resolution seconds, so hot users cost one dict lookup per request. A
+    periodic flush renames each hash out of the way and applies it with one
+    bulk UPDATE, so timestamps lag by at most a flush interval and hot rows
+    are written once per flush instead of once per request.
+    """
+
+    # tracked name -> (table, timestamp column)
+    TRACKED = {
+        'users': ('users', 'last_active'),
+        'api_keys': ('user_api_keys', 'last_used_at')
+    }
+    KEY_PREFIX = 'activity:'
+    FLUSHING_SUFFIX = ':flushing'
+    LOCK_SUFFIX = ':lock'
+
+    def __init__(self):
+        self.redis = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://redis:6379/1'),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        self.resolution = int(os.getenv('ACTIVITY_RESOLUTION', 30))
+        self.flush_interval = int(os.getenv('ACTIVITY_FLUSH_INTERVAL', 60))
+        self.lock_timeout = 60
+        self.max_recorded = 100000
+        self._recorded = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name: str) -> str:
+        return self.KEY_PREFIX + name
+
+    def touch_user(self, user_id: int):
+        """Record that a user was active now"""
+        self._touch('users', user_id)
+
+    def touch_api_key(self, key_id: int):
+        """Record that an API key was used now"""
+        self._touch('api_keys', key_id)
+
+    def _touch(self, name: str, id: int):
+        now = time.time()
+        with self._lock:
+            if now - self._recorded.get((name, id), float('-inf')) < self.resolution:
+                return
+            if len(self._recorded) >= self.max_recorded:
+                self._recorded = {
+                    recorded: at for recorded, at in self._recorded.items()
+                    if now - at < self.resolution
+                }
+            self._recorded[(name, id)] = now
+        try:
+            self.redis.hset(self._key(name), id, now)
+        except redis.RedisError as e:
+            # Best effort: the next request after resolution tries again
+            logger.warning(f'Recording {name} activity failed: {str(e)}')
+
+    def flush(self) -> Dict[str, int]:
+        """Write recorded timestamps with one UPDATE per table; returns rows updated"""
+        updated = {}
+        for name in self.TRACKED:
+            key = self._key(name)
+            flushing = key + self.FLUSHING_SUFFIX
+            lock_key = key + self.LOCK_SUFFIX
+            try:
+                if not self.redis.set(lock_key, 1, nx=True, ex=self.lock_timeout):
+                    continue
+            except redis.RedisError as e:
+                logger.warning(f'Activity flush lock failed for {name}: {str(e)}')
+                continue
+
+            try:
+                # A hash left by a flusher that died is written first
+                if not self.redis.exists(flushing):
+                    try:
+                        self.redis.rename(key, flushing)
+                    except redis.ResponseError:
+                        # Nothing recorded since the last flush
+                        continue
+
+                recorded = self.redis.hgetall(flushing)
+                updated[name] = self._apply(name, recorded)
+                self.redis.delete(flushing)
+            except redis.RedisError as e:
+                logger.warning(f'Activity flush failed for {name}: {str(e)}')
+            finally:
+                try:
+                    self.redis.delete(lock_key)
+                except redis.RedisError:
+                    pass
+        return updated
+
+    def _apply(self, name: str, recorded: Dict[bytes, bytes]) -> int:
+        """Move timestamps forward in one statement; older values never win"""
+        if not recorded:
+            return 0
+
+        table_name, column_name = self.TRACKED[name]
+        table = db.metadata.tables[table_name]
+        target = table.c[column_name]
+        # Sorted so concurrent writers lock rows in the same order
+        rows = sorted(
+            (int(id), datetime.utcfromtimestamp(float(timestamp)))
+            for id, timestamp in recorded.items()
+        )
+        seen = values(
+            column('id', Integer), column('seen_at', DateTime), name='seen'
+        ).data(rows)
+
+        try:
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id == seen.c.id)
+                .where(db.or_(target.is_(None), target < seen.c.seen_at))
+                .values({column_name: seen.c.seen_at})
+            )
+            db.session.commit()
+            return result.rowcount
+        except Exception:
+            db.session.rollback()
+            raise
+
+activity_tracker_service = ActivityTrackerService()
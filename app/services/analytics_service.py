@@ -1,79 +1,472 @@
 import pandas as pd
 import io
+import csv
+import zipfile
+import os
+import shutil
+import tempfile
+import xlsxwriter
+import time
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, literal, null
 from app import db
 from app.models.bot import Bot
 from app.models.analytics import Analytics
 from app.models.advertisement import Advertisement
 from app.models.message import Message
+from app.services.cache_service import cache_service
+from app.services.etag_service import etag_service
+from app.services.ingest_service import ingest_service
+from app.services.recent_metrics_service import recent_metrics_service
+from app.services.latency_histogram import LatencyHistogram
 import logging
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is unavailable without pyarrow
+    pa = None
+
 logger = logging.getLogger(__name__)
 
 class AnalyticsService:
+    DASHBOARD_RANGES = {
+        '24h': timedelta(hours=24),
+        '7d': timedelta(days=7),
+        '30d': timedelta(days=30)
+    }
+
     def __init__(self):
         self.export_formats = {
             'csv': self._export_csv,
             'excel': self._export_excel,
-            'json': self._export_json
+            'json': self._export_json,
+            'parquet': self._export_parquet
+        }
+        ingest_service.add_flush_listener('analytics', self._on_analytics_flushed)
+
+    DASHBOARD_CACHE_TTL = 300
+
+    def _dashboard_cache_key(self, user_id, time_range):
+        return f'analytics:dashboard:{user_id}:{time_range}'
+
+    # Served from the in-memory per-minute rings instead of the database
+    RECENT_DASHBOARD_RANGE = '24h'
+
+    def get_dashboard_metrics(self, user_id, time_range='24h'):
+        """Get dashboard metrics for a user, served from memory or cache when possible"""
+        if time_range == self.RECENT_DASHBOARD_RANGE and recent_metrics_service.enabled:
+            metrics = self._compute_dashboard_metrics(user_id, time_range, recent=True)
+            if metrics is not None:
+                return metrics
+
+        return cache_service.get_or_compute(
+            self._dashboard_cache_key(user_id, time_range),
+            lambda: self._compute_dashboard_metrics(user_id, time_range),
+            ttl=self.DASHBOARD_CACHE_TTL,
+            namespace='dashboard'
+        )
+
+    def invalidate_dashboard(self, user_id):
+        """Drop cached dashboards for a user after their bots' data changed"""
+        cache_service.delete(
+            self._dashboard_cache_key(user_id, time_range)
+            for time_range in self.DASHBOARD_RANGES
+        )
+
+    def _on_analytics_flushed(self, rows):
+        """Invalidate caches and ETags of the bots in a freshly written batch"""
+        bot_ids = {row['bot_id'] for row in rows}
+        if not bot_ids:
+            return
+        # Queued rows can land long after their hour closed and got cached.
+        # Readers that queried before these rows committed must not cache
+        # what they computed, so the generation moves before the delete.
+        hours = {
+            (row['bot_id'], self._floor_hour(row.get('timestamp') or datetime.utcnow()))
+            for row in rows
         }
+        closed_before = self._floor_hour(datetime.utcnow() - self.HOURLY_BUCKET_GRACE)
+        cache_service.incr(
+            {self._bucket_generation_key(bot_id) for bot_id, hour in hours if hour < closed_before},
+            ttl=self.HOURLY_BUCKET_TTL
+        )
+        cache_service.delete(
+            key for bot_id, hour in hours for key in (
+                self._bucket_key(bot_id, hour, self.HOUR),
+                self._bucket_key(bot_id, self._floor_day(hour), self.DAY)
+            )
+        )
+        user_ids = [
+            user_id for (user_id,) in
+            db.session.query(Bot.user_id).filter(Bot.id.in_(bot_ids)).distinct()
+        ]
+        for user_id in user_ids:
+            self.invalidate_dashboard(user_id)
+
+        ad_ids = {row['ad_id'] for row in rows if row.get('ad_id')}
+        etag_service.bump(
+            *(self._etag_scope('user', user_id) for user_id in user_ids),
+            *(self._etag_scope('bot', bot_id) for bot_id in bot_ids),
+            *(self._etag_scope('ad', ad_id) for ad_id in ad_ids)
+        )
+
+    # Open-ended ranges roll forward without new rows, so their ETag
+    # versions also change every ETAG_WINDOW seconds
+    ETAG_WINDOW = 60
+
+    def _etag_scope(self, kind, id):
+        return f'analytics:{kind}:{id}'
+
+    def _etag_window(self):
+        return int(time.time() // self.ETAG_WINDOW)
+
+    def get_dashboard_version(self, user_id):
+        """Get the ETag version of a user's dashboards, or None"""
+        version = etag_service.get_version(self._etag_scope('user', user_id))
+        if version is None:
+            return None
+        bots = etag_service.row_version(Bot, Bot.user_id == user_id)
+        return f'{version}:{bots}:{self._etag_window()}'
+
+    def get_bot_metrics_version(self, bot_id, user_id, open_ended=True):
+        """Get the ETag version of a bot's metrics, or None if it is not user_id's"""
+        if not self._is_owner(Bot, bot_id, user_id):
+            return None
+        version = etag_service.get_version(self._etag_scope('bot', bot_id))
+        if version is None or not open_ended:
+            return version
+        return f'{version}:{self._etag_window()}'
+
+    def get_advertisement_metrics_version(self, ad_id, user_id):
+        """Get the ETag version of an advertisement's metrics, or None if it is not user_id's"""
+        if not self._is_owner(Advertisement, ad_id, user_id):
+            return None
+        return etag_service.get_version(self._etag_scope('ad', ad_id))
+
+    def _is_owner(self, model, id, user_id):
+        return db.session.query(model.id).filter_by(id=id, user_id=user_id).first() is not None
+
+    def _compute_dashboard_metrics(self, user_id, time_range, recent=False):
+        """Aggregate dashboard metrics for a user's bots.
+
+        With recent, counters come from the in-memory rings and None is
+        returned when they are not available.
+        """
+        try:
+            since = datetime.utcnow() - self.DASHBOARD_RANGES[time_range]
+            bots = Bot.query.filter_by(user_id=user_id).all()
+
+            aggregated = {
+                'total_users': 0,
+                'total_messages': 0,
+                'active_bots': len([bot for bot in bots if bot.status == 'running']),
+                'total_bots': len(bots),
+                'metrics_by_bot': {},
+                'message_types': {},
+                'user_activity': [],
+                'bot_performance': []
+            }
+            if not bots:
+                return aggregated
+
+            bots_by_id = {bot.id: bot for bot in bots}
+            if recent:
+                rows = recent_metrics_service.get_counts(list(bots_by_id))
+                if rows is None:
+                    return None
+            else:
+                rows = db.session.execute(
+                    self._dashboard_query(list(bots_by_id), since)
+                ).all()
+
+            for bot_id, metric_type, message_type, count, failed in rows:
+                if message_type is not None:
+                    aggregated['message_types'][message_type] = count
+                    continue
+
+                if metric_type == 'users':
+                    aggregated['total_users'] += count
+                else:
+                    aggregated['total_messages'] += count
+
+                # String keys so cached and freshly computed results match
+                key = str(bot_id)
+                if key not in aggregated['metrics_by_bot']:
+                    bot = bots_by_id[bot_id]
+                    aggregated['metrics_by_bot'][key] = {
+                        'id': bot.id,
+                        'name': bot.bot_name,
+                        'metrics': {'users': 0, 'messages': 0, 'failed': 0}
+                    }
+                bot_metrics = aggregated['metrics_by_bot'][key]['metrics']
+                bot_metrics[metric_type] = count
+                if metric_type == 'messages':
+                    bot_metrics['failed'] = failed
+
+            # Format for charts
+            for data in aggregated['metrics_by_bot'].values():
+                bot_metrics = data['metrics']
+                success_rate = 0
+                if bot_metrics['messages'] > 0:
+                    success_rate = (
+                        (bot_metrics['messages'] - bot_metrics['failed'])
+                        / bot_metrics['messages'] * 100
+                    )
+                aggregated['bot_performance'].append({
+                    'id': data['id'],
+                    'name': data['name'],
+                    'users': bot_metrics['users'],
+                    'messages': bot_metrics['messages'],
+                    'success_rate': success_rate
+                })
+
+            return aggregated
+        except Exception as e:
+            logger.error(f'Error getting dashboard metrics: {str(e)}')
+            raise
+
+    def _dashboard_query(self, bot_ids, since):
+        """Build the grouped query behind the dashboard.
+
+        Yields one ``(bot_id, metric_type, None, count, failed)`` row per bot
+        and metric type, followed by one ``(None, 'message_types', type,
+        count, 0)`` row per message type found in the ``types`` objects.
+        """
+        in_range = and_(
+            Analytics.bot_id.in_(bot_ids),
+            Analytics.timestamp >= since
+        )
 
-    def get_bot_metrics(self, bot_id, start_date=None, end_date=None):
-        """Get metrics for a specific bot"""
+        per_bot = db.select(
+            Analytics.bot_id,
+            Analytics.metric_type,
+            null().label('message_type'),
+            func.coalesce(func.sum(Analytics.metric_value['count'].as_integer()), 0).label('count'),
+            func.coalesce(func.sum(Analytics.metric_value['failed'].as_integer()), 0).label('failed')
+        ).where(
+            in_range,
+            Analytics.metric_type.in_(['users', 'messages'])
+        ).group_by(Analytics.bot_id, Analytics.metric_type)
+
+        types = func.json_each_text(
+            Analytics.metric_value['types']
+        ).table_valued('key', 'value').lateral()
+        per_type = db.select(
+            null(),
+            literal('message_types'),
+            types.c.key,
+            func.sum(types.c.value.cast(db.Integer)),
+            literal(0)
+        ).select_from(Analytics).join(types, db.true()).where(
+            in_range,
+            Analytics.metric_type == 'messages'
+        ).group_by(types.c.key)
+
+        return per_bot.union_all(per_type).order_by('bot_id')
+
+    HOURLY_BUCKET_TTL = 90 * 24 * 3600
+    # Hours only count as closed once most late writes for them have landed;
+    # rows flushed after that drop their hour's and day's buckets
+    HOURLY_BUCKET_GRACE = timedelta(minutes=5)
+    HOUR = timedelta(hours=1)
+    DAY = timedelta(days=1)
+
+    def get_bot_metrics(self, bot_id, start_date=None, end_date=None, max_points=None):
+        """Get metrics for a specific bot.
+
+        Whole hours that have already ended are read from (or written to) the
+        bucket cache, a day per bucket where whole days fit; only the partial
+        hours at the edges of the range and the still-open current hour are
+        queried live. With max_points,
+        hourly_activity is merged into wider buckets so it never has more
+        entries than that.
+        """
+        self._validate_max_points(max_points)
         try:
             if not start_date:
                 start_date = datetime.utcnow() - timedelta(days=30)
             if not end_date:
                 end_date = datetime.utcnow()
 
+            aggregated = self._empty_bot_metrics()
+
+            first_hour = self._floor_hour(start_date)
+            if first_hour < start_date:
+                first_hour += timedelta(hours=1)
+            closed_until = min(
+                self._floor_hour(end_date),
+                self._floor_hour(datetime.utcnow() - self.HOURLY_BUCKET_GRACE)
+            )
+
+            if first_hour < closed_until:
+                for bucket in self._get_closed_buckets(bot_id, first_hour, closed_until):
+                    self._merge_bot_metrics(aggregated, bucket)
+                live_range = db.or_(
+                    and_(Analytics.timestamp >= start_date, Analytics.timestamp < first_hour),
+                    Analytics.timestamp.between(closed_until, end_date)
+                )
+            else:
+                live_range = Analytics.timestamp.between(start_date, end_date)
+
             metrics = Analytics.query.filter(
                 Analytics.bot_id == bot_id,
-                Analytics.timestamp.between(start_date, end_date)
+                live_range
             ).order_by(Analytics.timestamp.desc()).all()
+            self._aggregate_bot_metrics(aggregated, metrics)
 
-            # Aggregate metrics
-            aggregated = {
-                'total_users': 0,
-                'total_messages': 0,
-                'message_types': {},
-                'hourly_activity': {},
-                'ads_performance': {}
-            }
-
-            for metric in metrics:
-                if metric.metric_type == 'users':
-                    aggregated['total_users'] += metric.metric_value.get('count', 0)
-                elif metric.metric_type == 'messages':
-                    aggregated['total_messages'] += metric.metric_value.get('count', 0)
-                    for msg_type, count in metric.metric_value.get('types', {}).items():
-                        aggregated['message_types'][msg_type] = (
-                            aggregated['message_types'].get(msg_type, 0) + count
-                        )
-                elif metric.metric_type == 'hourly_stats':
-                    hour = metric.timestamp.strftime('%Y-%m-%d %H:00')
-                    aggregated['hourly_activity'][hour] = metric.metric_value
+            if max_points:
+                aggregated['hourly_activity'], aggregated['resolution_hours'] = (
+                    self._bucket_hourly_activity(aggregated['hourly_activity'], max_points)
+                )
 
             return aggregated
         except Exception as e:
             logger.error(f'Error getting bot metrics: {str(e)}')
             raise
 
-    def get_advertisement_metrics(self, ad_id):
-        """Get metrics for a specific advertisement"""
+    def _empty_bot_metrics(self):
+        return {
+            'total_users': 0,
+            'total_messages': 0,
+            'message_types': {},
+            'hourly_activity': {},
+            'ads_performance': {}
+        }
+
+    def _floor_hour(self, moment):
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    def _floor_day(self, moment):
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _bucket_key(self, bot_id, start, width):
+        if width == self.DAY:
+            return f'analytics:bot:{bot_id}:day:{start:%Y%m%d}'
+        return f'analytics:bot:{bot_id}:hour:{start:%Y%m%d%H}'
+
+    def _bucket_generation_key(self, bot_id):
+        return f'analytics:bot:{bot_id}:buckets:generation'
+
+    def _aggregate_bot_metrics(self, aggregated, metrics):
+        """Fold Analytics rows into a bot metrics dict"""
+        for metric in metrics:
+            if metric.metric_type == 'users':
+                aggregated['total_users'] += metric.metric_value.get('count', 0)
+            elif metric.metric_type == 'messages':
+                aggregated['total_messages'] += metric.metric_value.get('count', 0)
+                for msg_type, count in metric.metric_value.get('types', {}).items():
+                    aggregated['message_types'][msg_type] = (
+                        aggregated['message_types'].get(msg_type, 0) + count
+                    )
+            elif metric.metric_type == 'hourly_stats':
+                hour = metric.timestamp.strftime('%Y-%m-%d %H:00')
+                aggregated['hourly_activity'][hour] = metric.metric_value
+
+    def _merge_bot_metrics(self, aggregated, bucket):
+        """Fold a cached bucket into a bot metrics dict"""
+        aggregated['total_users'] += bucket['total_users']
+        aggregated['total_messages'] += bucket['total_messages']
+        for msg_type, count in bucket['message_types'].items():
+            aggregated['message_types'][msg_type] = (
+                aggregated['message_types'].get(msg_type, 0) + count
+            )
+        aggregated['hourly_activity'].update(bucket['hourly_activity'])
+
+    def _bucket_spans(self, start_hour, end_hour):
+        """Split [start_hour, end_hour) into whole days and the hours around them"""
+        def spans(start, end, width):
+            while start < end:
+                yield start, width
+                start += width
+
+        first_day = self._floor_day(start_hour)
+        if first_day < start_hour:
+            first_day += self.DAY
+        last_day = self._floor_day(end_hour)
+        if first_day >= last_day:
+            return list(spans(start_hour, end_hour, self.HOUR))
+        return [
+            *spans(start_hour, first_day, self.HOUR),
+            *spans(first_day, last_day, self.DAY),
+            *spans(last_day, end_hour, self.HOUR)
+        ]
+
+    def _get_closed_buckets(self, bot_id, start_hour, end_hour):
+        """Get aggregates covering every closed hour in [start_hour, end_hour).
+
+        Cached day and hour buckets are fetched in one round trip; missing
+        ones are built from a single range query and cached, including empty
+        ones, unless a late flush moved the bot's bucket generation meanwhile.
+        """
+        generation_key = self._bucket_generation_key(bot_id)
+        generation = cache_service.get(generation_key)
+
+        spans = self._bucket_spans(start_hour, end_hour)
+        keys = [self._bucket_key(bot_id, start, width) for start, width in spans]
+        buckets = cache_service.get_many(keys)
+        missing = [i for i, bucket in enumerate(buckets) if bucket is None]
+        if not missing:
+            return buckets
+
+        first_start, _ = spans[missing[0]]
+        last_start, last_width = spans[missing[-1]]
+        metrics = Analytics.query.filter(
+            Analytics.bot_id == bot_id,
+            Analytics.timestamp >= first_start,
+            Analytics.timestamp < last_start + last_width
+        ).order_by(Analytics.timestamp.desc()).all()
+
+        metrics_by_hour = {}
+        for metric in metrics:
+            metrics_by_hour.setdefault(self._floor_hour(metric.timestamp), []).append(metric)
+
+        computed = {}
+        for i in missing:
+            start, width = spans[i]
+            bucket = self._empty_bot_metrics()
+            for hour in range(int(width / self.HOUR)):
+                self._aggregate_bot_metrics(bucket, metrics_by_hour.get(start + hour * self.HOUR, []))
+            buckets[i] = computed[keys[i]] = bucket
+        cache_service.set_many_if_unchanged(generation_key, generation, computed, ttl=self.HOURLY_BUCKET_TTL)
+
+        return buckets
+
+    def get_advertisement_metrics(self, ad_id, since=None, max_points=None):
+        """Get metrics for a specific advertisement.
+
+        Pass the advertisement's creation time as since so only the
+        partitions written after it are scanned. With max_points, the
+        timeline is thinned with LTTB and throughput is summed into wider
+        windows; the totals still cover every broadcast.
+
+        Send latency histograms are merged per bot and overall and reported
+        as percentiles.
+        """
+        self._validate_max_points(max_points)
         try:
-            metrics = Analytics.query.filter(
+            query = Analytics.query.filter(
                 Analytics.metric_type == 'broadcast_metrics',
-                Analytics.metric_value['ad_id'].astext.cast(db.Integer) == ad_id
-            ).all()
+                Analytics.ad_id == ad_id
+            )
+            if since:
+                query = query.filter(Analytics.timestamp >= since)
+            metrics = query.order_by(Analytics.timestamp).all()
 
             aggregated = {
                 'total_recipients': 0,
                 'successful': 0,
                 'failed': 0,
                 'bots': {},
-                'timeline': []
+                'timeline': [],
+                'latency': None,
+                'throughput': []
             }
+            latency = LatencyHistogram()
+            latency_by_bot = {}
+            # window start (epoch seconds) -> [sent, failed]
+            windows = {}
+            interval = None
 
             for metric in metrics:
                 data = metric.metric_value
@@ -94,22 +487,199 @@ class AnalyticsService:
                 bot_stats['successful'] += data.get('successful', 0)
                 bot_stats['failed'] += data.get('failed', 0)
 
+                if 'latency' in data:
+                    histogram = LatencyHistogram.from_dict(data['latency'])
+                    latency.merge(histogram)
+                    latency_by_bot.setdefault(bot_id, LatencyHistogram()).merge(histogram)
+
+                if 'throughput' in data:
+                    interval = interval or data['throughput']['interval_seconds']
+                    for window, (sent, failed) in data['throughput']['windows'].items():
+                        counts = windows.setdefault(int(window), [0, 0])
+                        counts[0] += sent
+                        counts[1] += failed
+
                 aggregated['timeline'].append({
                     'timestamp': metric.timestamp.isoformat(),
                     'bot_id': bot_id,
-                    'metrics': data
+                    'metrics': {
+                        key: value for key, value in data.items()
+                        if key not in ('latency', 'throughput')
+                    }
                 })
 
+            if latency.count:
+                aggregated['latency'] = latency.summary()
+            for bot_id, histogram in latency_by_bot.items():
+                aggregated['bots'][bot_id]['latency'] = histogram.summary()
+            if windows:
+                aggregated['throughput'] = self._throughput_series(windows, interval, max_points)
+
+            if max_points:
+                aggregated['timeline'] = self._lttb(
+                    aggregated['timeline'],
+                    max_points,
+                    lambda point: datetime.fromisoformat(point['timestamp']).timestamp(),
+                    lambda point: point['metrics'].get('total_recipients', 0)
+                )
+
             return aggregated
         except Exception as e:
             logger.error(f'Error getting advertisement metrics: {str(e)}')
             raise
 
-    def export_bot_analytics(self, bot_id, format='csv', start_date=None, end_date=None):
-        """Export bot analytics in specified format"""
+    DEFAULT_MAX_POINTS = 500
+    MIN_POINTS = 3
+    MAX_POINTS_LIMIT = 5000
+
+    def _validate_max_points(self, max_points):
+        if max_points is not None and not self.MIN_POINTS <= max_points <= self.MAX_POINTS_LIMIT:
+            raise ValueError(
+                f'max_points must be between {self.MIN_POINTS} and {self.MAX_POINTS_LIMIT}'
+            )
+
+    def _bucket_hourly_activity(self, hourly_activity, max_points):
+        """Sum hourly stats into equal-width buckets, at most max_points of them.
+
+        Distinct counts cannot be summed across hours, so a bucket reports
+        the largest hourly value of those, a lower bound of its own.
+        Returns the bucketed map (keyed by bucket start, in the same format as
+        the hourly keys) and the bucket width in hours.
+        """
+        if not hourly_activity:
+            return hourly_activity, 1
+
+        hours = sorted(datetime.strptime(hour, '%Y-%m-%d %H:00') for hour in hourly_activity)
+        span = int((hours[-1] - hours[0]).total_seconds() // 3600) + 1
+        width = -(-span // max_points)
+        if width == 1:
+            return hourly_activity, 1
+
+        # Buckets are aligned to the first hour so the range splits evenly
+        buckets = {}
+        for hour in hours:
+            key = hour.strftime('%Y-%m-%d %H:00')
+            offset = int((hour - hours[0]).total_seconds() // 3600) // width * width
+            bucket_key = (hours[0] + timedelta(hours=offset)).strftime('%Y-%m-%d %H:00')
+            buckets[bucket_key] = self._sum_stats(buckets.get(bucket_key, {}), hourly_activity[key])
+        return buckets, width
+
+    # Hourly stats counting distinct users, which overlap between hours
+    DISTINCT_STATS = ('unique_users',)
+
+    def _sum_stats(self, total, stats):
+        """Add the numbers in stats (including nested dicts) into a copy of total"""
+        total = dict(total)
+        for name, value in stats.items():
+            if isinstance(value, dict):
+                total[name] = self._sum_stats(total.get(name, {}), value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                if name in self.DISTINCT_STATS:
+                    total[name] = max(total.get(name, 0), value)
+                else:
+                    total[name] = total.get(name, 0) + value
+        return total
+
+    def _throughput_series(self, windows, interval, max_points=None):
+        """Turn window -> [sent, failed] counts into a per-second series.
+
+        Windows are merged into wider ones when there are more than
+        max_points of them; empty windows in between are included.
+        """
+        first, last = min(windows), max(windows)
+        count = (last - first) // interval + 1
+        if max_points and count > max_points:
+            interval *= -(-count // max_points)
+
+        merged = {}
+        for window, (sent, failed) in windows.items():
+            start = first + (window - first) // interval * interval
+            counts = merged.setdefault(start, [0, 0])
+            counts[0] += sent
+            counts[1] += failed
+
+        series = []
+        for start in range(first, last + 1, interval):
+            sent, failed = merged.get(start, (0, 0))
+            series.append({
+                'timestamp': datetime.utcfromtimestamp(start).isoformat(),
+                'interval_seconds': interval,
+                'sent': sent,
+                'failed': failed,
+                'per_second': round((sent + failed) / interval, 2)
+            })
+        return series
+
+    def _lttb(self, points, threshold, x, y):
+        """Largest-Triangle-Three-Buckets downsampling.
+
+        Keeps the first and last points and, from each of threshold - 2 equal
+        buckets in between, the point forming the largest triangle with the
+        previously kept point and the average of the next bucket, so peaks
+        and dips survive. points must be sorted by x.
+        """
+        if len(points) <= threshold:
+            return points
+
+        xs = [x(point) for point in points]
+        ys = [y(point) for point in points]
+        sampled = [points[0]]
+        every = (len(points) - 2) / (threshold - 2)
+        previous = 0
+
+        for i in range(threshold - 2):
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+
+            next_start = end
+            next_end = min(int((i + 2) * every) + 1, len(points))
+            count = next_end - next_start
+            avg_x = sum(xs[next_start:next_end]) / count
+            avg_y = sum(ys[next_start:next_end]) / count
+
+            best, best_area = start, -1
+            for j in range(start, end):
+                area = abs(
+                    (xs[previous] - avg_x) * (ys[j] - ys[previous])
+                    - (xs[previous] - xs[j]) * (avg_y - ys[previous])
+                )
+                if area > best_area:
+                    best, best_area = j, area
+
+            sampled.append(points[best])
+            previous = best
+
+        sampled.append(points[-1])
+        return sampled
+
+    # format -> (file extension, MIME type)
+    EXPORT_FILE_TYPES = {
+        'csv': ('csv', 'text/csv'),
+        'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+        'json': ('json', 'application/json'),
+        'parquet': ('zip', 'application/zip')
+    }
+
+    # Formats that read their rows from the database in batches instead of
+    # being handed the fully loaded export data
+    STREAMING_EXPORT_FORMATS = {'excel', 'parquet'}
+
+    def export_bot_analytics(self, bot_id, format='csv', start_date=None, end_date=None,
+                             output=None, on_progress=None):
+        """Export bot analytics in specified format.
+
+        Streaming formats write into output (a binary file object) and return
+        None when it is given; otherwise they return the exported bytes.
+        """
         try:
             if format not in self.export_formats:
                 raise ValueError(f'Unsupported format: {format}')
+            start_date, end_date = self._export_range(start_date, end_date)
+
+            if format in self.STREAMING_EXPORT_FORMATS:
+                target = output or io.BytesIO()
+                self.export_formats[format](target, bot_id, start_date, end_date, on_progress)
+                return None if output else target.getvalue()
 
             # Get metrics
             metrics = self.get_bot_metrics(bot_id, start_date, end_date)
@@ -121,15 +691,7 @@ class AnalyticsService:
             ).all()
 
             # Get advertisements
-            ads = Advertisement.query.join(
-                Analytics,
-                and_(
-                    Analytics.metric_type == 'broadcast_metrics',
-                    Analytics.bot_id == bot_id
-                )
-            ).filter(
-                Advertisement.created_at.between(start_date, end_date)
-            ).all()
+            ads = self._get_export_advertisements(bot_id, start_date, end_date)
 
             # Prepare data for export
             export_data = {
@@ -144,6 +706,112 @@ class AnalyticsService:
             logger.error(f'Error exporting bot analytics: {str(e)}')
             raise
 
+    EXPORT_BATCH_SIZE = 5000
+    MESSAGE_EXPORT_COLUMNS = ['id', 'bot_id', 'chat_id', 'message_type', 'content', 'sent_at', 'status']
+
+    def _export_range(self, start_date, end_date):
+        if not start_date:
+            start_date = datetime.utcnow() - timedelta(days=30)
+        if not end_date:
+            end_date = datetime.utcnow()
+        return start_date, end_date
+
+    def _get_export_advertisements(self, bot_id, start_date, end_date):
+        broadcast_ad_ids = db.select(Analytics.ad_id).where(
+            Analytics.metric_type == 'broadcast_metrics',
+            Analytics.bot_id == bot_id,
+            Analytics.timestamp >= start_date
+        )
+        return Advertisement.query.filter(
+            Advertisement.id.in_(broadcast_ad_ids),
+            Advertisement.created_at.between(start_date, end_date)
+        ).all()
+
+    def iter_message_batches(self, bot_id, start_date, end_date, batch_size=None):
+        """Yield a bot's messages as lists of row dicts.
+
+        Rows are read through a server-side cursor, so only one batch is held
+        in memory at a time no matter how many messages are in the range.
+        """
+        columns = [getattr(Message, name) for name in self.MESSAGE_EXPORT_COLUMNS]
+        result = db.session.execute(
+            db.select(*columns).where(
+                Message.bot_id == bot_id,
+                Message.sent_at.between(start_date, end_date)
+            ).order_by(Message.sent_at).execution_options(
+                yield_per=batch_size or self.EXPORT_BATCH_SIZE
+            )
+        )
+        for rows in result.partitions():
+            yield [row._asdict() for row in rows]
+
+    def count_export_messages(self, bot_id, start_date=None, end_date=None):
+        """Count the messages an export of this range will contain"""
+        start_date, end_date = self._export_range(start_date, end_date)
+        return Message.query.filter(
+            Message.bot_id == bot_id,
+            Message.sent_at.between(start_date, end_date)
+        ).count()
+
+    def stream_bot_analytics_csv(self, bot_id, start_date=None, end_date=None, on_progress=None):
+        """Yield the CSV export of bot analytics in chunks.
+
+        Produces the same sections as _export_csv, but messages are streamed
+        batch by batch instead of being loaded into DataFrames. on_progress,
+        if given, is called with the number of messages written so far.
+        """
+        start_date, end_date = self._export_range(start_date, end_date)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+
+        def flush():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        try:
+            metrics = self.get_bot_metrics(bot_id, start_date, end_date)
+
+            writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Total Users', metrics['total_users']])
+            writer.writerow(['Total Messages', metrics['total_messages']])
+            buffer.write('\n')
+
+            writer.writerow(['Type', 'Count'])
+            writer.writerows(metrics['message_types'].items())
+            buffer.write('\n')
+
+            hourly_columns = list(dict.fromkeys(
+                key for values in metrics['hourly_activity'].values() for key in values
+            ))
+            writer.writerow(['Hour', *hourly_columns])
+            for hour, values in metrics['hourly_activity'].items():
+                writer.writerow([hour, *(values.get(key, '') for key in hourly_columns)])
+            buffer.write('\n')
+            yield flush()
+
+            writer.writerow(self.MESSAGE_EXPORT_COLUMNS)
+            exported = 0
+            for batch in self.iter_message_batches(bot_id, start_date, end_date):
+                for message in batch:
+                    message['sent_at'] = message['sent_at'].isoformat()
+                    writer.writerow(message.values())
+                yield flush()
+                exported += len(batch)
+                if on_progress:
+                    on_progress(exported)
+            buffer.write('\n')
+
+            ads = [ad.to_dict() for ad in self._get_export_advertisements(bot_id, start_date, end_date)]
+            if ads:
+                writer.writerow(ads[0].keys())
+                writer.writerows(ad.values() for ad in ads)
+            yield flush()
+        except Exception as e:
+            logger.error(f'Error streaming bot analytics export: {str(e)}')
+            raise
+
     def _export_csv(self, data):
         """Export data as CSV"""
         output = io.StringIO()
@@ -183,44 +851,200 @@ class AnalyticsService:
 
         return output.getvalue()
 
-    def _export_excel(self, data):
-        """Export data as Excel"""
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Export metrics
-            metrics_df = pd.DataFrame({
-                'Metric': ['Total Users', 'Total Messages'],
-                'Value': [data['metrics']['total_users'], data['metrics']['total_messages']]
-            })
-            metrics_df.to_excel(writer, sheet_name='Summary', index=False)
+    # Rows per worksheet, header included
+    EXCEL_MAX_ROWS = 1048576
 
-            # Export message types
-            msg_types_df = pd.DataFrame([
-                {'Type': k, 'Count': v}
-                for k, v in data['metrics']['message_types'].items()
-            ])
-            msg_types_df.to_excel(writer, sheet_name='Message Types', index=False)
+    def _export_excel(self, output, bot_id, start_date, end_date, on_progress=None):
+        """Export data as Excel.
 
-            # Export hourly activity
-            hourly_df = pd.DataFrame([
-                {'Hour': k, **v}
-                for k, v in data['metrics']['hourly_activity'].items()
+        Rows are written one at a time in xlsxwriter's constant-memory mode to
+        a temporary file, so peak memory does not depend on the export size.
+        Sheets longer than Excel's row limit continue on "<name> (2)", ...
+        """
+        metrics = self.get_bot_metrics(bot_id, start_date, end_date)
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+
+            self._write_excel_sheet(workbook, 'Summary', ['Metric', 'Value'], [
+                ['Total Users', metrics['total_users']],
+                ['Total Messages', metrics['total_messages']]
             ])
-            hourly_df.to_excel(writer, sheet_name='Hourly Activity', index=False)
+            self._write_excel_sheet(
+                workbook, 'Message Types', ['Type', 'Count'],
+                metrics['message_types'].items()
+            )
 
-            # Export messages
-            messages_df = pd.DataFrame(data['messages'])
-            messages_df.to_excel(writer, sheet_name='Messages', index=False)
+            hourly_columns = list(dict.fromkeys(
+                key for values in metrics['hourly_activity'].values() for key in values
+            ))
+            self._write_excel_sheet(workbook, 'Hourly Activity', ['Hour', *hourly_columns], (
+                [hour, *(values.get(key) for key in hourly_columns)]
+                for hour, values in metrics['hourly_activity'].items()
+            ))
 
-            # Export advertisements
-            ads_df = pd.DataFrame(data['advertisements'])
-            ads_df.to_excel(writer, sheet_name='Advertisements', index=False)
+            def message_rows():
+                exported = 0
+                for batch in self.iter_message_batches(bot_id, start_date, end_date):
+                    for message in batch:
+                        message['sent_at'] = message['sent_at'].isoformat()
+                        yield message.values()
+                    exported += len(batch)
+                    if on_progress:
+                        on_progress(exported)
 
-        return output.getvalue()
+            self._write_excel_sheet(workbook, 'Messages', self.MESSAGE_EXPORT_COLUMNS, message_rows())
+
+            ads = [ad.to_dict() for ad in self._get_export_advertisements(bot_id, start_date, end_date)]
+            self._write_excel_sheet(
+                workbook, 'Advertisements', list(ads[0]) if ads else [],
+                (ad.values() for ad in ads)
+            )
+
+            workbook.close()
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, output)
+        finally:
+            os.remove(path)
+
+    def _write_excel_sheet(self, workbook, name, columns, rows):
+        """Write a header and rows, starting a new sheet whenever one fills up"""
+        sheet = None
+        row_index = self.EXCEL_MAX_ROWS
+        part = 0
+        for row in rows:
+            if row_index >= self.EXCEL_MAX_ROWS:
+                part += 1
+                sheet = workbook.add_worksheet(name if part == 1 else f'{name} ({part})')
+                sheet.write_row(0, 0, columns)
+                row_index = 1
+            sheet.write_row(row_index, 0, [
+                value if value is None or isinstance(value, (str, int, float)) else str(value)
+                for value in row
+            ])
+            row_index += 1
+
+        if sheet is None:
+            workbook.add_worksheet(name).write_row(0, 0, columns)
 
     def _export_json(self, data):
         """Export data as JSON"""
         return data
 
+    def iter_metric_batches(self, bot_id, metric_type, start_date, end_date, batch_size=None):
+        """Yield a bot's Analytics rows of one type as lists of row dicts"""
+        result = db.session.execute(
+            db.select(
+                Analytics.id,
+                Analytics.bot_id,
+                Analytics.ad_id,
+                Analytics.timestamp,
+                Analytics.metric_value
+            ).where(
+                Analytics.bot_id == bot_id,
+                Analytics.metric_type == metric_type,
+                Analytics.timestamp.between(start_date, end_date)
+            ).order_by(Analytics.timestamp).execution_options(
+                yield_per=batch_size or self.EXPORT_BATCH_SIZE
+            )
+        )
+        for rows in result.partitions():
+            yield [row._asdict() for row in rows]
+
+    def _parquet_datasets(self, bot_id, start_date, end_date):
+        """Describe the Parquet export as (name, schema, row batches) triples.
+
+        metric_value payloads are flattened into typed columns; the per-type
+        message counts of hourly stats become one message_types_<type> column
+        per type seen in the range.
+        """
+        message_types = [row[0] for row in db.session.execute(
+            db.select(func.json_object_keys(Analytics.metric_value['message_types'])).where(
+                Analytics.bot_id == bot_id,
+                Analytics.metric_type == 'hourly_stats',
+                Analytics.timestamp.between(start_date, end_date)
+            ).distinct()
+        )]
+
+        def hourly_rows():
+            for batch in self.iter_metric_batches(bot_id, 'hourly_stats', start_date, end_date):
+                rows = []
+                for metric in batch:
+                    value = metric['metric_value']
+                    row = {
+                        'id': metric['id'],
+                        'bot_id': metric['bot_id'],
+                        'timestamp': metric['timestamp'],
+                        'total_updates': value.get('total_updates'),
+                        'unique_users': value.get('unique_users')
+                    }
+                    for msg_type, count in (value.get('message_types') or {}).items():
+                        row[f'message_types_{msg_type}'] = count
+                    rows.append(row)
+                yield rows
+
+        def broadcast_rows():
+            for batch in self.iter_metric_batches(bot_id, 'broadcast_metrics', start_date, end_date):
+                yield [{
+                    'id': metric['id'],
+                    'bot_id': metric['bot_id'],
+                    'ad_id': metric['ad_id'],
+                    'timestamp': metric['timestamp'],
+                    'total_recipients': metric['metric_value'].get('total_recipients'),
+                    'successful': metric['metric_value'].get('successful'),
+                    'failed': metric['metric_value'].get('failed')
+                } for metric in batch]
+
+        return [
+            ('messages', pa.schema([
+                ('id', pa.int64()),
+                ('bot_id', pa.int32()),
+                ('chat_id', pa.int64()),
+                ('message_type', pa.string()),
+                ('content', pa.string()),
+                ('sent_at', pa.timestamp('us')),
+                ('status', pa.string())
+            ]), self.iter_message_batches(bot_id, start_date, end_date)),
+            ('hourly_stats', pa.schema([
+                ('id', pa.int64()),
+                ('bot_id', pa.int32()),
+                ('timestamp', pa.timestamp('us')),
+                ('total_updates', pa.int64()),
+                ('unique_users', pa.int64()),
+                *((f'message_types_{msg_type}', pa.int64()) for msg_type in sorted(message_types))
+            ]), hourly_rows()),
+            ('broadcast_metrics', pa.schema([
+                ('id', pa.int64()),
+                ('bot_id', pa.int32()),
+                ('ad_id', pa.int32()),
+                ('timestamp', pa.timestamp('us')),
+                ('total_recipients', pa.int64()),
+                ('successful', pa.int64()),
+                ('failed', pa.int64())
+            ]), broadcast_rows())
+        ]
+
+    def _export_parquet(self, output, bot_id, start_date, end_date, on_progress=None):
+        """Export a zip holding one Parquet file per dataset.
+
+        Each batch read from the database becomes one row group, so memory
+        use is bounded by the batch size rather than the export size.
+        """
+        if pa is None:
+            raise ValueError('Parquet export requires pyarrow')
+
+        exported = 0
+        # Parquet is already compressed, so the zip only stores
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+            for name, schema, batches in self._parquet_datasets(bot_id, start_date, end_date):
+                with archive.open(f'{name}.parquet', 'w', force_zip64=True) as parquet_file:
+                    with pq.ParquetWriter(parquet_file, schema, compression='zstd') as writer:
+                        for batch in batches:
+                            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                            if name == 'messages':
+                                exported += len(batch)
+                                if on_progress:
+                                    on_progress(exported)
+
 analytics_service = AnalyticsService()
\ No newline at end of file
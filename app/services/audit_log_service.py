@@ -0,0 +1,107 @@
+import os
+import time
+import queue
+import atexit
+import threading
+import logging
+
+from flask import current_app, has_app_context
+
+from app.services.ingest_service import ingest_service
+
+logger = logging.getLogger(__name__)
+
+class AuditLogService:
+    """Non-blocking writer for the user_activities audit log.
+
+    Requests drop events into a bounded in-process buffer and return; a
+    background thread bulk-inserts them every batch_size events or
+    flush_interval seconds, whichever comes first. When the buffer is full,
+    when there is no app to write with, or when a bulk insert fails, events
+    go to the Redis ingest queue instead, so none are lost. Whatever is
+    still buffered is written when the process exits.
+    """
+
+    TABLE = 'user_activities'
+
+    def __init__(self):
+        self.max_buffer = int(os.getenv('AUDIT_LOG_BUFFER_SIZE', 10000))
+        self.batch_size = int(os.getenv('AUDIT_LOG_BATCH_SIZE', 500))
+        self.flush_interval = int(os.getenv('AUDIT_LOG_FLUSH_INTERVAL_MS', 1000)) / 1000
+        self.shutdown_timeout = 5
+        self._buffer = queue.Queue(maxsize=self.max_buffer)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._app = None
+
+    def log(self, row: dict):
+        """Buffer an activity row without waiting for the database"""
+        if not self._ensure_started():
+            ingest_service.add(self.TABLE, row)
+            return
+        try:
+            self._buffer.put_nowait(row)
+        except queue.Full:
+            logger.warning('Audit log buffer full, queueing event in Redis')
+            ingest_service.add(self.TABLE, row)
+
+    def shutdown(self):
+        """Stop the writer and write everything still buffered"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(self.shutdown_timeout)
+        while True:
+            batch = self._take(0)
+            if not batch:
+                break
+            self._write(batch)
+
+    def _ensure_started(self) -> bool:
+        if self._thread and self._thread.is_alive():
+            return True
+        if self._stopping.is_set() or not has_app_context():
+            return False
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                if self._app is None:
+                    atexit.register(self.shutdown)
+                self._app = current_app._get_current_object()
+                self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def _take(self, timeout: float) -> list:
+        """Collect up to batch_size rows, waiting at most timeout seconds"""
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    batch.append(self._buffer.get(timeout=remaining))
+                else:
+                    batch.append(self._buffer.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        with self._app.app_context():
+            try:
+                ingest_service.insert_rows(self.TABLE, batch)
+            except Exception as e:
+                logger.error(f'Error writing {len(batch)} audit events, queueing them in Redis: {str(e)}')
+                for row in batch:
+                    try:
+                        ingest_service.add(self.TABLE, row)
+                    except Exception as e:
+                        logger.error(f'Dropping audit event {row}: {str(e)}')
+
+audit_log_service = AuditLogService()
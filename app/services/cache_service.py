@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+class CacheService:
+    """Redis-backed JSON cache with stampede protection.
+
+    Redis failures never break a request: reads fall through to the compute
+    function and writes are skipped, so the cache only ever makes things
+    faster.
+    """
+
+    LOCK_SUFFIX = ':lock'
+
+    # KEYS: guard key, then the keys to set; ARGV: expected guard value
+    # ('' when unset), TTL, then the values
+    SET_IF_UNCHANGED = """
+        if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then
+            return 0
+        end
+        for i = 2, #KEYS do
+            redis.call('SET', KEYS[i], ARGV[i + 1], 'EX', ARGV[2])
+        end
+        return 1
+    """
+
+    def __init__(self):
+        self.redis = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://redis:6379/1'),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        self.default_ttl = int(os.getenv('CACHE_DEFAULT_TTL', 300))
+        self.lock_timeout = float(os.getenv('CACHE_LOCK_TIMEOUT', 10))
+        self.wait_interval = 0.05
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._set_if_unchanged = self.redis.register_script(self.SET_IF_UNCHANGED)
+
+    def record(self, namespace: str, event: str):
+        """Count a cache event under namespace"""
+        with self._stats_lock:
+            self._stats[f'{namespace}:{event}'] += 1
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters for this process"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss or Redis error"""
+        try:
+            value = self.redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f'Cache read failed for {key}: {str(e)}')
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Store a JSON-serializable value"""
+        try:
+            self.redis.set(key, json.dumps(value, default=str), ex=ttl or self.default_ttl)
+        except redis.RedisError as e:
+            logger.warning(f'Cache write failed for {key}: {str(e)}')
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several cached values in one round trip"""
+        if not keys:
+            return []
+        try:
+            values = self.redis.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f'Cache read failed for {len(keys)} keys: {str(e)}')
+            return [None] * len(keys)
+        return [json.loads(value) if value is not None else None for value in values]
+
+    def set_many(self, mapping: Dict[str, Any], ttl: Optional[int] = None):
+        """Store several JSON-serializable values in one round trip"""
+        if not mapping:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, json.dumps(value, default=str), ex=ttl or self.default_ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Cache write failed for {len(mapping)} keys: {str(e)}')
+
+    def set_many_if_unchanged(self, guard_key: str, expected: Optional[int],
+                              mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Store several values atomically, unless guard_key no longer holds expected.
+
+        expected is what get returned for guard_key before the values were
+        computed, so values built from data a writer has since replaced
+        (and announced with incr) are dropped. Returns whether they were
+        stored.
+        """
+        if not mapping:
+            return True
+        try:
+            return bool(self._set_if_unchanged(
+                keys=[guard_key, *mapping],
+                args=[
+                    '' if expected is None else str(expected),
+                    ttl or self.default_ttl,
+                    *(json.dumps(value, default=str) for value in mapping.values())
+                ]
+            ))
+        except redis.RedisError as e:
+            logger.warning(f'Cache write failed for {len(mapping)} keys: {str(e)}')
+            return False
+
+    def incr(self, keys: Iterable[str], ttl: Optional[int] = None):
+        """Increment counters, such as the guard keys of set_many_if_unchanged"""
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.incr(key)
+                pipe.expire(key, ttl or self.default_ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f'Cache increment failed: {str(e)}')
+
+    def delete(self, keys: Iterable[str]):
+        """Delete cached values"""
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            self.redis.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f'Cache delete failed: {str(e)}')
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       ttl: Optional[int] = None, namespace: str = 'default') -> Any:
+        """Return the cached value for key, computing it at most once on a miss.
+
+        Concurrent misses race for a short-lived lock; the winner computes and
+        stores the value while the others poll for it until the lock expires.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.record(namespace, 'hits')
+            return value
+        self.record(namespace, 'misses')
+
+        lock_key = key + self.LOCK_SUFFIX
+        try:
+            acquired = self.redis.set(lock_key, 1, nx=True, px=int(self.lock_timeout * 1000))
+        except redis.RedisError as e:
+            logger.warning(f'Cache lock failed for {key}: {str(e)}')
+            return compute()
+
+        if not acquired:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.wait_interval)
+                value = self.get(key)
+                if value is not None:
+                    self.record(namespace, 'waits')
+                    return value
+            self.record(namespace, 'lock_timeouts')
+            return compute()
+
+        try:
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            self.delete([lock_key])
+
+cache_service = CacheService()
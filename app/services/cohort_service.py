@@ -0,0 +1,217 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app import db
+from app.models.bot import Bot
+from app.models.cohort import BotSubscriber, CohortBitmap
+from app.models.message import Message
+from app.services.etag_service import etag_service
+
+logger = logging.getLogger(__name__)
+
+class CohortService:
+    """Weekly subscriber cohorts kept as bitmaps.
+
+    Subscribers are identified by chat id, which is what messages and
+    broadcasts record; in a private chat it is the user's id. Every chat a
+    bot sees gets a dense per-bot ordinal. For each week the bot stores one
+    bitmap of the ordinals first seen that week and one of the ordinals
+    active that week, both updated as activity is recorded. Retention for cohort W at week W+k is then the popcount of
+    first_seen[W] & active[W+k], with no scan over messages.
+    """
+
+    FIRST_SEEN = 'first_seen'
+    ACTIVE = 'active'
+    DEFAULT_WEEKS = 12
+    MAX_WEEKS = 104
+    BACKFILL_BATCH_SIZE = 10000
+    # First key of the two-key advisory locks taken per bot
+    LOCK_NAMESPACE = 40
+
+    def week_start(self, moment) -> date:
+        """Get the Monday starting moment's week"""
+        day = moment.date() if isinstance(moment, datetime) else moment
+        return day - timedelta(days=day.weekday())
+
+    def record_activity(self, bot_id: int, telegram_user_ids: Iterable[int], at: Optional[datetime] = None):
+        """Mark users as active for bot in at's week (default: now).
+
+        Users the bot has not seen before are numbered and join that week's
+        cohort; users first seen later than at move to the earlier cohort,
+        so backfills can arrive after live data.
+        """
+        telegram_user_ids = set(telegram_user_ids)
+        if not telegram_user_ids:
+            return
+
+        week = self.week_start(at or datetime.utcnow())
+        try:
+            # Serialize bitmap updates (and ordinal numbering) per bot
+            db.session.execute(
+                db.text('SELECT pg_advisory_xact_lock(:namespace, :key)'),
+                {'namespace': self.LOCK_NAMESPACE, 'key': bot_id}
+            )
+
+            known = {
+                subscriber.telegram_user_id: subscriber
+                for subscriber in BotSubscriber.query.filter(
+                    BotSubscriber.bot_id == bot_id,
+                    BotSubscriber.telegram_user_id.in_(telegram_user_ids)
+                )
+            }
+
+            new_ids = sorted(telegram_user_ids - known.keys())
+            next_ordinal = db.session.query(
+                func.coalesce(func.max(BotSubscriber.ordinal) + 1, 0)
+            ).filter(BotSubscriber.bot_id == bot_id).scalar()
+            if new_ids:
+                db.session.execute(insert(BotSubscriber), [{
+                    'bot_id': bot_id,
+                    'telegram_user_id': telegram_user_id,
+                    'ordinal': next_ordinal + i,
+                    'first_seen_week': week,
+                    'created_at': datetime.utcnow()
+                } for i, telegram_user_id in enumerate(new_ids)])
+
+            # Users first seen in a later week move to this week's cohort
+            joined = list(range(next_ordinal, next_ordinal + len(new_ids)))
+            left = {}
+            for subscriber in known.values():
+                if subscriber.first_seen_week > week:
+                    left.setdefault(subscriber.first_seen_week, []).append(subscriber.ordinal)
+                    joined.append(subscriber.ordinal)
+                    subscriber.first_seen_week = week
+
+            updates = {(week, self.ACTIVE): (
+                self._bits([subscriber.ordinal for subscriber in known.values()] + joined), 0
+            )}
+            if joined:
+                updates[(week, self.FIRST_SEEN)] = (self._bits(joined), 0)
+            for left_week, ordinals in left.items():
+                updates[(left_week, self.FIRST_SEEN)] = (0, self._bits(ordinals))
+
+            self._update_bitmaps(bot_id, updates)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f'Error recording cohort activity for bot {bot_id}: {str(e)}')
+            raise
+        etag_service.bump(self._etag_scope(bot_id))
+
+    def _etag_scope(self, bot_id: int) -> str:
+        return f'cohort:bot:{bot_id}'
+
+    def get_retention_version(self, bot_id: int, user_id: int) -> Optional[str]:
+        """Get the ETag version of a bot's retention, or None if it is not user_id's.
+
+        It changes with the week too, since the newest cohort is this week's.
+        """
+        if db.session.query(Bot.id).filter_by(id=bot_id, user_id=user_id).first() is None:
+            return None
+        version = etag_service.get_version(self._etag_scope(bot_id))
+        if version is None:
+            return None
+        return f'{version}:{self.week_start(datetime.utcnow()).isoformat()}'
+
+    def get_retention(self, bot_id: int, weeks: int = DEFAULT_WEEKS, until: Optional[datetime] = None) -> dict:
+        """Get the retention matrix for the cohorts of the last weeks weeks.
+
+        A cohort's retained[k] is how many of its users were active k weeks
+        after the week they were first seen.
+        """
+        if not 1 <= weeks <= self.MAX_WEEKS:
+            raise ValueError(f'weeks must be between 1 and {self.MAX_WEEKS}')
+
+        last_week = self.week_start(until or datetime.utcnow())
+        first_week = last_week - timedelta(weeks=weeks - 1)
+        bitmaps = CohortBitmap.query.filter(
+            CohortBitmap.bot_id == bot_id,
+            CohortBitmap.week.between(first_week, last_week)
+        ).all()
+
+        first_seen = {}
+        active = {}
+        for bitmap in bitmaps:
+            target = first_seen if bitmap.kind == self.FIRST_SEEN else active
+            target[bitmap.week] = int.from_bytes(bitmap.bitmap, 'little')
+
+        cohorts = []
+        for offset in range(weeks):
+            week = first_week + timedelta(weeks=offset)
+            cohort = first_seen.get(week, 0)
+            size = cohort.bit_count()
+            retained = [
+                (cohort & active.get(week + timedelta(weeks=k), 0)).bit_count()
+                for k in range(weeks - offset)
+            ]
+            cohorts.append({
+                'week': week.isoformat(),
+                'size': size,
+                'retained': retained,
+                'rates': [round(count / size * 100, 2) if size else 0 for count in retained]
+            })
+
+        return {
+            'bot_id': bot_id,
+            'weeks': weeks,
+            'cohorts': cohorts
+        }
+
+    def backfill(self, bot_id: int) -> int:
+        """Build cohorts from the messages table, oldest week first.
+
+        The weekly (week, chat) pairs are streamed on a connection of their
+        own, since every recorded week commits the session.
+        """
+        week = func.date_trunc('week', Message.sent_at).label('week')
+        query = db.select(week, Message.chat_id).where(
+            Message.bot_id == bot_id
+        ).group_by(week, Message.chat_id).order_by(week)
+
+        recorded = 0
+        current_week, chat_ids = None, []
+        with db.engine.connect() as conn:
+            result = conn.execution_options(yield_per=self.BACKFILL_BATCH_SIZE).execute(query)
+            for partition in result.partitions():
+                for row_week, chat_id in partition:
+                    if row_week != current_week and chat_ids:
+                        self.record_activity(bot_id, chat_ids, at=current_week)
+                        chat_ids = []
+                    current_week = row_week
+                    chat_ids.append(chat_id)
+                recorded += len(partition)
+        if chat_ids:
+            self.record_activity(bot_id, chat_ids, at=current_week)
+        return recorded
+
+    def _bits(self, ordinals: List[int]) -> int:
+        """Build a bitmap with the given ordinals set"""
+        if not ordinals:
+            return 0
+        buffer = bytearray(max(ordinals) // 8 + 1)
+        for ordinal in ordinals:
+            buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(buffer, 'little')
+
+    def _update_bitmaps(self, bot_id: int, updates: Dict[tuple, tuple]):
+        """Apply (bits to set, bits to clear) to each (week, kind) bitmap"""
+        existing = {
+            (bitmap.week, bitmap.kind): bitmap
+            for bitmap in CohortBitmap.query.filter(
+                CohortBitmap.bot_id == bot_id,
+                CohortBitmap.week.in_({week for week, _ in updates})
+            )
+        }
+        for (week, kind), (set_bits, clear_bits) in updates.items():
+            bitmap = existing.get((week, kind))
+            if bitmap is None:
+                bitmap = CohortBitmap(bot_id=bot_id, week=week, kind=kind, bitmap=b'')
+                db.session.add(bitmap)
+            value = (int.from_bytes(bitmap.bitmap, 'little') | set_bits) & ~clear_bits
+            bitmap.bitmap = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+cohort_service = CohortService()
@@ -0,0 +1,121 @@
+import os
+import uuid
+import hashlib
+import logging
+from functools import wraps
+from typing import Callable, Optional
+
+import redis
+from flask import request, make_response
+from sqlalchemy import func
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+class EtagService:
+    """Weak ETags built from cheap version markers, checked before a view runs.
+
+    A marker is either the count and latest updated_at of the rows behind
+    a resource, or a version token kept in Redis and replaced whenever a
+    writer bumps its scope.
+    A missing token is replaced by a fresh one rather than reset, so a
+    Redis flush can only change ETags, never repeat an old one.
+
+    When the marker cannot be read the request is served normally,
+    without an ETag.
+    """
+
+    KEY_PREFIX = 'etag:version:'
+
+    def __init__(self):
+        self.redis = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://redis:6379/1'),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        self.version_ttl = int(os.getenv('ETAG_VERSION_TTL', 7 * 24 * 3600))
+
+    def _key(self, scope: str) -> str:
+        return self.KEY_PREFIX + scope
+
+    def bump(self, *scopes: str):
+        """Change the version of scopes after their data changed"""
+        if not scopes:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for scope in scopes:
+                pipe.set(self._key(scope), uuid.uuid4().hex, ex=self.version_ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            # The version outlives its TTL at worst; readers then get a fresh one
+            logger.warning(f'Bumping ETag versions failed: {str(e)}')
+
+    def get_version(self, *scopes: str) -> Optional[str]:
+        """Get the combined version of scopes, or None if Redis is unavailable"""
+        keys = [self._key(scope) for scope in scopes]
+        try:
+            values = self.redis.mget(keys)
+            missing = [key for key, value in zip(keys, values) if value is None]
+            if missing:
+                pipe = self.redis.pipeline()
+                for key in missing:
+                    pipe.set(key, uuid.uuid4().hex, nx=True, ex=self.version_ttl)
+                pipe.execute()
+                values = self.redis.mget(keys)
+            return ':'.join(value.decode() for value in values)
+        except redis.RedisError as e:
+            logger.warning(f'Reading ETag versions failed: {str(e)}')
+            return None
+
+    def row_version(self, model, *criteria) -> str:
+        """Get the count and latest updated_at of model's rows matching criteria.
+
+        Every insert or update moves its row's updated_at forward and every
+        delete lowers the count, so the pair changes whenever the rows do.
+        """
+        count, latest = db.session.query(
+            func.count(),
+            func.max(model.updated_at)
+        ).select_from(model).filter(*criteria).one()
+        return f'{count}:{latest.isoformat() if latest else None}'
+
+    def make_etag(self, user_id: int, version: str) -> str:
+        """Hash version with the user and the request's path and arguments"""
+        digest = hashlib.sha1()
+        digest.update(f'{user_id}:'.encode())
+        digest.update(request.full_path.encode())
+        digest.update(version.encode())
+        return digest.hexdigest()
+
+    def conditional(self, get_version: Callable[..., Optional[str]]):
+        """Serve 304 to a matching If-None-Match before the view runs.
+
+        Goes below token_required. get_version is called with the view's
+        arguments, current_user first, and returns the resource's version
+        marker, or None to skip the ETag. It must return None for resources
+        current_user cannot see, so the view can refuse them.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(current_user, *args, **kwargs):
+                version = get_version(current_user, *args, **kwargs)
+                if version is None:
+                    return f(current_user, *args, **kwargs)
+
+                etag = self.make_etag(current_user.id, version)
+                if request.if_none_match.contains_weak(etag):
+                    response = make_response('', 304)
+                else:
+                    response = make_response(f(current_user, *args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag, weak=True)
+                # Clients keep the body but must revalidate before each use
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            return decorated
+        return decorator
+
+etag_service = EtagService()
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import uuid
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import redis
+from sqlalchemy import exc
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.services.partition_service import partition_service
+
+logger = logging.getLogger(__name__)
+
+class IngestService:
+    """Batched writer for append-only tables.
+
+    Writers push rows onto a per-table Redis list instead of committing each
+    one. A flush moves up to batch_size rows at a time onto a processing list,
+    inserts them in one statement and only then drops the processing list.
+    If a flusher dies mid-batch its rows stay on the processing list and the
+    next flush writes them first. Every row is given an ingest id when it is
+    queued and inserts skip ids already written, so a batch replayed after a
+    crash, or after some of its rows were committed, writes each row once.
+
+    Flushes run on a schedule every flush_interval seconds, and a writer that
+    fills a batch flushes it itself. Once a queue holds max_queue rows,
+    writers block (helping to flush) until it drains, so a slow database
+    pushes back on producers instead of growing Redis without bound. If
+    Redis is unavailable rows are inserted directly.
+
+    Every committed batch of a published table is also announced on a Redis
+    channel, tagged with the id of the transaction that wrote it.
+    """
+
+    TABLES = ('analytics', 'user_activities')
+    PUBLISHED_TABLES = ('analytics',)
+    QUEUE_PREFIX = 'ingest:'
+    PROCESSING_SUFFIX = ':processing'
+    LOCK_SUFFIX = ':lock'
+    # Dialects whose inserts can skip rows that conflict with a unique index
+    INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+    def __init__(self):
+        self.redis = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://redis:6379/1'),
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        self.batch_size = int(os.getenv('INGEST_BATCH_SIZE', 500))
+        self.flush_interval = int(os.getenv('INGEST_FLUSH_INTERVAL_MS', 1000)) / 1000
+        self.max_queue = int(os.getenv('INGEST_MAX_QUEUE', 100000))
+        self.backpressure_timeout = float(os.getenv('INGEST_BACKPRESSURE_TIMEOUT', 5))
+        self.lock_timeout = 30
+        self.wait_interval = 0.05
+        self._listeners = defaultdict(list)
+
+    def _queue_key(self, table: str) -> str:
+        return self.QUEUE_PREFIX + table
+
+    def channel(self, table: str) -> str:
+        """Get the pub/sub channel written batches of table are announced on"""
+        return self.QUEUE_PREFIX + table + ':written'
+
+    def add_flush_listener(self, table: str, listener: Callable[[List[dict]], None]):
+        """Call listener with the rows of every batch written to table"""
+        self._listeners[table].append(listener)
+
+    def add(self, table: str, row: dict):
+        """Queue a row for insertion into table"""
+        if table not in self.TABLES:
+            raise ValueError(f'Unsupported ingest table: {table}')
+
+        row = {**row, 'ingest_id': row.get('ingest_id') or uuid.uuid4().hex}
+        payload = json.dumps(row, default=self._encode)
+        queue = self._queue_key(table)
+        try:
+            length = self.redis.rpush(queue, payload)
+        except redis.RedisError as e:
+            logger.warning(f'Ingest queue unavailable for {table}, writing directly: {str(e)}')
+            self.insert_rows(table, [json.loads(payload)])
+            return
+
+        if length >= self.max_queue:
+            self._wait_for_queue(table, length)
+        elif length >= self.batch_size:
+            self.flush(table, max_batches=1)
+
+    def _wait_for_queue(self, table: str, length: int):
+        """Block the writer, helping to flush, until the queue has room"""
+        queue = self._queue_key(table)
+        deadline = time.monotonic() + self.backpressure_timeout
+        try:
+            while length >= self.max_queue:
+                if time.monotonic() >= deadline:
+                    logger.warning(f'Ingest queue for {table} still holds {length} rows')
+                    return
+                if not self.flush(table, max_batches=1):
+                    time.sleep(self.wait_interval)
+                length = self.redis.llen(queue)
+        except redis.RedisError as e:
+            logger.warning(f'Ingest backpressure check failed for {table}: {str(e)}')
+
+    def flush(self, table: str, max_batches: Optional[int] = None) -> int:
+        """Write queued rows for table in batches; returns rows written.
+
+        Returns 0 without waiting if another process is already flushing.
+        """
+        queue = self._queue_key(table)
+        processing = queue + self.PROCESSING_SUFFIX
+        lock_key = queue + self.LOCK_SUFFIX
+        lock_ms = int(self.lock_timeout * 1000)
+
+        try:
+            if not self.redis.set(lock_key, 1, nx=True, px=lock_ms):
+                return 0
+        except redis.RedisError as e:
+            logger.warning(f'Ingest flush lock failed for {table}: {str(e)}')
+            return 0
+
+        written = 0
+        try:
+            # Rows left behind by a flusher that died mid-batch go first
+            pending = self.redis.lrange(processing, 0, -1)
+            if pending:
+                written += self._write_batch(table, processing, pending)
+
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                pipe = self.redis.pipeline(transaction=False)
+                for _ in range(self.batch_size):
+                    pipe.lmove(queue, processing, 'LEFT', 'RIGHT')
+                payloads = [payload for payload in pipe.execute() if payload is not None]
+                if not payloads:
+                    break
+
+                written += self._write_batch(table, processing, payloads)
+                batches += 1
+                self.redis.pexpire(lock_key, lock_ms)
+                if len(payloads) < self.batch_size:
+                    break
+        except redis.RedisError as e:
+            logger.warning(f'Ingest flush failed for {table}: {str(e)}')
+        finally:
+            try:
+                self.redis.delete(lock_key)
+            except redis.RedisError:
+                pass
+
+        return written
+
+    def flush_all(self) -> Dict[str, int]:
+        """Flush every ingest queue"""
+        return {table: self.flush(table) for table in self.TABLES}
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of queued rows per table"""
+        pipe = self.redis.pipeline(transaction=False)
+        for table in self.TABLES:
+            pipe.llen(self._queue_key(table))
+        return dict(zip(self.TABLES, pipe.execute()))
+
+    def _write_batch(self, table: str, processing: str, payloads: List[bytes]) -> int:
+        rows = [json.loads(payload) for payload in payloads]
+        written = self.insert_rows(table, rows)
+        self.redis.delete(processing)
+        return written
+
+    def insert_rows(self, table: str, rows: List[dict]) -> int:
+        """Insert rows into table, grouped by their column set.
+
+        Rows are written in transactions of their own on a separate
+        connection, leaving the caller's session alone. Rows whose ingest id
+        is already in the table are skipped; returns the number of rows
+        actually written. Connection failures and rows without a partition
+        propagate so the rows are retried by the next flush; other rows the
+        database rejects are logged and dropped so a single bad row cannot
+        stall the queue.
+        """
+        target = db.metadata.tables[table]
+        rows = [self._decode(target, row) for row in rows]
+        groups = defaultdict(list)
+        for row in rows:
+            row.setdefault('ingest_id', uuid.uuid4().hex)
+            groups[tuple(sorted(row))].append(row)
+
+        try:
+            with db.engine.begin() as conn:
+                inserted = set()
+                for group in groups.values():
+                    inserted.update(self._insert(conn, target, group))
+                xid = self._current_xid(conn, table)
+            written = [row for row in rows if row['ingest_id'] in inserted]
+            self._publish(table, xid, written)
+        except (exc.OperationalError, exc.InterfaceError):
+            raise
+        except exc.SQLAlchemyError as e:
+            self._check_partition(table, e)
+            logger.error(f'Batch insert into {table} failed, retrying row by row: {str(e)}')
+            written = []
+            for row in rows:
+                try:
+                    with db.engine.begin() as conn:
+                        inserted = self._insert(conn, target, [row])
+                        xid = self._current_xid(conn, table)
+                    if inserted:
+                        self._publish(table, xid, [row])
+                        written.append(row)
+                except (exc.OperationalError, exc.InterfaceError):
+                    raise
+                except exc.SQLAlchemyError as e:
+                    self._check_partition(table, e)
+                    logger.error(f'Dropping {table} row {row}: {str(e)}')
+
+        for listener in self._listeners[table]:
+            try:
+                listener(written)
+            except Exception as e:
+                logger.error(f'Ingest flush listener failed for {table}: {str(e)}')
+        return len(written)
+
+    def _insert(self, conn, target, rows: List[dict]) -> List[str]:
+        """Insert rows with the same columns; returns the ingest ids written"""
+        insert = self.INSERTS[conn.dialect.name](target).values(rows)
+        result = conn.execute(insert.on_conflict_do_nothing().returning(target.c.ingest_id))
+        return [ingest_id for ingest_id, in result]
+
+    def _check_partition(self, table: str, error: exc.SQLAlchemyError):
+        """Create missing partitions and re-raise if error is for lack of one"""
+        if 'no partition of relation' not in str(error):
+            return
+        logger.error(f'No partition for {table} rows, keeping them queued: {str(error)}')
+        partition_service.ensure_partitions()
+        raise error
+
+    def _current_xid(self, conn, table: str) -> Optional[str]:
+        if table not in self.PUBLISHED_TABLES:
+            return None
+        return conn.execute(db.text('SELECT pg_current_xact_id()::text')).scalar()
+
+    def _publish(self, table: str, xid: Optional[str], rows: List[dict]):
+        if table not in self.PUBLISHED_TABLES or not rows:
+            return
+        try:
+            self.redis.publish(
+                self.channel(table),
+                json.dumps({'xid': xid, 'rows': rows}, default=self._encode)
+            )
+        except redis.RedisError as e:
+            logger.warning(f'Publishing written {table} rows failed: {str(e)}')
+
+    def _encode(self, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    def _decode(self, target, row: dict) -> dict:
+        for column in target.columns:
+            value = row.get(column.name)
+            if isinstance(value, str) and isinstance(column.type, db.DateTime):
+                row[column.name] = datetime.fromisoformat(value)
+        return row
+
+ingest_service = IngestService()
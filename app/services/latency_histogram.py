@@ -0,0 +1,92 @@
+import math
+from typing import Dict, Optional
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram that merges by adding bucket counts.
+
+    Bucket i covers [BASE_MS * GROWTH**i, BASE_MS * GROWTH**(i + 1))
+    milliseconds, so percentiles are accurate to within GROWTH - 1 (5%)
+    whatever the range, and a histogram is at most a few hundred integers.
+    """
+
+    BASE_MS = 1.0
+    GROWTH = 1.05
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+
+    def record(self, latency_ms: float):
+        """Add one observation"""
+        if latency_ms <= self.BASE_MS:
+            index = 0
+        else:
+            index = int(math.log(latency_ms / self.BASE_MS) / math.log(self.GROWTH))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum_ms += latency_ms
+        self.min_ms = latency_ms if self.min_ms is None else min(self.min_ms, latency_ms)
+        self.max_ms = latency_ms if self.max_ms is None else max(self.max_ms, latency_ms)
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add other's observations to this histogram"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        if other.min_ms is not None:
+            self.min_ms = other.min_ms if self.min_ms is None else min(self.min_ms, other.min_ms)
+        if other.max_ms is not None:
+            self.max_ms = other.max_ms if self.max_ms is None else max(self.max_ms, other.max_ms)
+        return self
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Get the latency below which percentile % of observations fall"""
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                # Geometric middle of the bucket, kept within what was observed
+                value = self.BASE_MS * self.GROWTH ** (index + 0.5)
+                return round(min(max(value, self.min_ms), self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def summary(self) -> dict:
+        """Get count, mean, extremes and p50/p90/p99 in milliseconds"""
+        summary = {
+            'count': self.count,
+            'mean_ms': round(self.sum_ms / self.count, 2) if self.count else None,
+            'min_ms': round(self.min_ms, 2) if self.min_ms is not None else None,
+            'max_ms': round(self.max_ms, 2) if self.max_ms is not None else None
+        }
+        for percentile in self.PERCENTILES:
+            summary[f'p{percentile}_ms'] = self.percentile(percentile)
+        return summary
+
+    def to_dict(self) -> dict:
+        return {
+            'counts': {str(index): count for index, count in self.counts.items()},
+            'count': self.count,
+            'sum_ms': self.sum_ms,
+            'min_ms': self.min_ms,
+            'max_ms': self.max_ms
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> 'LatencyHistogram':
+        histogram = cls()
+        if data:
+            histogram.counts = {int(index): count for index, count in data.get('counts', {}).items()}
+            histogram.count = data.get('count', 0)
+            histogram.sum_ms = data.get('sum_ms', 0.0)
+            histogram.min_ms = data.get('min_ms')
+            histogram.max_ms = data.get('max_ms')
+        return histogram
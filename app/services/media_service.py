@@ -1,12 +1,15 @@
 import os
 import uuid
+import shutil
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from flask import current_app
 import boto3
 from botocore.exceptions import ClientError
 import logging
 from typing import Optional, Tuple, List
 import mimetypes
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +31,15 @@ class MediaService:
                 region_name=os.getenv('AWS_REGION')
             )
             self.bucket_name = os.getenv('S3_BUCKET_NAME')
-        else:
-            self.upload_folder = os.path.join(current_app.root_path, 'uploads')
-            os.makedirs(self.upload_folder, exist_ok=True)
+        self._upload_folder = None
+
+    @property
+    def upload_folder(self) -> str:
+        """Local upload folder, resolved on first use inside an app context"""
+        if self._upload_folder is None:
+            self._upload_folder = os.path.join(current_app.root_path, 'uploads')
+            os.makedirs(self._upload_folder, exist_ok=True)
+        return self._upload_folder
 
     def allowed_file(self, filename: str) -> Tuple[bool, Optional[str]]:
         """Check if the file extension is allowed"""
@@ -48,14 +57,15 @@ class MediaService:
         mime_type, _ = mimetypes.guess_type(filename)
         return mime_type or 'application/octet-stream'
 
-    def save_file(self, file, filename: str) -> Tuple[str, str, str]:
-        """Save file and return URL, media type, and MIME type"""
+    def save_file(self, file, filename: str, owner_id: int) -> Tuple[str, str, str]:
+        """Save owner_id's file and return URL, media type, and MIME type"""
         allowed, media_type = self.allowed_file(filename)
         if not allowed:
             raise ValueError('File type not allowed')
 
         secure_name = secure_filename(filename)
-        unique_filename = f"{uuid.uuid4()}_{secure_name}"
+        # Files live under their owner's id, which is how ownership is checked
+        unique_filename = f"{owner_id}/{uuid.uuid4()}_{secure_name}"
         mime_type = self.get_mime_type(filename)
 
         if self.storage_type == 's3':
@@ -88,26 +98,110 @@ class MediaService:
     def _save_to_local(self, file, filename: str) -> str:
         """Save file locally and return URL"""
         file_path = os.path.join(self.upload_folder, filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         file.save(file_path)
         
         # Return URL for local file
         return f"/uploads/{filename}"
 
+    def save_export(self, file_path: str, filename: str, mime_type: str) -> str:
+        """Store a generated export file and return its storage key.
+
+        Exports hold user data, so unlike uploaded media they are kept private
+        and only handed out through get_export_url.
+        """
+        key = f"exports/{secure_filename(filename)}"
+        if self.storage_type == 's3':
+            try:
+                self.s3_client.upload_file(
+                    file_path,
+                    self.bucket_name,
+                    key,
+                    ExtraArgs={'ContentType': mime_type}
+                )
+            except ClientError as e:
+                logger.error(f"Error uploading export to S3: {str(e)}")
+                raise
+        else:
+            export_path = os.path.join(self.upload_folder, key)
+            os.makedirs(os.path.dirname(export_path), exist_ok=True)
+            shutil.copyfile(file_path, export_path)
+        return key
+
+    def get_export_url(self, key: str, expires_in: int = 3600) -> Optional[str]:
+        """Get a presigned download URL for a stored export.
+
+        Returns None for local storage, where the app serves the file
+        from get_export_path itself.
+        """
+        if self.storage_type == 's3':
+            return self.s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': key},
+                ExpiresIn=expires_in
+            )
+        return None
+
+    def get_export_path(self, key: str) -> str:
+        """Get the local path of a stored export"""
+        return os.path.join(self.upload_folder, key)
+
+    def delete_exports_before(self, cutoff: datetime) -> List[str]:
+        """Delete stored exports last written before cutoff (UTC); returns their keys"""
+        deleted = []
+        if self.storage_type == 's3':
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix='exports/'):
+                keys = [
+                    obj['Key'] for obj in page.get('Contents', [])
+                    if obj['LastModified'].replace(tzinfo=None) < cutoff
+                ]
+                if keys:
+                    self.s3_client.delete_objects(
+                        Bucket=self.bucket_name,
+                        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+                    )
+                    deleted.extend(keys)
+        else:
+            export_dir = os.path.join(self.upload_folder, 'exports')
+            if not os.path.isdir(export_dir):
+                return deleted
+            for entry in os.scandir(export_dir):
+                if entry.is_file() and datetime.utcfromtimestamp(entry.stat().st_mtime) < cutoff:
+                    os.remove(entry.path)
+                    deleted.append(f'exports/{entry.name}')
+        return deleted
+
+    def get_key(self, url: str) -> Optional[str]:
+        """Get the storage key of a media URL, or None if it is not ours"""
+        if self.storage_type == 's3':
+            prefix = f"https://{self.bucket_name}.s3.amazonaws.com/"
+        else:
+            prefix = '/uploads/'
+        if not url.startswith(prefix):
+            return None
+        return url[len(prefix):]
+
+    def get_owner_id(self, key: str) -> Optional[int]:
+        """Get the id of the user who uploaded key, if known"""
+        owner, _, _ = key.partition('/')
+        return int(owner) if owner.isdigit() else None
+
     def delete_file(self, url: str) -> bool:
         """Delete file from storage"""
         try:
+            key = self.get_key(url)
+            if key is None:
+                return True
             if self.storage_type == 's3':
-                filename = url.split('/')[-1]
                 self.s3_client.delete_object(
                     Bucket=self.bucket_name,
-                    Key=filename
+                    Key=key
                 )
             else:
-                if url.startswith('/uploads/'):
-                    filename = url.split('/')[-1]
-                    file_path = os.path.join(self.upload_folder, filename)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                file_path = safe_join(self.upload_folder, key)
+                if file_path and os.path.exists(file_path):
+                    os.remove(file_path)
             return True
         except Exception as e:
             logger.error(f"Error deleting file: {str(e)}")
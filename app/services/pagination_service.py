@@ -0,0 +1,114 @@
+import json
+import base64
+import logging
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import literal, tuple_
+from sqlalchemy.sql.elements import Label
+from sqlalchemy.dialects import postgresql
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+class PaginationService:
+    """Keyset pagination over indexed sort keys.
+
+    A page is the next limit rows after the last row of the previous page,
+    found by comparing the sort keys as one row value, so the database
+    seeks straight to the page through the index however deep it is. The
+    cursor handed to clients is that last row's sort keys, base64-encoded;
+    the last key must be unique so rows are never skipped or repeated.
+    A computed key is passed as a Label named after the attribute that
+    holds its value on each row.
+
+    Totals are opt-in: 'exact' runs a COUNT(*), 'estimate' reads the
+    planner's row estimate, which costs no table scan.
+    """
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+    TOTAL_MODES = ('exact', 'estimate')
+
+    def paginate(self, query, keys: Sequence, cursor: Optional[str] = None,
+                 limit: int = DEFAULT_LIMIT, descending: bool = False,
+                 total: Optional[str] = None) -> dict:
+        """Get one page of query ordered by keys.
+
+        Returns the page's items and the cursor of the next page, which is
+        None on the last page. Raises ValueError for a bad cursor, limit or
+        total mode.
+        """
+        if not 1 <= limit <= self.MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {self.MAX_LIMIT}')
+        if total is not None and total not in self.TOTAL_MODES:
+            raise ValueError(f'total must be one of: {", ".join(self.TOTAL_MODES)}')
+
+        page = {}
+        if total == 'exact':
+            page['total'] = query.order_by(None).count()
+        elif total == 'estimate':
+            page['total'] = self.estimate_count(query)
+
+        expressions = [key.element if isinstance(key, Label) else key for key in keys]
+        if cursor:
+            after = tuple_(*expressions)
+            # Bound with each key's type, so every dialect compares like with like
+            position = tuple_(*[
+                literal(value, key.type) for key, value in zip(keys, self.decode_cursor(cursor, keys))
+            ])
+            query = query.filter(after < position if descending else after > position)
+
+        order = [key.desc() if descending else key.asc() for key in expressions]
+        rows = query.order_by(None).order_by(*order).limit(limit + 1).all()
+
+        items = rows[:limit]
+        page['items'] = items
+        page['next_cursor'] = self.encode_cursor(items[-1], keys) if len(rows) > limit else None
+        return page
+
+    def estimate_count(self, query) -> Optional[int]:
+        """Get the planner's row estimate for query, or None if unavailable"""
+        try:
+            statement = query.order_by(None).statement.compile(
+                dialect=postgresql.dialect(),
+                compile_kwargs={'literal_binds': True}
+            )
+            plan = db.session.execute(
+                db.text(f'EXPLAIN (FORMAT JSON) {statement}')
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            logger.warning(f'Row estimate failed: {str(e)}')
+            return None
+
+    def encode_cursor(self, row, keys: Sequence) -> str:
+        values = []
+        for key in keys:
+            value = getattr(row, key.key)
+            values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str, keys: Sequence) -> list:
+        """Get the sort key values in cursor, typed like keys"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded))
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise ValueError
+            decoded = []
+            for key, value in zip(keys, values):
+                python_type = key.type.python_type
+                if python_type in (date, datetime):
+                    value = python_type.fromisoformat(value)
+                elif not isinstance(value, python_type):
+                    value = python_type(value)
+                decoded.append(value)
+            return decoded
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+
+pagination_service = PaginationService()
@@ -0,0 +1,149 @@
+import os
+import re
+import logging
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import text
+from app import db
+
+logger = logging.getLogger(__name__)
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month: datetime, months: int) -> datetime:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return month.replace(year=month.year + years, month=month_index + 1)
+
+class PartitionService:
+    """Maintain the monthly range partitions of analytics and messages.
+
+    Partitions are named ``<table>_yYYYYmMM`` and cover one calendar month
+    (UTC). Rows outside every monthly partition land in ``<table>_default``
+    rather than being rejected, and get moved into their month's partition
+    once it is created. Retention is enforced by dropping whole partitions,
+    which avoids the bloat and vacuum cost of bulk DELETEs.
+    """
+
+    # table -> partition column
+    PARTITIONED_TABLES = {'analytics': 'timestamp', 'messages': 'sent_at'}
+    PARTITION_NAME = re.compile(r'^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$')
+
+    def __init__(self):
+        self.months_ahead = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+        self.retention_months = {
+            'analytics': int(os.getenv('ANALYTICS_RETENTION_MONTHS', 24)),
+            'messages': int(os.getenv('MESSAGES_RETENTION_MONTHS', 12))
+        }
+
+    def partition_name(self, table: str, month: datetime) -> str:
+        return f'{table}_y{month:%Y}m{month:%m}'
+
+    def default_partition_name(self, table: str) -> str:
+        return f'{table}_default'
+
+    def get_partitions(self, table: str) -> List[str]:
+        """Get the names of a table's partitions"""
+        rows = db.session.execute(text(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = :table ORDER BY child.relname'
+        ), {'table': table}).all()
+        return [row[0] for row in rows]
+
+    def ensure_partitions(self, now: Optional[datetime] = None) -> List[str]:
+        """Create partitions from the current month up to months_ahead.
+
+        Months with rows in the default partition get their partition too,
+        so those rows fall under retention again.
+        """
+        current = month_start(now or datetime.utcnow())
+        created = []
+        try:
+            for table in self.PARTITIONED_TABLES:
+                existing = set(self.get_partitions(table))
+                default = self.default_partition_name(table)
+                months = {add_months(current, offset) for offset in range(self.months_ahead + 1)}
+                if default in existing:
+                    months.update(self._get_default_months(table))
+                else:
+                    db.session.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT'
+                    ))
+                    created.append(default)
+
+                for month in sorted(months):
+                    name = self.partition_name(table, month)
+                    if name in existing:
+                        continue
+                    self._create_partition(table, name, month)
+                    created.append(name)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f'Error creating partitions: {str(e)}')
+            raise
+
+        if created:
+            logger.info(f'Created partitions: {", ".join(created)}')
+        return created
+
+    def _get_default_months(self, table: str) -> List[datetime]:
+        column = self.PARTITIONED_TABLES[table]
+        rows = db.session.execute(text(
+            f'SELECT DISTINCT date_trunc(\'month\', "{column}") '
+            f'FROM {self.default_partition_name(table)}'
+        )).all()
+        return [row[0] for row in rows]
+
+    def _create_partition(self, table: str, name: str, month: datetime):
+        """Create month's partition, moving its rows out of the default one.
+
+        A partition cannot be created while the default partition holds rows
+        in its range, so it is filled as a plain table and then attached.
+        """
+        column = self.PARTITIONED_TABLES[table]
+        bounds = {'start': month, 'end': add_months(month, 1)}
+        db.session.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        db.session.execute(text(
+            f'WITH moved AS (DELETE FROM {self.default_partition_name(table)} '
+            f'WHERE "{column}" >= :start AND "{column}" < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ), bounds)
+        db.session.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start'].isoformat()}') "
+            f"TO ('{bounds['end'].isoformat()}')"
+        ))
+
+    def drop_expired_partitions(self, now: Optional[datetime] = None) -> List[str]:
+        """Drop partitions that lie entirely before each table's retention window"""
+        current = month_start(now or datetime.utcnow())
+        dropped = []
+        try:
+            for table in self.PARTITIONED_TABLES:
+                cutoff = add_months(current, -self.retention_months[table])
+                for name in self.get_partitions(table):
+                    match = self.PARTITION_NAME.match(name)
+                    if not match or match.group('table') != table:
+                        continue
+                    month = datetime(int(match.group('year')), int(match.group('month')), 1)
+                    if add_months(month, 1) > cutoff:
+                        continue
+                    db.session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {name}'))
+                    db.session.execute(text(f'DROP TABLE {name}'))
+                    dropped.append(name)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f'Error dropping expired partitions: {str(e)}')
+            raise
+
+        if dropped:
+            logger.info(f'Dropped expired partitions: {", ".join(dropped)}')
+        return dropped
+
+partition_service = PartitionService()
@@ -0,0 +1,168 @@
+import os
+import hmac
+import time
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.models.user import User, UserApiKey
+from app.services.cache_service import cache_service
+from app.services.activity_tracker_service import activity_tracker_service
+
+logger = logging.getLogger(__name__)
+
+class PrincipalCacheService:
+    """Two-tier cache of authenticated users, keyed by public_id.
+
+    A small in-process LRU answers most lookups without any network round
+    trip; misses fall through to Redis and then to the database. A cached
+    user is attached to the session without a query, so routes can still
+    modify it and load its relationships lazily.
+
+    The password hash is never cached; it is loaded on first access.
+    Invalidation clears Redis and this process's LRU, and other processes'
+    LRU entries expire within local_ttl seconds.
+
+    API keys are cached the same way by prefix, so a machine client's
+    request costs one HMAC and two dictionary lookups.
+    """
+
+    CACHED_COLUMNS = (
+        'id', 'public_id', 'username', 'email', 'created_at',
+        'role', 'status', 'last_login', 'last_active'
+    )
+    DATETIME_COLUMNS = ('created_at', 'last_login', 'last_active')
+
+    def __init__(self):
+        self.ttl = int(os.getenv('PRINCIPAL_CACHE_TTL', 300))
+        self.local_ttl = float(os.getenv('PRINCIPAL_CACHE_LOCAL_TTL', 10))
+        self.max_size = int(os.getenv('PRINCIPAL_CACHE_SIZE', 1024))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, public_id: str) -> str:
+        return f'auth:principal:{public_id}'
+
+    def _api_key_cache_key(self, prefix: str) -> str:
+        return f'auth:api_key:{prefix}'
+
+    def get_user(self, public_id: str) -> Optional[User]:
+        """Get the user for public_id, from cache when possible"""
+        user = None
+
+        def load():
+            nonlocal user
+            user = User.query.filter_by(public_id=public_id).first()
+            return self._serialize(user) if user else None
+
+        data = self._get(self._cache_key(public_id), load)
+        if data is None:
+            return None
+        return user or self._attach(data)
+
+    def get_api_key_user(self, key: str) -> Optional[User]:
+        """Get the user owning a presented API key, or None if it is not valid"""
+        parsed = UserApiKey.parse(key)
+        if not parsed:
+            return None
+        prefix, secret = parsed
+
+        def load():
+            row = db.session.query(
+                UserApiKey.id, UserApiKey.key_hash, UserApiKey.expires_at, User.public_id
+            ).join(User, User.id == UserApiKey.user_id).filter(UserApiKey.prefix == prefix).first()
+            if not row:
+                return None
+            return {
+                'id': row.id,
+                'key_hash': row.key_hash,
+                'expires_at': row.expires_at.isoformat() if row.expires_at else None,
+                'public_id': row.public_id
+            }
+
+        data = self._get(self._api_key_cache_key(prefix), load, namespace='api_key')
+        if data is None or not hmac.compare_digest(UserApiKey.hash_secret(secret), data['key_hash']):
+            return None
+        if data['expires_at'] and datetime.fromisoformat(data['expires_at']) <= datetime.utcnow():
+            return None
+
+        activity_tracker_service.touch_api_key(data['id'])
+        return self.get_user(data['public_id'])
+
+    def invalidate(self, public_id: str):
+        """Drop a user after their role, status or credentials changed"""
+        self._delete(self._cache_key(public_id))
+
+    def invalidate_api_key(self, prefix: Optional[str]):
+        """Drop an API key after it was deleted"""
+        if prefix:
+            self._delete(self._api_key_cache_key(prefix))
+
+    def _get(self, key: str, load, namespace: str = 'principal') -> Optional[dict]:
+        """Look key up in the LRU, then Redis, then load() it"""
+        data = self._get_local(key)
+        if data is not None:
+            cache_service.record(namespace, 'local_hits')
+            return data
+
+        data = cache_service.get(key)
+        if data is not None:
+            cache_service.record(namespace, 'hits')
+            self._set_local(key, data)
+            return data
+
+        cache_service.record(namespace, 'misses')
+        data = load()
+        if data is not None:
+            cache_service.set(key, data, ttl=self.ttl)
+            self._set_local(key, data)
+        return data
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._local.pop(key, None)
+        cache_service.delete([key])
+
+    def _get_local(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return data
+
+    def _set_local(self, key: str, data: dict):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, data)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def _serialize(self, user: User) -> dict:
+        data = {column: getattr(user, column) for column in self.CACHED_COLUMNS}
+        for column in self.DATETIME_COLUMNS:
+            if data[column] is not None:
+                data[column] = data[column].isoformat()
+        return data
+
+    def _attach(self, data: dict) -> User:
+        """Rebuild a persistent User from cached columns without a query"""
+        user = User.__mapper__.class_manager.new_instance()
+        for column in self.CACHED_COLUMNS:
+            value = data.get(column)
+            if column in self.DATETIME_COLUMNS and value is not None:
+                value = datetime.fromisoformat(value)
+            setattr(user, column, value)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+principal_cache_service = PrincipalCacheService()
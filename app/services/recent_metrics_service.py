@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import redis
+from sqlalchemy import func, literal, null
+
+from app import db
+from app.models.analytics import Analytics
+from app.services.ingest_service import ingest_service
+
+logger = logging.getLogger(__name__)
+
+class RecentMetricsService:
+    """Per-minute dashboard counters for the last 24 hours, held in memory.
+
+    Counters live in NumPy ring buffers indexed by minute, one row per bot
+    (and per bot and message type), so a dashboard total is a single
+    vectorized sum. Each process warms its rings from the database once and
+    then follows the batches the ingest flusher announces on Redis. Batches
+    whose transaction was already visible to the warm-up snapshot are
+    skipped, so nothing is counted twice.
+
+    If the subscription drops the rings are marked stale, and callers fall
+    back to the database until the next warm-up. Only the request that
+    starts the listener waits for it to subscribe; while it is down, callers
+    fall back at once and the listener retries with exponential backoff.
+    """
+
+    WINDOW_MINUTES = 24 * 60
+    # users, users rows, messages, messages rows, failed
+    USERS, USERS_ROWS, MESSAGES, MESSAGES_ROWS, FAILED = range(5)
+    CHANNELS = 5
+
+    def __init__(self):
+        self.enabled = os.getenv('RECENT_METRICS_ENABLED', 'true').lower() == 'true'
+        self.redis_url = os.getenv('REDIS_URL', 'redis://redis:6379/1')
+        self.subscribe_timeout = 1.0
+        self.retry_interval = 1.0
+        self.max_retry_interval = 60.0
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._thread = None
+        self._ready = False
+        self._snapshot = None
+        self._pending = None
+        self._reset()
+
+    def _reset(self):
+        self._bot_index = {}
+        self._counts = np.zeros((0, self.CHANNELS, self.WINDOW_MINUTES), dtype=np.int64)
+        self._type_index = {}
+        self._types = np.zeros((0, self.WINDOW_MINUTES), dtype=np.int64)
+        self._head = self._epoch_minute(datetime.utcnow())
+
+    def _epoch_minute(self, moment: datetime) -> int:
+        return int(moment.replace(tzinfo=timezone.utc).timestamp() // 60)
+
+    def get_counts(self, bot_ids: Iterable[int]) -> Optional[List[tuple]]:
+        """Get last-24h dashboard rows for bot_ids, or None if not available.
+
+        Rows have the same shape as AnalyticsService._dashboard_query.
+        """
+        if not self._ensure_ready():
+            return None
+
+        bot_ids = list(bot_ids)
+        with self._lock:
+            self._advance(self._epoch_minute(datetime.utcnow()))
+
+            rows = []
+            known = sorted(bot_id for bot_id in bot_ids if bot_id in self._bot_index)
+            if known:
+                totals = self._counts[[self._bot_index[bot_id] for bot_id in known]].sum(axis=2)
+                for bot_id, total in zip(known, totals.tolist()):
+                    if total[self.USERS_ROWS]:
+                        rows.append((bot_id, 'users', None, total[self.USERS], 0))
+                    if total[self.MESSAGES_ROWS]:
+                        rows.append((bot_id, 'messages', None, total[self.MESSAGES], total[self.FAILED]))
+
+            wanted = set(bot_ids)
+            type_rows = {}
+            for (bot_id, message_type), index in self._type_index.items():
+                if bot_id in wanted:
+                    type_rows.setdefault(message_type, []).append(index)
+            for message_type, indexes in type_rows.items():
+                rows.append((None, 'message_types', message_type, int(self._types[indexes].sum()), 0))
+
+            return rows
+
+    def _ensure_ready(self) -> bool:
+        if not self.enabled:
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self._subscribed.clear()
+            self._thread = threading.Thread(target=self._listen, name='recent-metrics', daemon=True)
+            self._thread.start()
+            self._subscribed.wait(self.subscribe_timeout)
+        if self._ready:
+            return True
+        if not self._subscribed.is_set():
+            return False
+
+        # One warm-up per process at a time; other requests use the database
+        if not self._warm_lock.acquire(blocking=False):
+            return False
+        try:
+            self._warm()
+        except Exception as e:
+            logger.error(f'Error warming recent metrics: {str(e)}')
+            with self._lock:
+                self._pending = None
+        finally:
+            self._warm_lock.release()
+        return self._ready
+
+    def _warm(self):
+        """Load the last 24h from the database under a single snapshot"""
+        with self._lock:
+            self._pending = []
+
+        now = datetime.utcnow()
+        since = now.replace(second=0, microsecond=0) - timedelta(minutes=self.WINDOW_MINUTES - 1)
+        with db.engine.connect().execution_options(isolation_level='REPEATABLE READ') as conn:
+            snapshot = conn.execute(db.text('SELECT pg_current_snapshot()::text')).scalar()
+            rows = conn.execute(self._warm_query(since)).all()
+
+        with self._lock:
+            self._reset()
+            self._head = self._epoch_minute(now)
+            for bot_id, metric_type, message_type, minute, count, failed, row_count in rows:
+                slot = self._epoch_minute(minute) % self.WINDOW_MINUTES
+                if message_type is not None:
+                    type_row = self._type_row(bot_id, message_type)
+                    self._types[type_row, slot] += count
+                    continue
+                bot_row = self._bot_row(bot_id)
+                counts = self._counts[bot_row]
+                if metric_type == 'users':
+                    counts[self.USERS, slot] += count
+                    counts[self.USERS_ROWS, slot] += row_count
+                else:
+                    counts[self.MESSAGES, slot] += count
+                    counts[self.MESSAGES_ROWS, slot] += row_count
+                    counts[self.FAILED, slot] += failed
+
+            self._snapshot = self._parse_snapshot(snapshot)
+            pending, self._pending = self._pending, None
+            for xid, batch in pending:
+                self._apply(xid, batch)
+            self._ready = True
+
+    def _warm_query(self, since: datetime):
+        """Per-minute sums in the shape of the dashboard query, plus row counts"""
+        minute = func.date_trunc('minute', Analytics.timestamp).label('minute')
+        in_range = Analytics.timestamp >= since
+
+        per_bot = db.select(
+            Analytics.bot_id,
+            Analytics.metric_type,
+            null().label('message_type'),
+            minute,
+            func.coalesce(func.sum(Analytics.metric_value['count'].as_integer()), 0),
+            func.coalesce(func.sum(Analytics.metric_value['failed'].as_integer()), 0),
+            func.count()
+        ).where(
+            in_range,
+            Analytics.metric_type.in_(['users', 'messages'])
+        ).group_by(Analytics.bot_id, Analytics.metric_type, minute)
+
+        types = func.json_each_text(
+            Analytics.metric_value['types']
+        ).table_valued('key', 'value').lateral()
+        per_type = db.select(
+            Analytics.bot_id,
+            literal('message_types'),
+            types.c.key,
+            minute,
+            func.sum(types.c.value.cast(db.Integer)),
+            literal(0),
+            literal(0)
+        ).select_from(Analytics).join(types, db.true()).where(
+            in_range,
+            Analytics.metric_type == 'messages'
+        ).group_by(Analytics.bot_id, types.c.key, minute)
+
+        return per_bot.union_all(per_type)
+
+    def _listen(self):
+        """Follow written analytics batches until the connection drops"""
+        client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=0.5, health_check_interval=30)
+        failures = 0
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(ingest_service.channel('analytics'))
+                pubsub.get_message(timeout=self.subscribe_timeout)
+                self._subscribed.set()
+                failures = 0
+                for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    batch = json.loads(message['data'])
+                    with self._lock:
+                        if self._pending is not None:
+                            self._pending.append((batch['xid'], batch['rows']))
+                        elif self._ready:
+                            self._apply(batch['xid'], batch['rows'])
+            except Exception as e:
+                logger.warning(f'Recent metrics subscription lost: {str(e)}')
+            with self._lock:
+                self._subscribed.clear()
+                self._ready = False
+            failures += 1
+            time.sleep(self._retry_delay(failures))
+
+    def _retry_delay(self, failures: int) -> float:
+        """Seconds to wait before resubscribing after failures failed attempts"""
+        return min(self.retry_interval * 2 ** (failures - 1), self.max_retry_interval)
+
+    def _apply(self, xid: Optional[str], rows: List[dict]):
+        """Add a written batch unless the warm-up already counted it"""
+        if xid is not None and self._visible_in_snapshot(int(xid)):
+            return
+
+        self._advance(self._epoch_minute(datetime.utcnow()))
+        for row in rows:
+            if row['metric_type'] not in ('users', 'messages'):
+                continue
+            minute = self._epoch_minute(datetime.fromisoformat(row['timestamp']))
+            if minute > self._head or minute <= self._head - self.WINDOW_MINUTES:
+                continue
+
+            slot = minute % self.WINDOW_MINUTES
+            value = row['metric_value']
+            bot_row = self._bot_row(row['bot_id'])
+            counts = self._counts[bot_row]
+            if row['metric_type'] == 'users':
+                counts[self.USERS, slot] += value.get('count', 0)
+                counts[self.USERS_ROWS, slot] += 1
+            else:
+                counts[self.MESSAGES, slot] += value.get('count', 0)
+                counts[self.MESSAGES_ROWS, slot] += 1
+                counts[self.FAILED, slot] += value.get('failed', 0)
+                for message_type, count in (value.get('types') or {}).items():
+                    type_row = self._type_row(row['bot_id'], message_type)
+                    self._types[type_row, slot] += int(count)
+
+    def _advance(self, minute: int):
+        """Move the ring head to minute, clearing the slots it passes"""
+        if minute <= self._head:
+            return
+        if minute - self._head >= self.WINDOW_MINUTES:
+            self._counts[:] = 0
+            self._types[:] = 0
+        else:
+            slots = np.arange(self._head + 1, minute + 1) % self.WINDOW_MINUTES
+            self._counts[:, :, slots] = 0
+            self._types[:, slots] = 0
+        self._head = minute
+
+    def _bot_row(self, bot_id: int) -> int:
+        if bot_id not in self._bot_index:
+            self._bot_index[bot_id] = len(self._bot_index)
+            if len(self._bot_index) > len(self._counts):
+                self._counts = self._grow(self._counts)
+        return self._bot_index[bot_id]
+
+    def _type_row(self, bot_id: int, message_type: str) -> int:
+        key = (bot_id, message_type)
+        if key not in self._type_index:
+            self._type_index[key] = len(self._type_index)
+            if len(self._type_index) > len(self._types):
+                self._types = self._grow(self._types)
+        return self._type_index[key]
+
+    def _grow(self, array):
+        """Double the first dimension of array"""
+        extra = np.zeros((max(len(array), 16),) + array.shape[1:], dtype=array.dtype)
+        return np.concatenate([array, extra])
+
+    def _parse_snapshot(self, snapshot: str) -> Dict:
+        xmin, xmax, xip = snapshot.split(':')
+        return {
+            'xmin': int(xmin),
+            'xmax': int(xmax),
+            'xip': {int(xid) for xid in xip.split(',') if xid}
+        }
+
+    def _visible_in_snapshot(self, xid: int) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False
+        if xid < snapshot['xmin']:
+            return True
+        return xid < snapshot['xmax'] and xid not in snapshot['xip']
+
+recent_metrics_service = RecentMetricsService()
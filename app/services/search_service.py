@@ -0,0 +1,73 @@
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import Float, cast, func, or_
+from sqlalchemy.orm import with_expression
+
+from app.models.user import User
+from app.models.bot import Bot
+from app.models.advertisement import Advertisement
+from app.services.pagination_service import pagination_service
+
+logger = logging.getLogger(__name__)
+
+class SearchService:
+    """Ranked substring search over usernames, bot names and ad content.
+
+    Matches are rows containing the term, or containing a word similar to
+    it, both answered from the pg_trgm GIN indexes of migration 010 rather
+    than a scan. Results are ranked by word_similarity and paginated with
+    keyset cursors over (rank, id); a result's rank is set on its
+    search_rank attribute.
+    """
+
+    MIN_TERM_LENGTH = 3
+    # kind -> (model, searched column)
+    SEARCHABLE = {
+        'users': (User, User.username),
+        'bots': (Bot, Bot.bot_name),
+        'advertisements': (Advertisement, Advertisement.content)
+    }
+
+    def search(self, kind: str, term: str, owner_id: Optional[int] = None,
+               cursor: Optional[str] = None, limit: int = pagination_service.DEFAULT_LIMIT,
+               total: Optional[str] = None, options: Sequence = ()) -> dict:
+        """Get a page of kind matching term, best matches first.
+
+        Bots and advertisements are limited to owner_id's when given;
+        options are extra loader options for the results.
+        Raises ValueError for an unknown kind or a term shorter than
+        MIN_TERM_LENGTH, which trigrams cannot narrow down.
+        """
+        if kind not in self.SEARCHABLE:
+            raise ValueError(f'Cannot search {kind}; use one of: {", ".join(self.SEARCHABLE)}')
+        term = (term or '').strip()
+        if len(term) < self.MIN_TERM_LENGTH:
+            raise ValueError(f'Search term must be at least {self.MIN_TERM_LENGTH} characters')
+
+        model, column = self.SEARCHABLE[kind]
+        # Double precision, so a rank survives the round trip through a cursor
+        rank = cast(func.word_similarity(term, column), Float).label('search_rank')
+        query = model.query.options(
+            with_expression(model.search_rank, rank.element), *options
+        ).filter(or_(
+            column.ilike(f'%{self._escape_like(term)}%', escape='\\'),
+            # term <% column: some word of column is similar to term
+            column.op('%>')(term)
+        ))
+        if owner_id is not None and kind != 'users':
+            query = query.filter(model.user_id == owner_id)
+
+        return pagination_service.paginate(
+            query,
+            (rank, model.id),
+            cursor=cursor,
+            limit=limit,
+            descending=True,
+            total=total
+        )
+
+    def _escape_like(self, term: str) -> str:
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+search_service = SearchService()
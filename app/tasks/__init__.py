@@ -1,20 +1,69 @@
 from celery import Celery
+from flask import has_app_context
 import os
 
-def create_celery(app=None):
-    celery = Celery(
-        'telegram_bot_ui',
-        broker=os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0'),
-        backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0'),
-        include=['app.tasks.bot_tasks']
-    )
-
-    class ContextTask(celery.Task):
-        def __call__(self, *args, **kwargs):
-            if app:
-                with app.app_context():
-                    return self.run(*args, **kwargs)
+TASK_MODULES = [
+    'app.tasks.bot_tasks',
+    'app.tasks.ad_tasks',
+    'app.tasks.analytics_tasks',
+    'app.tasks.user_tasks'
+]
+
+# One Celery app shared by every task module, so the worker and beat see
+# every task and the whole schedule whichever module -A points at
+celery = Celery(
+    'telegram_bot_ui',
+    broker=os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0'),
+    backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0'),
+    include=TASK_MODULES
+)
+
+celery.conf.beat_schedule = {
+    'check_scheduled_broadcasts': {
+        'task': 'app.tasks.ad_tasks.process_scheduled_broadcasts',
+        'schedule': 60.0
+    },
+    # Partitions are created months ahead, so daily is plenty
+    'maintain_partitions': {
+        'task': 'app.tasks.analytics_tasks.maintain_partitions',
+        'schedule': 24 * 3600.0
+    },
+    'delete_expired_exports': {
+        'task': 'app.tasks.analytics_tasks.delete_expired_exports',
+        'schedule': 3600.0
+    },
+    'flush_ingest_queues': {
+        'task': 'app.tasks.analytics_tasks.flush_ingest_queues',
+        'schedule': int(os.getenv('INGEST_FLUSH_INTERVAL_MS', 1000)) / 1000
+    },
+    'flush_activity': {
+        'task': 'app.tasks.user_tasks.flush_activity',
+        'schedule': float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 60))
+    }
+}
+
+_flask_app = None
+
+def get_flask_app():
+    """Get the Flask app tasks run in, creating it on first use"""
+    global _flask_app
+    if _flask_app is None:
+        from app import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+class ContextTask(celery.Task):
+    def __call__(self, *args, **kwargs):
+        if has_app_context():
+            return self.run(*args, **kwargs)
+        with get_flask_app().app_context():
             return self.run(*args, **kwargs)
 
-    celery.Task = ContextTask
-    return celery
\ No newline at end of file
+celery.Task = ContextTask
+
+def create_celery(app=None):
+    """Get the shared Celery app; with app, tasks run in its context"""
+    global _flask_app
+    if app is not None:
+        _flask_app = app
+    return celery
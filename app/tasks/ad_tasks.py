@@ -1,10 +1,12 @@
 from app.tasks import create_celery
 from app.models.advertisement import Advertisement
 from app.models.bot import Bot
-from app.models.analytics import Analytics
+from app.services.ingest_service import ingest_service
+from app.services.latency_histogram import LatencyHistogram
 from app import db
 from datetime import datetime
 import json
+import time
 import logging
 import telegram
 from telegram.error import TelegramError
@@ -13,6 +15,9 @@ from celery.schedules import crontab
 celery = create_celery()
 logger = logging.getLogger(__name__)
 
+# Width of the windows broadcast throughput is counted in
+THROUGHPUT_INTERVAL = 10
+
 @celery.task(bind=True, max_retries=3)
 def broadcast_advertisement(self, ad_id, bot_ids=None):
     try:
@@ -46,9 +51,14 @@ def broadcast_advertisement(self, ad_id, bot_ids=None):
                     'successful': 0,
                     'failed': 0
                 }
+                latency = LatencyHistogram()
+                # window start (epoch seconds) -> [sent, failed]
+                throughput = {}
+                started_at = time.time()
 
                 # Send message to each chat
                 for chat_id in chat_ids:
+                    send_started = time.perf_counter()
                     try:
                         # Handle different message types
                         if ad.media_urls:
@@ -62,10 +72,23 @@ def broadcast_advertisement(self, ad_id, bot_ids=None):
                                 parse_mode='HTML'
                             )
                         broadcast_metrics['successful'] += 1
+                        outcome = 0
                     except Exception as e:
                         broadcast_metrics['failed'] += 1
+                        outcome = 1
                         logger.error(f'Error sending message to chat {chat_id}: {str(e)}')
 
+                    latency.record((time.perf_counter() - send_started) * 1000)
+                    window = str(int(time.time() // THROUGHPUT_INTERVAL * THROUGHPUT_INTERVAL))
+                    throughput.setdefault(window, [0, 0])[outcome] += 1
+
+                broadcast_metrics['duration_seconds'] = round(time.time() - started_at, 3)
+                broadcast_metrics['latency'] = latency.to_dict()
+                broadcast_metrics['throughput'] = {
+                    'interval_seconds': THROUGHPUT_INTERVAL,
+                    'windows': throughput
+                }
+
                 # Save broadcast metrics
                 save_broadcast_metrics(ad.id, bot.id, broadcast_metrics)
                 
@@ -103,18 +126,19 @@ def send_media_message(bot, chat_id, ad):
             bot.send_document(chat_id=chat_id, document=media_url, caption=ad.content)
 
 def save_broadcast_metrics(ad_id, bot_id, metrics):
-    """Save metrics for the broadcast"""
-    analytics = Analytics(
-        bot_id=bot_id,
-        metric_type='broadcast_metrics',
-        metric_value={
+    """Queue metrics for the broadcast"""
+    now = datetime.utcnow()
+    ingest_service.add('analytics', {
+        'bot_id': bot_id,
+        'metric_type': 'broadcast_metrics',
+        'ad_id': ad_id,
+        'metric_value': {
             'ad_id': ad_id,
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': now.isoformat(),
             **metrics
-        }
-    )
-    db.session.add(analytics)
-    db.session.commit()
+        },
+        'timestamp': now
+    })
 
 @celery.task
 def process_scheduled_broadcasts():
@@ -130,16 +154,6 @@ def process_scheduled_broadcasts():
     for ad in scheduled_ads:
         broadcast_advertisement.delay(ad.id, ad.target_bots)
 
-# Schedule periodic tasks
-@celery.on_after_finalize.connect
-def setup_periodic_tasks(sender, **kwargs):
-    # Check for scheduled broadcasts every minute
-    sender.add_periodic_task(
-        60.0,
-        process_scheduled_broadcasts.s(),
-        name='check_scheduled_broadcasts'
-    )
-
 def get_bot_chat_ids(bot_id):
     """Get all chat IDs for a bot"""
     # TODO: Implement this function to get chat IDs from the database
@@ -0,0 +1,211 @@
+from app.tasks import create_celery, get_flask_app
+from app.services.partition_service import partition_service
+from app.services.analytics_service import analytics_service
+from app.services.cache_service import cache_service
+from app.services.media_service import media_service
+from app.services.ingest_service import ingest_service
+from app.services.cohort_service import cohort_service
+from celery.signals import worker_shutting_down
+from datetime import datetime, timedelta
+import json
+import os
+import tempfile
+import time
+import uuid
+import logging
+
+celery = create_celery()
+logger = logging.getLogger(__name__)
+
+EXPORT_JOB_TTL = 7 * 24 * 3600
+EXPORT_PROGRESS_INTERVAL = 1.0
+
+@celery.task
+def maintain_partitions():
+    """Create upcoming monthly partitions and drop expired ones"""
+    try:
+        return {
+            'created': partition_service.ensure_partitions(),
+            'dropped': partition_service.drop_expired_partitions()
+        }
+    except Exception as e:
+        logger.error(f'Error maintaining partitions: {str(e)}')
+        raise
+
+@celery.task
+def flush_ingest_queues():
+    """Write queued analytics and activity rows in batches"""
+    try:
+        return ingest_service.flush_all()
+    except Exception as e:
+        logger.error(f'Error flushing ingest queues: {str(e)}')
+        raise
+
+@worker_shutting_down.connect
+def drain_ingest_queues(**kwargs):
+    """Write whatever is still queued before the worker exits"""
+    try:
+        with get_flask_app().app_context():
+            ingest_service.flush_all()
+    except Exception as e:
+        logger.error(f'Error draining ingest queues on shutdown: {str(e)}')
+
+@celery.task
+def backfill_cohorts(bot_id):
+    """Build a bot's retention cohorts from its stored messages"""
+    try:
+        return {'recorded': cohort_service.backfill(bot_id)}
+    except Exception as e:
+        logger.error(f'Error backfilling cohorts for bot {bot_id}: {str(e)}')
+        raise
+
+@celery.task
+def delete_expired_exports():
+    """Delete export files whose jobs have expired"""
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=EXPORT_JOB_TTL)
+        return {'deleted': media_service.delete_exports_before(cutoff)}
+    except Exception as e:
+        logger.error(f'Error deleting expired exports: {str(e)}')
+        raise
+
+@celery.task(bind=True)
+def export_bot_analytics(self, bot_id, format, start_date=None, end_date=None):
+    """Write a bot analytics export to storage and record where it went"""
+    job_id = self.request.id
+    try:
+        start_date = datetime.fromisoformat(start_date) if start_date else None
+        end_date = datetime.fromisoformat(end_date) if end_date else None
+        extension, mime_type = analytics_service.EXPORT_FILE_TYPES[format]
+        filename = f'bot_{bot_id}_analytics_{job_id}.{extension}'
+
+        total = analytics_service.count_export_messages(bot_id, start_date, end_date)
+        last_update = 0
+
+        def report_progress(exported):
+            nonlocal last_update
+            if time.monotonic() - last_update >= EXPORT_PROGRESS_INTERVAL:
+                self.update_state(state='PROGRESS', meta={'exported': exported, 'total': total})
+                last_update = time.monotonic()
+
+        report_progress(0)
+        fd, path = tempfile.mkstemp(suffix=f'.{extension}')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if format == 'csv':
+                    for chunk in analytics_service.stream_bot_analytics_csv(
+                        bot_id, start_date, end_date, on_progress=report_progress
+                    ):
+                        f.write(chunk.encode('utf-8'))
+                elif format in analytics_service.STREAMING_EXPORT_FORMATS:
+                    analytics_service.export_bot_analytics(
+                        bot_id, format=format, start_date=start_date, end_date=end_date,
+                        output=f, on_progress=report_progress
+                    )
+                else:
+                    data = analytics_service.export_bot_analytics(
+                        bot_id, format=format, start_date=start_date, end_date=end_date
+                    )
+                    if format == 'json':
+                        data = json.dumps(data, default=str).encode('utf-8')
+                    f.write(data)
+
+            storage_key = media_service.save_export(path, filename, mime_type)
+        finally:
+            os.remove(path)
+
+        result = {'storage_key': storage_key, 'filename': filename, 'mime_type': mime_type}
+        _update_export_job(job_id, result)
+        return result
+    except Exception as e:
+        logger.error(f'Error exporting analytics for bot {bot_id}: {str(e)}')
+        _update_export_job(job_id, {'failed': True})
+        raise
+
+def _export_job_key(job_id):
+    return f'analytics:export:job:{job_id}'
+
+def _update_export_job(job_id, fields):
+    """Record a finished job's outcome, which outlives its Celery result"""
+    job = cache_service.get(_export_job_key(job_id))
+    if job:
+        cache_service.set(_export_job_key(job_id), {**job, **fields}, ttl=EXPORT_JOB_TTL)
+
+def _export_params_key(bot_id, format, start_date, end_date):
+    return f'analytics:export:{bot_id}:{format}:{start_date.isoformat()}:{end_date.isoformat()}'
+
+def submit_export(user_id, bot_id, format, start_date=None, end_date=None):
+    """Start an export job and return its id.
+
+    Exports of a range that has already ended cannot change, so a running or
+    finished job with the same parameters is reused instead of starting over.
+    Export files are deleted by delete_expired_exports once the job expires.
+    """
+    if format not in analytics_service.EXPORT_FILE_TYPES:
+        raise ValueError(f'Unsupported format: {format}')
+
+    params_key = None
+    if start_date and end_date and end_date <= datetime.utcnow():
+        params_key = _export_params_key(bot_id, format, start_date, end_date)
+        job_id = cache_service.get(params_key)
+        job = cache_service.get(_export_job_key(job_id)) if job_id else None
+        if job and not job.get('failed'):
+            return job_id
+
+    # The job is recorded before it starts, so its outcome always has a home
+    job_id = str(uuid.uuid4())
+    cache_service.set(_export_job_key(job_id), {
+        'user_id': user_id,
+        'bot_id': bot_id,
+        'format': format
+    }, ttl=EXPORT_JOB_TTL)
+    export_bot_analytics.apply_async(args=(
+        bot_id,
+        format,
+        start_date.isoformat() if start_date else None,
+        end_date.isoformat() if end_date else None
+    ), task_id=job_id)
+    if params_key:
+        cache_service.set(params_key, job_id, ttl=EXPORT_JOB_TTL)
+    return job_id
+
+def _get_export_job(user_id, job_id):
+    """Get a user's export job with its result once finished, or None"""
+    job = cache_service.get(_export_job_key(job_id))
+    if not job or job['user_id'] != user_id:
+        return None
+
+    if job.get('storage_key'):
+        job['status'] = 'success'
+    elif job.get('failed'):
+        job['status'] = 'failure'
+    else:
+        result = export_bot_analytics.AsyncResult(job_id)
+        job['status'] = result.state.lower()
+        if result.state == 'PROGRESS':
+            job['progress'] = result.info
+        elif result.state == 'SUCCESS':
+            job.update(result.result)
+    return job
+
+def get_export_status(user_id, job_id):
+    """Get the status of a user's export job, or None if it is unknown"""
+    job = _get_export_job(user_id, job_id)
+    if not job:
+        return None
+
+    status = {'job_id': job_id, 'bot_id': job['bot_id'], 'format': job['format'], 'status': job['status']}
+    if 'progress' in job:
+        status['progress'] = job['progress']
+    if job['status'] == 'success':
+        status['filename'] = job['filename']
+        # Downloads go through the app, which checks the job is the user's
+        status['download_url'] = f'/api/analytics/exports/{job_id}/file'
+    return status
+
+def get_export_file(user_id, job_id):
+    """Get the storage key, filename and MIME type of a user's finished export"""
+    job = _get_export_job(user_id, job_id)
+    if not job or job['status'] != 'success':
+        return None
+    return {key: job[key] for key in ('storage_key', 'filename', 'mime_type')}
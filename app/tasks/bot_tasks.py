@@ -1,6 +1,8 @@
 from app.tasks import create_celery
 from app.models.bot import Bot
-from app.models.analytics import Analytics
+from app.services.analytics_service import analytics_service
+from app.services.ingest_service import ingest_service
+from app.services.cohort_service import cohort_service
 from app import db
 from datetime import datetime
 import json
@@ -28,6 +30,7 @@ def start_bot(self, bot_id):
         bot.status = 'running'
         bot.last_active = datetime.utcnow()
         db.session.commit()
+        analytics_service.invalidate_dashboard(bot.user_id)
 
         # Start metrics collection
         collect_bot_metrics.delay(bot_id)
@@ -54,6 +57,7 @@ def stop_bot(self, bot_id):
         # Update bot status
         bot.status = 'stopped'
         db.session.commit()
+        analytics_service.invalidate_dashboard(bot.user_id)
 
         return {'status': 'success', 'message': f'Bot {bot.bot_name} stopped successfully'}
     except Exception as e:
@@ -85,20 +89,39 @@ def collect_bot_metrics(self, bot_id):
                 msg_type = update.message.content_type
                 metrics['message_types'][msg_type] = metrics['message_types'].get(msg_type, 0) + 1
 
-        # Save metrics
-        analytics = Analytics(
-            bot_id=bot_id,
-            metric_type='hourly_stats',
-            metric_value=metrics,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(analytics)
-        db.session.commit()
+        # Queue metrics; dashboards are invalidated once the batch is written.
+        # users and messages rows feed the dashboard and its in-memory rings.
+        now = datetime.utcnow()
+        for metric_type, metric_value in (
+            ('hourly_stats', metrics),
+            ('users', {'count': metrics['unique_users']}),
+            ('messages', {
+                'count': sum(metrics['message_types'].values()),
+                'failed': 0,
+                'types': metrics['message_types']
+            })
+        ):
+            ingest_service.add('analytics', {
+                'bot_id': bot_id,
+                'metric_type': metric_type,
+                'metric_value': metric_value,
+                'timestamp': now
+            })
 
         # Schedule next collection in 1 hour if bot is still running
         if bot.status == 'running':
             collect_bot_metrics.apply_async(args=[bot_id], countdown=3600)
 
+        # Chat ids, like the messages cohorts are backfilled from
+        try:
+            cohort_service.record_activity(
+                bot_id,
+                {update.message.chat_id for update in updates if update.message}
+            )
+        except Exception as e:
+            # Metrics are queued and the next run scheduled either way
+            logger.warning(f'Skipping cohort activity for bot {bot_id}: {str(e)}')
+
     except Exception as e:
         logger.error(f'Error collecting metrics for bot {bot_id}: {str(e)}')
         raise
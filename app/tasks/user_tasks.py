@@ -0,0 +1,15 @@
+from app.tasks import create_celery
+from app.services.activity_tracker_service import activity_tracker_service
+import logging
+
+celery = create_celery()
+logger = logging.getLogger(__name__)
+
+@celery.task
+def flush_activity():
+    """Write tracked last_active and last_used_at timestamps in bulk"""
+    try:
+        return activity_tracker_service.flush()
+    except Exception as e:
+        logger.error(f'Error flushing activity timestamps: {str(e)}')
+        raise
@@ -40,7 +40,10 @@ import { advertisements, bots } from '../services/api';
 function Advertising() {
   const [open, setOpen] = useState(false);
   const [adList, setAdList] = useState([]);
+  const [adCursor, setAdCursor] = useState(null);
   const [botList, setBotList] = useState([]);
+  const [botCursor, setBotCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [formData, setFormData] = useState({
@@ -61,12 +64,14 @@ function Advertising() {
 
   const loadData = async () => {
     try {
-      const [adsData, botsData] = await Promise.all([
-        advertisements.getAll(),
-        bots.getAll(),
+      const [adsPage, botsPage] = await Promise.all([
+        advertisements.getPage(),
+        bots.getPage(),
       ]);
-      setAdList(adsData);
-      setBotList(botsData);
+      setAdList(adsPage.items);
+      setAdCursor(adsPage.next_cursor);
+      setBotList(botsPage.items);
+      setBotCursor(botsPage.next_cursor);
       setError('');
     } catch (err) {
       setError('Failed to load data');
@@ -76,6 +81,31 @@ function Advertising() {
     }
   };
 
+  const loadMoreAds = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await advertisements.getPage(adCursor);
+      setAdList([...adList, ...page.items]);
+      setAdCursor(page.next_cursor);
+    } catch (err) {
+      setError('Failed to load more advertisements');
+      console.error('Error loading advertisements:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMoreBots = async () => {
+    try {
+      const page = await bots.getPage(botCursor);
+      setBotList([...botList, ...page.items]);
+      setBotCursor(page.next_cursor);
+    } catch (err) {
+      setFormError('Failed to load more bots');
+      console.error('Error loading bots:', err);
+    }
+  };
+
   const handleCreateAd = () => {
     setFormData({
       title: '',
@@ -233,6 +263,14 @@ function Advertising() {
           ))}
         </Grid>
 
+        {adCursor && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+            <Button variant="outlined" onClick={loadMoreAds} disabled={loadingMore}>
+              {loadingMore ? <CircularProgress size={24} /> : 'Load More'}
+            </Button>
+          </Box>
+        )}
+
         <Dialog open={open} onClose={() => setOpen(false)} maxWidth="md" fullWidth>
           <DialogTitle>Create New Advertisement</DialogTitle>
           <DialogContent>
@@ -278,6 +316,11 @@ function Advertising() {
                 ))}
               </Select>
               <FormHelperText>Select bots to broadcast this advertisement</FormHelperText>
+              {botCursor && (
+                <Button size="small" onClick={loadMoreBots} sx={{ alignSelf: 'flex-start' }}>
+                  Load More Bots
+                </Button>
+              )}
             </FormControl>
             <TextField
               margin="dense"
@@ -29,6 +29,8 @@ import { bots } from '../services/api';
 function BotManagement() {
   const [open, setOpen] = useState(false);
   const [botList, setBotList] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [formData, setFormData] = useState({
@@ -44,8 +46,9 @@ function BotManagement() {
 
   const loadBots = async () => {
     try {
-      const data = await bots.getAll();
-      setBotList(data);
+      const page = await bots.getPage();
+      setBotList(page.items);
+      setNextCursor(page.next_cursor);
       setError('');
     } catch (err) {
       setError('Failed to load bots');
@@ -55,6 +58,20 @@ function BotManagement() {
     }
   };
 
+  const loadMoreBots = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await bots.getPage(nextCursor);
+      setBotList([...botList, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError('Failed to load more bots');
+      console.error('Error loading bots:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleAddBot = () => {
     setFormData({ botName: '', botToken: '' });
     setFormError('');
@@ -216,6 +233,14 @@ function BotManagement() {
         ))}
       </Grid>
 
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+          <Button variant="outlined" onClick={loadMoreBots} disabled={loadingMore}>
+            {loadingMore ? <CircularProgress size={24} /> : 'Load More'}
+          </Button>
+        </Box>
+      )}
+
       <Dialog open={open} onClose={() => setOpen(false)} maxWidth="sm" fullWidth>
         <DialogTitle>Add New Bot</DialogTitle>
         <DialogContent>
@@ -30,6 +30,12 @@ api.interceptors.response.use(
   }
 );
 
+// Get one page of a list endpoint; pass next_cursor back for the page after it
+const getPage = async (url, key, cursor = null) => {
+  const response = await api.get(url, { params: cursor ? { cursor } : {} });
+  return { items: response.data[key], next_cursor: response.data.next_cursor };
+};
+
 export const auth = {
   login: async (username, password) => {
     const response = await api.post('/auth/login', { username, password });
@@ -53,10 +59,7 @@ export const auth = {
 };
 
 export const bots = {
-  getAll: async () => {
-    const response = await api.get('/bots');
-    return response.data;
-  },
+  getPage: async (cursor = null) => getPage('/bots', 'bots', cursor),
 
   add: async (botToken, botName) => {
     const response = await api.post('/bots', { bot_token: botToken, bot_name: botName });
@@ -90,10 +93,7 @@ export const bots = {
 };
 
 export const advertisements = {
-  getAll: async () => {
-    const response = await api.get('/advertisements');
-    return response.data;
-  },
+  getPage: async (cursor = null) => getPage('/advertisements', 'advertisements', cursor),
 
   create: async (data) => {
     const response = await api.post('/advertisements', data);
@@ -1,6 +1,7 @@
 from __future__ import with_statement
 
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -27,10 +28,19 @@ def get_engine_url():
 config.set_main_option('sqlalchemy.url', get_engine_url())
 target_metadata = current_app.extensions['migrate'].db.metadata
 
+# Monthly and default partitions are created and dropped by PartitionService
+PARTITION_TABLE = re.compile(r'^(analytics|messages)_(y\d{4}m\d{2}|default)$')
+
+def include_name(name, type_, parent_names):
+    if type_ == 'table':
+        return not PARTITION_TABLE.match(name)
+    return True
+
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True
+        url=url, target_metadata=target_metadata, literal_binds=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -51,6 +61,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_name=include_name,
             **current_app.extensions['migrate'].configure_args
         )
 
@@ -0,0 +1,48 @@
+"""Promote broadcast ad_id to an indexed analytics column
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-05 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 50000
+
+def upgrade():
+    op.add_column('analytics', sa.Column('ad_id', sa.Integer(), nullable=True))
+
+    # Backfill in id ranges, committing each batch so no long-running
+    # transaction holds row locks across the whole table
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        min_id, max_id = conn.execute(sa.text(
+            "SELECT min(id), max(id) FROM analytics WHERE metric_type = 'broadcast_metrics'"
+        )).fetchone()
+
+        if min_id is not None:
+            for batch_start in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+                conn.execute(sa.text(
+                    "UPDATE analytics SET ad_id = (metric_value->>'ad_id')::integer "
+                    "WHERE id >= :batch_start AND id < :batch_end "
+                    "AND metric_type = 'broadcast_metrics' AND ad_id IS NULL"
+                ), {'batch_start': batch_start, 'batch_end': batch_start + BACKFILL_BATCH_SIZE})
+
+        op.create_index(
+            'ix_analytics_ad_id',
+            'analytics',
+            ['ad_id'],
+            postgresql_where=sa.text('ad_id IS NOT NULL'),
+            postgresql_concurrently=True
+        )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_analytics_ad_id', table_name='analytics', postgresql_concurrently=True)
+    op.drop_column('analytics', 'ad_id')
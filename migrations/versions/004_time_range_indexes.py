@@ -0,0 +1,43 @@
+"""Time-range indexes for analytics, messages and logs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-02-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, index method)
+INDEXES = [
+    ('ix_analytics_bot_id_timestamp', 'analytics', ['bot_id', 'timestamp'], 'btree'),
+    ('ix_analytics_metric_type_bot_id_timestamp', 'analytics', ['metric_type', 'bot_id', 'timestamp'], 'btree'),
+    ('ix_analytics_timestamp_brin', 'analytics', ['timestamp'], 'brin'),
+    ('ix_messages_bot_id_sent_at', 'messages', ['bot_id', 'sent_at'], 'btree'),
+    ('ix_messages_sent_at_brin', 'messages', ['sent_at'], 'brin'),
+    ('ix_logs_bot_id_timestamp', 'logs', ['bot_id', 'timestamp'], 'btree'),
+    ('ix_logs_timestamp_brin', 'logs', ['timestamp'], 'brin'),
+]
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and builds
+    # without taking a lock that blocks writes
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_using=using,
+                postgresql_concurrently=True
+            )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
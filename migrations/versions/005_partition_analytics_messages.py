@@ -0,0 +1,173 @@
+"""Range-partition analytics and messages by month
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-19 10:00:00.000000
+
+Each table is rebuilt as a partitioned copy next to the live one. A trigger
+records the id of every row written to the live table from then on. Existing
+rows are copied in autocommitted id batches, and the recorded ids are
+re-copied until few are left. A final transaction then blocks writes,
+re-copies the ids recorded since and swaps the tables. Reads keep working for
+the whole migration, and writes are only blocked while that last handful of
+rows is copied and the tables are swapped.
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+COPY_BATCH_SIZE = 50000
+MONTHS_AHEAD = 3
+# Changed rows left for the locked catch-up, and how often to try to get there
+CATCH_UP_ROWS = 1000
+MAX_CATCH_UP_PASSES = 10
+
+# table -> (partition column, [(index name, columns, method, where)])
+TABLES = {
+    'analytics': ('timestamp', [
+        ('ix_analytics_bot_id_timestamp', '(bot_id, "timestamp")', 'btree', None),
+        ('ix_analytics_metric_type_bot_id_timestamp', '(metric_type, bot_id, "timestamp")', 'btree', None),
+        ('ix_analytics_timestamp_brin', '("timestamp")', 'brin', None),
+        ('ix_analytics_ad_id', '(ad_id)', 'btree', 'ad_id IS NOT NULL'),
+    ]),
+    'messages': ('sent_at', [
+        ('ix_messages_bot_id_sent_at', '(bot_id, sent_at)', 'btree', None),
+        ('ix_messages_sent_at_brin', '(sent_at)', 'brin', None),
+    ]),
+}
+
+def _add_months(month, months):
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return month.replace(year=month.year + years, month=month_index + 1)
+
+def _month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _create_indexes(conn, table, indexes, suffix):
+    for name, columns, using, where in indexes:
+        conn.execute(sa.text(
+            f'CREATE INDEX {name}{suffix} ON {table} USING {using} {columns}'
+            + (f' WHERE {where}' if where else '')
+        ))
+
+def _capture_changes(conn, table):
+    """Record the id of every row written to table from now on"""
+    conn.execute(sa.text(f'CREATE UNLOGGED TABLE {table}_changes (id bigint NOT NULL)'))
+    conn.execute(sa.text(f'CREATE TEMPORARY TABLE {table}_drained (id bigint PRIMARY KEY)'))
+    conn.execute(sa.text(f"""
+        CREATE FUNCTION {table}_capture_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                INSERT INTO {table}_changes VALUES (OLD.id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                INSERT INTO {table}_changes VALUES (NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """))
+    # Waits for open writes, so every later write is recorded
+    conn.execute(sa.text(
+        f'CREATE TRIGGER {table}_capture_changes AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {table}_capture_changes()'
+    ))
+
+def _catch_up(conn, table, new_table):
+    """Re-copy the rows recorded since the last catch-up and return how many"""
+    conn.execute(sa.text(f'TRUNCATE {table}_drained'))
+    drained = conn.execute(sa.text(
+        f'WITH changed AS (DELETE FROM {table}_changes RETURNING id) '
+        f'INSERT INTO {table}_drained SELECT DISTINCT id FROM changed'
+    )).rowcount
+    if drained:
+        conn.execute(sa.text(f'ANALYZE {table}_drained'))
+        conn.execute(sa.text(f'DELETE FROM {new_table} WHERE id IN (SELECT id FROM {table}_drained)'))
+        conn.execute(sa.text(
+            f'INSERT INTO {new_table} SELECT * FROM {table} '
+            f'WHERE id IN (SELECT id FROM {table}_drained)'
+        ))
+    return drained
+
+def _copy_and_swap(conn, table, new_table, indexes):
+    """Copy table into new_table in batches and swap the two"""
+    with op.get_context().autocommit_block():
+        _capture_changes(conn, table)
+        min_id, max_id = conn.execute(sa.text(f'SELECT min(id), max(id) FROM {table}')).fetchone()
+        if min_id is not None:
+            for batch_start in range(min_id, max_id + 1, COPY_BATCH_SIZE):
+                conn.execute(sa.text(
+                    f'INSERT INTO {new_table} SELECT * FROM {table} '
+                    f'WHERE id >= :batch_start AND id < :batch_end'
+                ), {'batch_start': batch_start, 'batch_end': batch_start + COPY_BATCH_SIZE})
+        # Rows written during the copy, including ids below max_id committed
+        # late and copied rows updated or deleted since
+        for _ in range(MAX_CATCH_UP_PASSES):
+            if _catch_up(conn, table, new_table) <= CATCH_UP_ROWS:
+                break
+
+    sequence = conn.execute(sa.text(
+        f"SELECT pg_get_serial_sequence('{table}', 'id')"
+    )).scalar()
+
+    conn.execute(sa.text(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE'))
+    _catch_up(conn, table, new_table)
+    conn.execute(sa.text(f'ALTER TABLE {table} RENAME TO {table}_legacy'))
+    conn.execute(sa.text(f'ALTER TABLE {new_table} RENAME TO {table}'))
+    if sequence:
+        conn.execute(sa.text(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id'))
+    conn.execute(sa.text(f'DROP TABLE {table}_legacy'))
+    conn.execute(sa.text(f'DROP FUNCTION {table}_capture_changes()'))
+    conn.execute(sa.text(f'DROP TABLE {table}_changes, {table}_drained'))
+    conn.execute(sa.text(f'ALTER TABLE {table} RENAME CONSTRAINT {new_table}_pkey TO {table}_pkey'))
+    for name, columns, using, where in indexes:
+        conn.execute(sa.text(f'ALTER INDEX {name}_new RENAME TO {name}'))
+
+def upgrade():
+    conn = op.get_bind()
+    now = datetime.utcnow()
+
+    for table, (column, indexes) in TABLES.items():
+        new_table = f'{table}_new'
+        conn.execute(sa.text(
+            f'CREATE TABLE {new_table} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("{column}")'
+        ))
+        # The partition key has to be part of the primary key
+        conn.execute(sa.text(f'ALTER TABLE {new_table} ADD CONSTRAINT {new_table}_pkey PRIMARY KEY (id, "{column}")'))
+        conn.execute(sa.text(f'ALTER TABLE {new_table} ADD FOREIGN KEY (bot_id) REFERENCES bots (id)'))
+        _create_indexes(conn, new_table, indexes, '_new')
+
+        first, last = conn.execute(sa.text(f'SELECT min("{column}"), max("{column}") FROM {table}')).fetchone()
+        month = _month_start(first or now)
+        last_month = _add_months(_month_start(max(last or now, now)), MONTHS_AHEAD)
+        while month <= last_month:
+            next_month = _add_months(month, 1)
+            conn.execute(sa.text(
+                f"CREATE TABLE {table}_y{month:%Y}m{month:%m} PARTITION OF {new_table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            ))
+            month = next_month
+        # Catches rows outside every monthly partition instead of rejecting them
+        conn.execute(sa.text(f'CREATE TABLE {table}_default PARTITION OF {new_table} DEFAULT'))
+
+        _copy_and_swap(conn, table, new_table, indexes)
+
+def downgrade():
+    conn = op.get_bind()
+
+    for table, (column, indexes) in TABLES.items():
+        new_table = f'{table}_new'
+        conn.execute(sa.text(
+            f'CREATE TABLE {new_table} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        conn.execute(sa.text(f'ALTER TABLE {new_table} ADD CONSTRAINT {new_table}_pkey PRIMARY KEY (id)'))
+        conn.execute(sa.text(f'ALTER TABLE {new_table} ADD FOREIGN KEY (bot_id) REFERENCES bots (id)'))
+        _create_indexes(conn, new_table, indexes, '_new')
+
+        _copy_and_swap(conn, table, new_table, indexes)
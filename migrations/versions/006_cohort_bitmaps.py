@@ -0,0 +1,42 @@
+"""Subscriber cohort bitmaps
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-02-26 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'bot_subscribers',
+        sa.Column('bot_id', sa.Integer(), nullable=False),
+        sa.Column('telegram_user_id', sa.BigInteger(), nullable=False),
+        sa.Column('ordinal', sa.Integer(), nullable=False),
+        sa.Column('first_seen_week', sa.Date(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ),
+        sa.PrimaryKeyConstraint('bot_id', 'telegram_user_id'),
+        sa.UniqueConstraint('bot_id', 'ordinal', name='uq_bot_subscribers_bot_id_ordinal')
+    )
+
+    op.create_table(
+        'cohort_bitmaps',
+        sa.Column('bot_id', sa.Integer(), nullable=False),
+        sa.Column('week', sa.Date(), nullable=False),
+        sa.Column('kind', sa.String(20), nullable=False),
+        sa.Column('bitmap', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['bot_id'], ['bots.id'], ),
+        sa.PrimaryKeyConstraint('bot_id', 'week', 'kind')
+    )
+
+def downgrade():
+    op.drop_table('cohort_bitmaps')
+    op.drop_table('bot_subscribers')
@@ -0,0 +1,24 @@
+"""Indexed API key prefix
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-03-04 10:00:00.000000
+
+Keys created before this revision were stored with a slow password hash
+and no prefix; they keep a NULL prefix and can no longer authenticate.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('user_api_keys', sa.Column('prefix', sa.String(16), nullable=True))
+    op.create_index('ix_user_api_keys_prefix', 'user_api_keys', ['prefix'], unique=True)
+
+def downgrade():
+    op.drop_index('ix_user_api_keys_prefix', table_name='user_api_keys')
+    op.drop_column('user_api_keys', 'prefix')
@@ -0,0 +1,33 @@
+"""Index user activities by user and time
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-11 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Built concurrently so audit logging keeps writing during the build;
+    # id breaks timestamp ties for keyset pagination
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_activities_user_id_timestamp_id',
+            'user_activities',
+            ['user_id', 'timestamp', 'id'],
+            postgresql_concurrently=True
+        )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_activities_user_id_timestamp_id',
+            table_name='user_activities',
+            postgresql_concurrently=True
+        )
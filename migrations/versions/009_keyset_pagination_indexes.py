@@ -0,0 +1,30 @@
+"""Indexes matching the keyset pagination sort keys
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-03-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_bots_user_id_id', 'bots', ['user_id', 'id']),
+    ('ix_advertisements_user_id_created_at_id', 'advertisements', ['user_id', 'created_at', 'id']),
+]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
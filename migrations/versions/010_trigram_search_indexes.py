@@ -0,0 +1,41 @@
+"""Trigram indexes for searching usernames, bot names and ad content
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-03-25 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+# (name, table, column)
+INDEXES = [
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_bots_bot_name_trgm', 'bots', 'bot_name'),
+    ('ix_advertisements_content_trgm', 'advertisements', 'content'),
+]
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # GIN trigram indexes answer ILIKE '%term%' and word similarity (%>)
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True
+            )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, column in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,26 @@
+"""updated_at on bots, advertisements and user settings
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-04-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+TABLES = ['bots', 'advertisements', 'user_settings']
+
+def upgrade():
+    for table in TABLES:
+        # A constant default fills existing rows without rewriting the table
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+        op.alter_column(table, 'updated_at', server_default=None)
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,63 @@
+"""Ingest ids so replayed ingest batches are written once
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-04-08 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+# table -> (index name, columns); a partitioned table's unique index has to
+# include its partition key
+INDEXES = {
+    'analytics': ('ix_analytics_ingest_id_timestamp', '(ingest_id, "timestamp")'),
+    'user_activities': ('ix_user_activities_ingest_id', '(ingest_id)'),
+}
+WHERE = 'ingest_id IS NOT NULL'
+
+def _partitions(conn, table):
+    rows = conn.execute(sa.text(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE parent.relname = :table ORDER BY child.relname'
+    ), {'table': table}).all()
+    return [row[0] for row in rows]
+
+def upgrade():
+    conn = op.get_bind()
+    for table in INDEXES:
+        # Nullable without a default, so existing rows are not rewritten
+        op.add_column(table, sa.Column('ingest_id', sa.String(32)))
+
+    # Built concurrently so ingest keeps writing during the build. A
+    # partitioned table cannot build an index concurrently, so each
+    # partition builds its own and they are attached to one on the parent.
+    with op.get_context().autocommit_block():
+        for table, (name, columns) in INDEXES.items():
+            partitions = _partitions(conn, table)
+            if not partitions:
+                conn.execute(sa.text(
+                    f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} {columns} WHERE {WHERE}'
+                ))
+                continue
+            for partition in partitions:
+                conn.execute(sa.text(
+                    f'CREATE UNIQUE INDEX CONCURRENTLY {partition}_ingest_id '
+                    f'ON {partition} {columns} WHERE {WHERE}'
+                ))
+            conn.execute(sa.text(f'CREATE UNIQUE INDEX {name} ON ONLY {table} {columns} WHERE {WHERE}'))
+            for partition in partitions:
+                conn.execute(sa.text(f'ALTER INDEX {name} ATTACH PARTITION {partition}_ingest_id'))
+
+def downgrade():
+    for table, (name, columns) in reversed(list(INDEXES.items())):
+        # Dropping the parent's index drops its partitions' too
+        op.execute(f'DROP INDEX {name}')
+        op.drop_column(table, 'ingest_id')
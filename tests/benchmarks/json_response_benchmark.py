@@ -0,0 +1,102 @@
+"""Benchmark JSON serialization and response compression.
+
+Compares Flask's stdlib JSON provider with the orjson provider on an
+analytics export shaped payload (the stdlib run gets the pre-converted
+isoformat/float values it needs), then the bytes each negotiated encoding
+puts on the wire and what compressing them costs.
+
+Run from the repository root:
+
+    python tests/benchmarks/json_response_benchmark.py [rows]
+"""
+import gzip
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.json_provider import OrjsonProvider, orjson
+from app.compression import brotli
+
+def build_payload(rows):
+    """An export-like payload with native datetime and Decimal values"""
+    start = datetime(2024, 1, 1)
+    return {
+        'bot_id': 1,
+        'messages': [{
+            'id': i,
+            'chat_id': 100000 + i % 5000,
+            'message_type': 'text',
+            'content': f'Message {i} with some typical chat content',
+            'sent_at': start + timedelta(seconds=i),
+            'status': 'sent' if i % 20 else 'failed'
+        } for i in range(rows)],
+        'advertisements': [{
+            'id': i,
+            'content': f'Advertisement {i}',
+            'price': Decimal('19.99') + i,
+            'created_at': start + timedelta(hours=i)
+        } for i in range(rows // 100)]
+    }
+
+def preconvert(payload):
+    """The same payload the way to_dict() hands it to the stdlib provider"""
+    return {
+        'bot_id': payload['bot_id'],
+        'messages': [
+            dict(message, sent_at=message['sent_at'].isoformat())
+            for message in payload['messages']
+        ],
+        'advertisements': [
+            dict(ad, price=float(ad['price']), created_at=ad['created_at'].isoformat())
+            for ad in payload['advertisements']
+        ]
+    }
+
+def best_of(f, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = f()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = Flask(__name__)
+    payload = build_payload(rows)
+
+    print(f'{rows} messages, {rows // 100} advertisements')
+    print(f'{"serializer":<28}{"ms":>10}')
+    stdlib = DefaultJSONProvider(app)
+    converted = preconvert(payload)
+    seconds, body = best_of(lambda: stdlib.dumps(converted).encode())
+    print(f'{"stdlib (pre-converted)":<28}{seconds * 1000:>10.1f}')
+    seconds, _ = best_of(lambda: stdlib.dumps(preconvert(payload)).encode())
+    print(f'{"stdlib (with to_dict work)":<28}{seconds * 1000:>10.1f}')
+    if orjson is None:
+        print(f'{"orjson":<28}{"not installed":>10}')
+    else:
+        fast = OrjsonProvider(app)
+        seconds, body = best_of(lambda: fast.dumps(payload).encode())
+        print(f'{"orjson":<28}{seconds * 1000:>10.1f}')
+
+    print()
+    print(f'{"encoding":<28}{"bytes":>12}{"ms":>10}')
+    print(f'{"identity":<28}{len(body):>12}{0:>10.1f}')
+    seconds, compressed = best_of(lambda: gzip.compress(body, compresslevel=6))
+    print(f'{"gzip (level 6)":<28}{len(compressed):>12}{seconds * 1000:>10.1f}')
+    if brotli is None:
+        print(f'{"br":<28}{"not installed":>12}')
+    else:
+        seconds, compressed = best_of(lambda: brotli.compress(body, quality=4))
+        print(f'{"br (quality 4)":<28}{len(compressed):>12}{seconds * 1000:>10.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,41 @@
 import pytest
-from telegram_bot_ui import app, db
+import jwt
+import datetime
+from app import create_app, db
+from app.models.user import User
 
 @pytest.fixture
-def client():
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    
+def app():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+    })
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
     with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.session.remove()
-            db.drop_all()
+        yield client
+
+@pytest.fixture
+def user(app):
+    user = User(username='testowner', password='testpass')
+    db.session.add(user)
+    db.session.commit()
+    return user
 
 @pytest.fixture
-def auth_headers():
-    return {'x-access-token': 'test-token'}
\ No newline at end of file
+def auth_headers(app, user):
+    token = jwt.encode(
+        {
+            'public_id': user.public_id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        },
+        app.config['SECRET_KEY']
+    )
+    return {'x-access-token': token}
@@ -0,0 +1,89 @@
+"""Recording cohort activity.
+
+Recording takes a Postgres advisory lock and upserts subscribers, so these
+run against PostgreSQL and are skipped unless TEST_DATABASE_URL points at one.
+"""
+import os
+import pytest
+from datetime import datetime
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', '')
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith('postgresql'),
+    reason='TEST_DATABASE_URL must point at a PostgreSQL database'
+)
+
+@pytest.fixture(scope='module')
+def app():
+    from app import create_app, db
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL
+    })
+    with app.app_context():
+        from app.models.user import User
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def bot(app, monkeypatch):
+    from app import db
+    from app.models.bot import Bot
+    from app.models.cohort import BotSubscriber, CohortBitmap
+    from app.models.user import User
+    from app.services.etag_service import etag_service
+
+    monkeypatch.setattr(etag_service, 'bump', lambda *scopes: None)
+    user = User(username='cohorts', password='testpass')
+    # Only the bot is used; scrypt hashes overflow users.password_hash
+    user.password_hash = 'unused'
+    db.session.add(user)
+    db.session.commit()
+    bot = Bot(user_id=user.id, bot_token='1:token', bot_name='cohorts')
+    db.session.add(bot)
+    db.session.commit()
+    yield bot
+    CohortBitmap.query.filter_by(bot_id=bot.id).delete()
+    BotSubscriber.query.filter_by(bot_id=bot.id).delete()
+    db.session.delete(bot)
+    db.session.delete(user)
+    db.session.commit()
+
+def retained(bot, until, weeks=3):
+    from app.services.cohort_service import cohort_service
+
+    retention = cohort_service.get_retention(bot.id, weeks=weeks, until=until)
+    return {cohort['week']: cohort['retained'] for cohort in retention['cohorts']}
+
+def test_recorded_activity_builds_cohorts(app, bot):
+    from app.services.cohort_service import cohort_service
+
+    cohort_service.record_activity(bot.id, [10, 11, 12], at=datetime(2024, 3, 4))
+    cohort_service.record_activity(bot.id, [10, 13], at=datetime(2024, 3, 12))
+    cohort_service.record_activity(bot.id, [11, 13], at=datetime(2024, 3, 20))
+    # Recording the same users again in a week changes nothing
+    cohort_service.record_activity(bot.id, [11, 13], at=datetime(2024, 3, 21))
+
+    assert retained(bot, datetime(2024, 3, 20)) == {
+        '2024-03-04': [3, 1, 1],
+        '2024-03-11': [1, 1],
+        '2024-03-18': [0],
+    }
+
+def test_backfilled_activity_moves_users_to_earlier_cohorts(app, bot):
+    from app.models.cohort import BotSubscriber
+    from app.services.cohort_service import cohort_service
+
+    cohort_service.record_activity(bot.id, [10, 11], at=datetime(2024, 3, 12))
+    cohort_service.record_activity(bot.id, [11], at=datetime(2024, 3, 4))
+
+    assert retained(bot, datetime(2024, 3, 12), weeks=2) == {
+        '2024-03-04': [1, 1],
+        '2024-03-11': [1],
+    }
+    ordinals = sorted(subscriber.ordinal for subscriber in BotSubscriber.query.filter_by(bot_id=bot.id))
+    assert ordinals == [0, 1]
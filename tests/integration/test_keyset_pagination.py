@@ -0,0 +1,78 @@
+"""Keyset pagination over timestamp keys with ties.
+
+Cursor values are cast to the key's column type in SQL, which SQLite cannot
+do for timestamps, so these run against PostgreSQL and are skipped unless
+TEST_DATABASE_URL points at one.
+"""
+import os
+import jwt
+import pytest
+from datetime import datetime, timedelta
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', '')
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith('postgresql'),
+    reason='TEST_DATABASE_URL must point at a PostgreSQL database'
+)
+
+@pytest.fixture(scope='module')
+def app():
+    from app import create_app, db
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL
+    })
+    with app.app_context():
+        from app.models.user import User
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def owner(app):
+    from app import db
+    from app.models.user import User
+    from app.models.advertisement import Advertisement
+
+    user = User(username='pager', password='testpass')
+    # Only token auth is used; scrypt hashes overflow users.password_hash
+    user.password_hash = 'unused'
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    Advertisement.query.filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+    db.session.commit()
+
+def test_advertisement_pages_break_created_at_ties_by_id(app, owner):
+    from app import db
+    from app.models.advertisement import Advertisement
+
+    moment = datetime(2024, 3, 18, 12, 0, 0, 250000)
+    created_at = [moment] * 5 + [moment - timedelta(microseconds=1)] * 3 + [moment] * 2
+    ads = [
+        Advertisement(user_id=owner.id, content=f'ad {i}', price=1, created_at=value)
+        for i, value in enumerate(created_at)
+    ]
+    db.session.add_all(ads)
+    db.session.commit()
+    expected = [ad.id for ad in sorted(ads, key=lambda ad: (ad.created_at, ad.id), reverse=True)]
+
+    token = jwt.encode(
+        {'public_id': owner.public_id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+        app.config['SECRET_KEY']
+    )
+    client = app.test_client()
+    seen, cursor = [], None
+    for _ in range(len(ads)):
+        url = '/api/advertisements?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers={'x-access-token': token}).get_json()
+        seen.extend(ad['id'] for ad in page['advertisements'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == expected
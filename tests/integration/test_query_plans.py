@@ -0,0 +1,101 @@
+"""Query-plan regression tests for the hot analytics queries.
+
+These need a real PostgreSQL database and are skipped unless
+TEST_DATABASE_URL points at one. Sequential scans are disabled for the
+session so the assertions hold on small test tables too; the point is that
+a usable index exists for each query, not what the planner picks on
+production statistics.
+"""
+import os
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', '')
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith('postgresql'),
+    reason='TEST_DATABASE_URL must point at a PostgreSQL database'
+)
+
+@pytest.fixture(scope='module')
+def app():
+    from app import create_app, db
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL
+    })
+    with app.app_context():
+        from app.models.user import User
+        from app.models.bot import Bot
+        from app.models.analytics import Analytics
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def explain(app):
+    from app import db
+
+    def _explain(query):
+        statement = getattr(query, 'statement', query)
+        sql = str(statement.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={'literal_binds': True}
+        ))
+        db.session.execute(text('SET enable_seqscan = off'))
+        rows = db.session.execute(text(f'EXPLAIN {sql}')).all()
+        db.session.execute(text('RESET enable_seqscan'))
+        return '\n'.join(row[0] for row in rows)
+
+    return _explain
+
+def test_bot_metrics_range_uses_bot_timestamp_index(explain):
+    from app.models.analytics import Analytics
+
+    since = datetime(2024, 1, 1)
+    plan = explain(Analytics.query.filter(
+        Analytics.bot_id == 1,
+        Analytics.timestamp.between(since, since + timedelta(days=30))
+    ).order_by(Analytics.timestamp.desc()))
+
+    assert 'ix_analytics_bot_id_timestamp' in plan
+
+def test_latest_bot_metrics_uses_bot_timestamp_index(explain):
+    from app.models.analytics import Analytics
+
+    plan = explain(Analytics.query.filter_by(bot_id=1)
+                   .order_by(Analytics.timestamp.desc()).limit(100))
+
+    assert 'ix_analytics_bot_id_timestamp' in plan
+
+def test_dashboard_query_uses_metric_type_index(explain):
+    from app.services.analytics_service import analytics_service
+
+    plan = explain(analytics_service._dashboard_query([1, 2, 3], datetime(2024, 1, 1)))
+
+    assert 'ix_analytics_metric_type_bot_id_timestamp' in plan
+
+def test_broadcast_metrics_use_ad_id_index(explain):
+    from app.models.analytics import Analytics
+
+    plan = explain(Analytics.query.filter(
+        Analytics.metric_type == 'broadcast_metrics',
+        Analytics.ad_id == 42
+    ))
+
+    assert 'ix_analytics_ad_id' in plan
+
+def test_message_export_uses_bot_sent_at_index(explain):
+    from app.models.message import Message
+
+    since = datetime(2024, 1, 1)
+    plan = explain(Message.query.filter(
+        Message.bot_id == 1,
+        Message.sent_at.between(since, since + timedelta(days=30))
+    ))
+
+    assert 'ix_messages_bot_id_sent_at' in plan
@@ -0,0 +1,94 @@
+"""Trigram search ranking.
+
+word_similarity and the %> operator come from pg_trgm, so these run against
+PostgreSQL and are skipped unless TEST_DATABASE_URL points at one with the
+extension available.
+"""
+import os
+import pytest
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', '')
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith('postgresql'),
+    reason='TEST_DATABASE_URL must point at a PostgreSQL database'
+)
+
+@pytest.fixture(scope='module')
+def app():
+    from sqlalchemy import exc
+    from app import create_app, db
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL
+    })
+    with app.app_context():
+        from app.models.user import User
+        try:
+            db.session.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            db.session.commit()
+        except exc.DBAPIError:
+            db.session.rollback()
+            pytest.skip('pg_trgm is not available')
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def owners(app):
+    from app import db
+    from app.models.bot import Bot
+    from app.models.user import User
+
+    users = []
+    for username in ('searcher', 'stranger'):
+        user = User(username=username, password='testpass')
+        # Only the bots are searched; scrypt hashes overflow users.password_hash
+        user.password_hash = 'unused'
+        db.session.add(user)
+        users.append(user)
+    db.session.commit()
+    yield users
+    Bot.query.filter(Bot.user_id.in_([user.id for user in users])).delete()
+    for user in users:
+        db.session.delete(user)
+    db.session.commit()
+
+def add_bots(owner, names):
+    from app import db
+    from app.models.bot import Bot
+
+    for i, name in enumerate(names):
+        db.session.add(Bot(user_id=owner.id, bot_token=f'{owner.id}:{i}', bot_name=name))
+    db.session.commit()
+
+def search(owner, term, **kwargs):
+    from app.services.search_service import search_service
+    return search_service.search('bots', term, owner_id=owner.id, **kwargs)
+
+def test_closer_matches_rank_first(app, owners):
+    owner, stranger = owners
+    add_bots(owner, ['xweatherx', 'news', 'The weathervane', 'Weather'])
+    add_bots(stranger, ['Weather'])
+
+    items = search(owner, 'weather')['items']
+    assert [bot.bot_name for bot in items] == ['Weather', 'The weathervane', 'xweatherx']
+    assert items[0].search_rank == 1.0
+    assert items[0].search_rank > items[1].search_rank > items[2].search_rank
+
+def test_pages_follow_the_ranking(app, owners):
+    owner, _ = owners
+    add_bots(owner, ['weather one', 'weather two', 'weathervane', 'xweatherx', 'news'])
+
+    expected = [bot.id for bot in search(owner, 'weather')['items']]
+    seen, cursor = [], None
+    while True:
+        page = search(owner, 'weather', cursor=cursor, limit=2)
+        seen.extend(bot.id for bot in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == expected
+    assert len(seen) == 4
@@ -0,0 +1,87 @@
+import pytest
+from app.services.analytics_service import analytics_service
+
+def lttb(points, threshold):
+    return analytics_service._lttb(points, threshold, lambda p: p[0], lambda p: p[1])
+
+def make_points(count):
+    return [(i, (i * 7919) % 101) for i in range(count)]
+
+def test_lttb_keeps_short_series():
+    points = make_points(10)
+    assert lttb(points, 10) == points
+    assert lttb(points, 50) == points
+    assert lttb([], 3) == []
+
+@pytest.mark.parametrize('threshold', [
+    analytics_service.MIN_POINTS,
+    10,
+    analytics_service.DEFAULT_MAX_POINTS
+])
+def test_lttb_returns_threshold_points(threshold):
+    points = make_points(2000)
+    sampled = lttb(points, threshold)
+    assert len(sampled) == threshold
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+
+def test_lttb_picks_points_in_order():
+    points = make_points(1000)
+    sampled = lttb(points, 50)
+    xs = [point[0] for point in sampled]
+    assert xs == sorted(set(xs))
+    assert set(sampled) <= set(points)
+
+def test_lttb_keeps_peaks():
+    points = [(i, 0) for i in range(1000)]
+    points[417] = (417, 1000)
+    points[803] = (803, -1000)
+    sampled = lttb(points, 20)
+    assert (417, 1000) in sampled
+    assert (803, -1000) in sampled
+
+@pytest.mark.parametrize('max_points', [
+    None,
+    analytics_service.MIN_POINTS,
+    analytics_service.MAX_POINTS_LIMIT
+])
+def test_max_points_within_bounds(max_points):
+    analytics_service._validate_max_points(max_points)
+
+@pytest.mark.parametrize('max_points', [
+    0,
+    analytics_service.MIN_POINTS - 1,
+    analytics_service.MAX_POINTS_LIMIT + 1
+])
+def test_max_points_out_of_bounds(max_points):
+    with pytest.raises(ValueError):
+        analytics_service._validate_max_points(max_points)
+
+def hourly(hours):
+    return {
+        f'2024-03-01 {hour:02d}:00': {
+            'total_updates': 10,
+            'unique_users': users,
+            'message_types': {'text': 10}
+        }
+        for hour, users in hours.items()
+    }
+
+def test_hourly_activity_is_bucketed_to_max_points():
+    activity = hourly({hour: 3 for hour in range(12)})
+    buckets, width = analytics_service._bucket_hourly_activity(activity, 4)
+    assert width == 3
+    assert list(buckets) == ['2024-03-01 00:00', '2024-03-01 03:00', '2024-03-01 06:00', '2024-03-01 09:00']
+    assert buckets['2024-03-01 03:00']['total_updates'] == 30
+    assert buckets['2024-03-01 03:00']['message_types'] == {'text': 30}
+
+def test_unique_users_are_not_summed_across_hours():
+    activity = hourly({0: 3, 1: 7, 2: 5, 3: 1})
+    buckets, width = analytics_service._bucket_hourly_activity(activity, 3)
+    assert width == 2
+    assert buckets['2024-03-01 00:00']['unique_users'] == 7
+    assert buckets['2024-03-01 02:00']['unique_users'] == 5
+
+def test_short_activity_is_left_hourly():
+    activity = hourly({0: 3, 1: 7})
+    assert analytics_service._bucket_hourly_activity(activity, 5) == (activity, 1)
@@ -0,0 +1,62 @@
+import datetime
+import pytest
+from app import db
+from app.models.user import UserApiKey
+
+@pytest.mark.parametrize('key, parsed', [
+    ('tbk_abc123_s3cr3t', ('abc123', 's3cr3t')),
+    ('tbk_abc123_s3cr3t_with_underscores', ('abc123', 's3cr3t_with_underscores')),
+    ('tbk_abc123_', None),
+    ('tbk__s3cr3t', None),
+    ('tbk_abc123', None),
+    ('abc123_s3cr3t', None),
+    ('TBK_abc123_s3cr3t', None),
+    ('', None),
+    (None, None),
+])
+def test_parse(key, parsed):
+    assert UserApiKey.parse(key) == parsed
+
+def test_hash_secret(app):
+    digest = UserApiKey.hash_secret('s3cr3t')
+    assert digest == UserApiKey.hash_secret('s3cr3t')
+    assert digest != UserApiKey.hash_secret('s3cr3u')
+    assert 's3cr3t' not in digest
+    assert len(digest) == 64
+
+def test_hash_secret_is_keyed(app):
+    digest = UserApiKey.hash_secret('s3cr3t')
+    app.config['API_KEY_SECRET'] = 'another-secret'
+    assert UserApiKey.hash_secret('s3cr3t') != digest
+
+def test_created_key_authenticates(client, user):
+    key = user.create_api_key('ci')['key']
+    prefix, secret = UserApiKey.parse(key)
+    stored = UserApiKey.query.filter_by(prefix=prefix).one()
+    assert stored.key_hash == UserApiKey.hash_secret(secret)
+    assert secret not in stored.key_hash
+
+    response = client.get('/api/auth/me', headers={'x-api-key': key})
+    assert response.status_code == 200
+    assert response.get_json()['username'] == user.username
+
+def test_expired_key_is_rejected(client, user):
+    key = user.create_api_key('ci', expires_in=30)['key']
+    prefix, _ = UserApiKey.parse(key)
+    UserApiKey.query.filter_by(prefix=prefix).update({
+        'expires_at': datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
+    })
+    db.session.commit()
+
+    response = client.get('/api/auth/me', headers={'x-api-key': key})
+    assert response.status_code == 401
+
+def test_wrong_secret_is_rejected(client, user):
+    prefix, secret = UserApiKey.parse(user.create_api_key('ci')['key'])
+    response = client.get('/api/auth/me', headers={'x-api-key': f'tbk_{prefix}_{secret}x'})
+    assert response.status_code == 401
+
+@pytest.mark.parametrize('key', ['not-a-key', 'tbk_', 'tbk_missingsecret', 'tbk_unknown_prefix'])
+def test_malformed_or_unknown_key_is_rejected(client, user, key):
+    response = client.get('/api/auth/me', headers={'x-api-key': key})
+    assert response.status_code == 401
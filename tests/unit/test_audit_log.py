@@ -0,0 +1,65 @@
+import pytest
+from app.models.user import UserActivity
+from app.services.audit_log_service import AuditLogService
+from app.services.ingest_service import ingest_service
+
+@pytest.fixture
+def service(app):
+    service = AuditLogService()
+    service.flush_interval = 0.01
+    yield service
+    service.shutdown()
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Collect the rows sent to the Redis ingest queue"""
+    rows = []
+    monkeypatch.setattr(ingest_service, 'add', lambda table, row: rows.append((table, row)))
+    return rows
+
+def test_logged_activity_is_written(service, user, monkeypatch):
+    monkeypatch.setattr('app.models.user.audit_log_service', service)
+    for i in range(3):
+        user.log_activity('login', details={'attempt': i}, ip_address='10.0.0.1')
+    service.shutdown()
+
+    activities = UserActivity.query.filter_by(user_id=user.id).order_by(UserActivity.id).all()
+    assert [activity.details for activity in activities] == [{'attempt': i} for i in range(3)]
+    assert {activity.ip_address for activity in activities} == {'10.0.0.1'}
+    assert all(activity.action == 'login' and activity.timestamp for activity in activities)
+
+def test_events_are_written_in_batches(service, user, monkeypatch):
+    batches = []
+    monkeypatch.setattr(ingest_service, 'insert_rows', lambda table, rows: batches.append(len(rows)))
+    service.batch_size = 2
+    for i in range(5):
+        service.log({'user_id': user.id, 'action': f'event {i}'})
+    service.shutdown()
+
+    assert sum(batches) == 5
+    assert max(batches) <= 2
+
+def test_events_without_an_app_go_to_redis(queued):
+    service = AuditLogService()
+    service.log({'user_id': 1, 'action': 'login'})
+    assert queued == [('user_activities', {'user_id': 1, 'action': 'login'})]
+
+def test_events_past_a_full_buffer_go_to_redis(app, queued, monkeypatch):
+    service = AuditLogService()
+    monkeypatch.setattr(service, '_ensure_started', lambda: True)
+    service._buffer.maxsize = 1
+    service.log({'user_id': 1, 'action': 'first'})
+    service.log({'user_id': 1, 'action': 'second'})
+
+    assert service._buffer.qsize() == 1
+    assert queued == [('user_activities', {'user_id': 1, 'action': 'second'})]
+
+def test_failed_batches_go_to_redis(service, user, queued, monkeypatch):
+    def fail(table, rows):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(ingest_service, 'insert_rows', fail)
+    service.log({'user_id': user.id, 'action': 'login'})
+    service.shutdown()
+
+    assert queued == [('user_activities', {'user_id': user.id, 'action': 'login'})]
+    assert UserActivity.query.count() == 0
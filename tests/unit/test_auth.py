@@ -1,9 +1,8 @@
 import pytest
 import json
-from telegram_bot_ui import app
 
 def test_register(client):
-    response = client.post('/register',
+    response = client.post('/api/auth/register',
                           data=json.dumps({
                               'username': 'testuser',
                               'password': 'testpass'
@@ -14,7 +13,7 @@ def test_register(client):
 
 def test_login_success(client):
     # First register a user
-    client.post('/register',
+    client.post('/api/auth/register',
                 data=json.dumps({
                     'username': 'testuser',
                     'password': 'testpass'
@@ -22,7 +21,7 @@ def test_login_success(client):
                 content_type='application/json')
     
     # Then try to login
-    response = client.post('/login',
+    response = client.post('/api/auth/login',
                           data=json.dumps({
                               'username': 'testuser',
                               'password': 'testpass'
@@ -32,7 +31,7 @@ def test_login_success(client):
     assert 'token' in json.loads(response.data.decode())
 
 def test_login_invalid_credentials(client):
-    response = client.post('/login',
+    response = client.post('/api/auth/login',
                           data=json.dumps({
                               'username': 'wronguser',
                               'password': 'wrongpass'
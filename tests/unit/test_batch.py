@@ -0,0 +1,80 @@
+import pytest
+from app.api.batch import MAX_BATCH_REQUESTS
+
+def post_batch(client, headers, requests):
+    return client.post('/api/batch', json={'requests': requests}, headers=headers)
+
+def test_batch_requires_auth(client):
+    response = client.post('/api/batch', json={'requests': [{'path': '/bots'}]})
+    assert response.status_code == 401
+
+@pytest.mark.parametrize('payload', [
+    None,
+    [],
+    {'requests': {}},
+    {'requests': []},
+    {'requests': [{'path': '/bots'}] * (MAX_BATCH_REQUESTS + 1)},
+    {'requests': ['/bots']},
+    {'requests': [{'path': 'bots'}]},
+    {'requests': [{'path': '/bots', 'method': 'PATCH'}]},
+    {'requests': [{'path': '/bots', 'headers': ['x']}]},
+])
+def test_invalid_batches_are_rejected(client, auth_headers, payload):
+    response = client.post('/api/batch', json=payload, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_largest_batch_is_accepted(client, auth_headers):
+    response = post_batch(client, auth_headers, [{'path': '/auth/me'}] * MAX_BATCH_REQUESTS)
+    assert response.status_code == 200
+    statuses = [item['status'] for item in response.get_json()['responses']]
+    assert statuses == [200] * MAX_BATCH_REQUESTS
+
+def test_responses_keep_order_and_ids(client, auth_headers, user):
+    response = post_batch(client, auth_headers, [
+        {'path': '/auth/me', 'id': 'me'},
+        {'path': '/bots', 'id': 'bots'},
+        {'path': '/auth/me'}
+    ])
+    assert response.status_code == 200
+    responses = response.get_json()['responses']
+    assert [item.get('id') for item in responses] == ['me', 'bots', None]
+    assert responses[0]['body']['username'] == user.username
+    assert responses[1]['body']['bots'] == []
+
+def test_errors_are_reported_per_request(client, auth_headers):
+    response = post_batch(client, auth_headers, [
+        {'path': '/does-not-exist', 'id': 'missing'},
+        {'path': '/batch', 'method': 'POST', 'id': 'nested'},
+        {'path': '/bots/999999/status', 'id': 'not-found'},
+        {'path': '/bots', 'method': 'POST', 'body': {}, 'id': 'invalid'},
+        {'path': '/bots', 'method': 'DELETE', 'id': 'wrong-method'},
+        {'path': '/auth/me', 'id': 'ok'}
+    ])
+    assert response.status_code == 200
+    statuses = {item['id']: item['status'] for item in response.get_json()['responses']}
+    assert statuses == {
+        'missing': 404,
+        'nested': 404,
+        'not-found': 404,
+        'invalid': 400,
+        'wrong-method': 405,
+        'ok': 200
+    }
+
+def test_reads_after_a_write_see_it(client, auth_headers):
+    response = post_batch(client, auth_headers, [
+        {'path': '/users/me/settings'},
+        {'path': '/users/me/settings', 'method': 'PUT', 'body': {'theme': 'dark'}},
+        {'path': '/users/me/settings'}
+    ])
+    before, update, after = response.get_json()['responses']
+    assert update['status'] == 200
+    assert before['body']['theme'] != 'dark'
+    assert after['body']['theme'] == 'dark'
+
+def test_batch_user_does_not_outlive_the_batch(client, auth_headers):
+    response = post_batch(client, auth_headers, [{'path': '/auth/me'}, {'path': '/bots', 'method': 'POST', 'body': {}}])
+    assert response.status_code == 200
+
+    response = client.get('/api/auth/me')
+    assert response.status_code == 401
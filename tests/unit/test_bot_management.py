@@ -1,9 +1,25 @@
 import pytest
 import json
-from telegram_bot_ui import app
+import subprocess
+from types import SimpleNamespace
+from app.api import bots
+from app.services import bot_manager
 
-def test_add_bot(client, auth_headers):
-    response = client.post('/add_bot',
+@pytest.fixture(autouse=True)
+def supervisor(monkeypatch, tmp_path):
+    """Write supervisor configs to a temp dir and record supervisorctl calls"""
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout='', stderr='')
+
+    monkeypatch.setattr(bots.bot_manager, 'supervisor_conf_dir', str(tmp_path))
+    monkeypatch.setattr(bot_manager, 'subprocess', SimpleNamespace(run=run))
+    return calls
+
+def test_add_bot(client, auth_headers, supervisor, tmp_path):
+    response = client.post('/api/bots',
                           headers=auth_headers,
                           data=json.dumps({
                               'bot_token': '123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11',
@@ -12,48 +28,55 @@ def test_add_bot(client, auth_headers):
                           content_type='application/json')
     assert response.status_code == 201
     data = json.loads(response.data.decode())
-    assert 'bot_id' in data
+    assert 'id' in data['bot']
+    assert (tmp_path / f"bot_{data['bot']['id']}.conf").exists()
+    assert supervisor == [['supervisorctl', 'reread'], ['supervisorctl', 'update']]
 
 def test_bot_status(client, auth_headers):
     # First add a bot
-    response = client.post('/add_bot',
+    response = client.post('/api/bots',
                           headers=auth_headers,
                           data=json.dumps({
                               'bot_token': '123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11',
                               'bot_name': 'TestBot'
                           }),
                           content_type='application/json')
-    bot_id = json.loads(response.data.decode())['bot_id']
+    bot_id = json.loads(response.data.decode())['bot']['id']
     
     # Then check its status
-    response = client.get(f'/bots/{bot_id}/status',
+    response = client.get(f'/api/bots/{bot_id}/status',
                          headers=auth_headers)
     assert response.status_code == 200
     data = json.loads(response.data.decode())
     assert 'status' in data
 
-def test_bot_control(client, auth_headers):
+def test_bot_control(client, auth_headers, supervisor):
     # First add a bot
-    response = client.post('/add_bot',
+    response = client.post('/api/bots',
                           headers=auth_headers,
                           data=json.dumps({
                               'bot_token': '123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11',
                               'bot_name': 'TestBot'
                           }),
                           content_type='application/json')
-    bot_id = json.loads(response.data.decode())['bot_id']
+    bot_id = json.loads(response.data.decode())['bot']['id']
     
     # Test start
-    response = client.post(f'/bots/{bot_id}/start',
+    response = client.post(f'/api/bots/{bot_id}/start',
                           headers=auth_headers)
     assert response.status_code == 200
     
     # Test stop
-    response = client.post(f'/bots/{bot_id}/stop',
+    response = client.post(f'/api/bots/{bot_id}/stop',
                           headers=auth_headers)
     assert response.status_code == 200
     
     # Test restart
-    response = client.post(f'/bots/{bot_id}/restart',
+    response = client.post(f'/api/bots/{bot_id}/restart',
                           headers=auth_headers)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+    assert supervisor[-3:] == [
+        ['supervisorctl', 'start', f'bot_{bot_id}'],
+        ['supervisorctl', 'stop', f'bot_{bot_id}'],
+        ['supervisorctl', 'restart', f'bot_{bot_id}']
+    ]
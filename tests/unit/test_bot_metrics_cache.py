@@ -0,0 +1,134 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.analytics import Analytics
+from app.models.bot import Bot
+from app.services.analytics_service import analytics_service
+from app.services.cache_service import cache_service
+from app.services.etag_service import etag_service
+
+HOUR = timedelta(hours=1)
+
+class FakeCache:
+    """The cache_service calls used by bot metrics, kept in a dict"""
+
+    def __init__(self):
+        self.values = {}
+        self.before_write = None
+
+    def get(self, key):
+        value = self.values.get(key)
+        return json.loads(value) if value is not None else None
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set_many_if_unchanged(self, guard_key, expected, mapping, ttl=None):
+        if self.before_write:
+            self.before_write()
+        if self.get(guard_key) != expected:
+            return False
+        self.values.update((key, json.dumps(value)) for key, value in mapping.items())
+        return True
+
+    def incr(self, keys, ttl=None):
+        for key in keys:
+            self.values[key] = json.dumps((self.get(key) or 0) + 1)
+
+    def delete(self, keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+@pytest.fixture
+def cache(monkeypatch):
+    fake = FakeCache()
+    for name in ('get', 'get_many', 'set_many_if_unchanged', 'incr', 'delete'):
+        monkeypatch.setattr(cache_service, name, getattr(fake, name))
+    monkeypatch.setattr(etag_service, 'bump', lambda *scopes: None)
+    return fake
+
+@pytest.fixture
+def bot(app, user):
+    bot = Bot(user_id=user.id, bot_token='1:token', bot_name='metrics')
+    db.session.add(bot)
+    db.session.commit()
+    return bot
+
+def record(bot, timestamp, count=1):
+    row = Analytics(bot_id=bot.id, metric_type='messages', metric_value={'count': count}, timestamp=timestamp)
+    db.session.add(row)
+    db.session.commit()
+    return {'bot_id': bot.id, 'timestamp': timestamp}
+
+def test_bucket_spans_use_whole_days():
+    start = datetime(2024, 3, 1, 20)
+    spans = analytics_service._bucket_spans(start, datetime(2024, 3, 4, 3))
+    assert spans[:4] == [(start + i * HOUR, HOUR) for i in range(4)]
+    assert spans[4:6] == [(datetime(2024, 3, 2), timedelta(days=1)), (datetime(2024, 3, 3), timedelta(days=1))]
+    assert spans[6:] == [(datetime(2024, 3, 4, hour), HOUR) for hour in range(3)]
+
+def test_bucket_spans_within_a_day():
+    spans = analytics_service._bucket_spans(datetime(2024, 3, 1, 2), datetime(2024, 3, 1, 5))
+    assert spans == [(datetime(2024, 3, 1, hour), HOUR) for hour in range(2, 5)]
+
+def test_year_range_reads_days():
+    spans = analytics_service._bucket_spans(datetime(2023, 3, 1, 12), datetime(2024, 3, 1, 12))
+    assert len(spans) == 365 + 12 + 12
+
+def test_closed_buckets_are_cached_and_reused(cache, bot):
+    end = datetime(2024, 3, 4)
+    record(bot, datetime(2024, 3, 1, 10, 30), count=2)
+    record(bot, datetime(2024, 3, 2, 23, 59), count=3)
+
+    buckets = analytics_service._get_closed_buckets(bot.id, datetime(2024, 3, 1, 6), end)
+    assert sum(bucket['total_messages'] for bucket in buckets) == 5
+    assert f'analytics:bot:{bot.id}:day:20240302' in cache.values
+    assert f'analytics:bot:{bot.id}:hour:2024030110' in cache.values
+
+    Analytics.query.delete()
+    db.session.commit()
+    buckets = analytics_service._get_closed_buckets(bot.id, datetime(2024, 3, 1, 6), end)
+    assert sum(bucket['total_messages'] for bucket in buckets) == 5
+
+def test_late_rows_drop_their_hour_and_day(cache, bot):
+    start, end = datetime(2024, 3, 1), datetime(2024, 3, 3)
+    record(bot, datetime(2024, 3, 1, 5))
+    analytics_service._get_closed_buckets(bot.id, start, end)
+
+    late = record(bot, datetime(2024, 3, 2, 7), count=4)
+    analytics_service._on_analytics_flushed([late])
+
+    assert f'analytics:bot:{bot.id}:day:20240302' not in cache.values
+    assert f'analytics:bot:{bot.id}:day:20240301' in cache.values
+    buckets = analytics_service._get_closed_buckets(bot.id, start, end)
+    assert sum(bucket['total_messages'] for bucket in buckets) == 5
+
+def test_buckets_computed_before_a_late_flush_are_not_cached(cache, bot):
+    start, end = datetime(2024, 3, 1), datetime(2024, 3, 2)
+    record(bot, datetime(2024, 3, 1, 5))
+
+    def late_flush():
+        cache.before_write = None
+        analytics_service._on_analytics_flushed([record(bot, datetime(2024, 3, 1, 6), count=4)])
+    cache.before_write = late_flush
+
+    buckets = analytics_service._get_closed_buckets(bot.id, start, end)
+    assert sum(bucket['total_messages'] for bucket in buckets) == 1
+    assert f'analytics:bot:{bot.id}:day:20240301' not in cache.values
+
+    buckets = analytics_service._get_closed_buckets(bot.id, start, end)
+    assert sum(bucket['total_messages'] for bucket in buckets) == 5
+
+def test_flushing_the_open_hour_keeps_the_generation(cache, bot):
+    analytics_service._on_analytics_flushed([record(bot, datetime.utcnow())])
+    assert cache.get(f'analytics:bot:{bot.id}:buckets:generation') is None
+
+def test_bot_metrics_match_with_and_without_cache(cache, bot):
+    now = datetime.utcnow()
+    for hours_ago in (1, 5, 30, 60, 200):
+        record(bot, now - hours_ago * HOUR, count=hours_ago)
+
+    cold = analytics_service.get_bot_metrics(bot.id, now - timedelta(days=10), now)
+    warm = analytics_service.get_bot_metrics(bot.id, now - timedelta(days=10), now)
+    assert cold['total_messages'] == warm['total_messages'] == 296
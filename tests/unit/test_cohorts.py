@@ -0,0 +1,67 @@
+import pytest
+from datetime import date, datetime, timedelta
+from app import db
+from app.models.bot import Bot
+from app.services.cohort_service import cohort_service
+
+WEEK = timedelta(weeks=1)
+FIRST_WEEK = date(2024, 3, 4)
+
+@pytest.fixture
+def bot(app, user):
+    bot = Bot(user_id=user.id, bot_token='1:token', bot_name='cohorts')
+    db.session.add(bot)
+    db.session.commit()
+    return bot
+
+def seed(bot, weeks):
+    """Store each week's (first seen, active) ordinals as bitmaps"""
+    updates = {}
+    for offset, (first_seen, active) in enumerate(weeks):
+        week = FIRST_WEEK + offset * WEEK
+        updates[(week, cohort_service.FIRST_SEEN)] = (cohort_service._bits(first_seen), 0)
+        updates[(week, cohort_service.ACTIVE)] = (cohort_service._bits(active), 0)
+    cohort_service._update_bitmaps(bot.id, updates)
+    db.session.commit()
+
+def test_week_start_is_monday():
+    assert cohort_service.week_start(datetime(2024, 3, 10, 23, 59)) == FIRST_WEEK
+    assert cohort_service.week_start(FIRST_WEEK) == FIRST_WEEK
+
+def test_bits_set_each_ordinal():
+    assert cohort_service._bits([]) == 0
+    assert cohort_service._bits([0, 3, 9]) == 0b1000001001
+
+def test_retention_intersects_cohorts_with_later_weeks(bot):
+    seed(bot, [
+        ([0, 1, 2], [0, 1, 2]),
+        ([3], [0, 3]),
+        ([], [1, 3, 200]),
+    ])
+
+    retention = cohort_service.get_retention(bot.id, weeks=3, until=datetime(2024, 3, 20))
+    assert retention['cohorts'] == [
+        {'week': '2024-03-04', 'size': 3, 'retained': [3, 1, 1], 'rates': [100.0, 33.33, 33.33]},
+        {'week': '2024-03-11', 'size': 1, 'retained': [1, 1], 'rates': [100.0, 100.0]},
+        {'week': '2024-03-18', 'size': 0, 'retained': [0], 'rates': [0]},
+    ]
+
+def test_retention_window_ends_at_until(bot):
+    seed(bot, [([0, 1], [0, 1]), ([2], [0, 2])])
+
+    retention = cohort_service.get_retention(bot.id, weeks=2, until=datetime(2024, 3, 5))
+    assert [cohort['week'] for cohort in retention['cohorts']] == ['2024-02-26', '2024-03-04']
+    assert retention['cohorts'][1]['retained'] == [2]
+
+def test_bitmaps_can_clear_bits(bot):
+    seed(bot, [([0, 1, 2], [0, 1, 2])])
+    cohort_service._update_bitmaps(bot.id, {(FIRST_WEEK, cohort_service.FIRST_SEEN): (0, cohort_service._bits([1]))})
+    db.session.commit()
+
+    retention = cohort_service.get_retention(bot.id, weeks=1, until=FIRST_WEEK)
+    assert retention['cohorts'][0]['size'] == 2
+
+@pytest.mark.parametrize('weeks', [0, cohort_service.MAX_WEEKS + 1])
+def test_weeks_out_of_range_are_rejected(bot, weeks):
+    with pytest.raises(ValueError):
+        cohort_service.get_retention(bot.id, weeks=weeks)
@@ -0,0 +1,62 @@
+import gzip
+import json
+import pytest
+from types import SimpleNamespace
+from flask import Response, jsonify, stream_with_context
+from app import compression
+
+BODY = {'rows': ['row'] * 1000}
+
+@pytest.fixture
+def client(app):
+    app.add_url_rule('/large', 'large', lambda: jsonify(BODY))
+    app.add_url_rule('/small', 'small', lambda: jsonify({'ok': True}))
+    app.add_url_rule('/missing', 'missing', lambda: (jsonify(BODY), 404))
+    app.add_url_rule('/binary', 'binary', lambda: Response(b'x' * 4096, mimetype='application/octet-stream'))
+    app.add_url_rule('/streamed', 'streamed', lambda: Response(
+        stream_with_context(iter(['x' * 4096])), mimetype='text/csv'
+    ))
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def brotli(monkeypatch):
+    """Stand in for the Brotli module, which is optional"""
+    fake = SimpleNamespace(compress=lambda data, quality: b'br:' + data)
+    monkeypatch.setattr(compression, 'brotli', fake)
+    return fake
+
+def get(client, path, accept_encoding=None):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    return client.get(path, headers=headers)
+
+def test_gzip_is_negotiated(client, monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    response = get(client, '/large', 'br, gzip')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert json.loads(gzip.decompress(response.get_data())) == BODY
+
+def test_brotli_is_preferred(client, brotli):
+    response = get(client, '/large', 'gzip, br')
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.get_data().startswith(b'br:')
+
+def test_client_preference_wins_over_brotli(client, brotli):
+    response = get(client, '/large', 'gzip;q=1.0, br;q=0.5')
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+@pytest.mark.parametrize('path, accept_encoding', [
+    ('/large', None),
+    ('/large', 'identity'),
+    ('/small', 'gzip'),
+    ('/missing', 'gzip'),
+    ('/binary', 'gzip'),
+    ('/streamed', 'gzip'),
+])
+def test_responses_left_uncompressed(client, path, accept_encoding):
+    response = get(client, path, accept_encoding)
+    assert 'Content-Encoding' not in response.headers
+
+def test_small_responses_still_vary(client):
+    assert 'Accept-Encoding' in get(client, '/small', 'gzip').vary
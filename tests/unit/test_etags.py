@@ -0,0 +1,125 @@
+import datetime
+import jwt
+import pytest
+from app import db
+from app.models.bot import Bot
+from app.models.user import User
+from app.services.etag_service import etag_service
+
+def headers_for(app, user):
+    token = jwt.encode(
+        {
+            'public_id': user.public_id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        },
+        app.config['SECRET_KEY']
+    )
+    return {'x-access-token': token}
+
+def add_bot(user, token):
+    bot = Bot(user_id=user.id, bot_token=token, bot_name=f'bot {token}')
+    db.session.add(bot)
+    db.session.commit()
+    return bot
+
+def revalidate(client, path, headers, etag):
+    return client.get(path, headers={**headers, 'If-None-Match': etag})
+
+@pytest.fixture
+def other_user(app):
+    user = User(username='someoneelse', password='testpass')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def redis_versions(monkeypatch):
+    """Serve Redis version tokens from a dict instead of Redis"""
+    versions = {}
+    monkeypatch.setattr(
+        etag_service, 'get_version',
+        lambda *scopes: ':'.join(versions.setdefault(scope, '1') for scope in scopes)
+    )
+    return versions
+
+@pytest.mark.parametrize('path', ['/api/bots', '/api/advertisements', '/api/users/me/settings'])
+def test_matching_etag_gets_304(client, auth_headers, path):
+    response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    response = revalidate(client, path, auth_headers, etag)
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+def test_etag_changes_after_bot_writes(client, auth_headers, user):
+    def get_etag():
+        return client.get('/api/bots', headers=auth_headers).headers['ETag']
+
+    etags = [get_etag()]
+    first = add_bot(user, '1:token')
+    etags.append(get_etag())
+    second = add_bot(user, '2:token')
+    etags.append(get_etag())
+    first.update_status('running')
+    etags.append(get_etag())
+    # Deleting a row other than the latest updated one still changes the count
+    db.session.delete(second)
+    db.session.commit()
+    etags.append(get_etag())
+
+    assert len(set(etags)) == len(etags)
+    response = revalidate(client, '/api/bots', auth_headers, etags[-2])
+    assert response.status_code == 200
+
+def test_etag_changes_after_settings_update(client, auth_headers):
+    etag = client.get('/api/users/me/settings', headers=auth_headers).headers['ETag']
+
+    response = client.put('/api/users/me/settings', json={'theme': 'dark'}, headers=auth_headers)
+    assert response.status_code == 200
+
+    response = revalidate(client, '/api/users/me/settings', auth_headers, etag)
+    assert response.status_code == 200
+    assert response.get_json()['theme'] == 'dark'
+    assert response.headers['ETag'] != etag
+
+def test_etags_differ_between_users(app, client, auth_headers, other_user):
+    etag = client.get('/api/bots', headers=auth_headers).headers['ETag']
+    other_headers = headers_for(app, other_user)
+
+    response = revalidate(client, '/api/bots', other_headers, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_bot_metrics_etag(client, auth_headers, user, redis_versions):
+    path = f"/api/analytics/bots/{add_bot(user, '1:token').id}?end_date=2024-01-01T00:00:00"
+    response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    assert revalidate(client, path, auth_headers, etag).status_code == 304
+
+    redis_versions['analytics:bot:1'] = '2'
+    assert revalidate(client, path, auth_headers, etag).status_code == 200
+
+@pytest.mark.parametrize('path', [
+    '/api/analytics/bots/{id}',
+    '/api/analytics/bots/{id}/retention'
+])
+def test_other_users_bot_is_not_found_before_etag(app, client, auth_headers, user, other_user, redis_versions, path):
+    bot = add_bot(other_user, '2:token')
+    path = path.format(id=bot.id)
+    owner_etag = client.get(path, headers=headers_for(app, other_user)).headers.get('ETag')
+    assert owner_etag is not None
+
+    response = revalidate(client, path, auth_headers, owner_etag)
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+def test_unknown_bot_has_no_version(app, user, redis_versions):
+    from app.services.analytics_service import analytics_service
+    assert analytics_service.get_bot_metrics_version(999, user.id) is None
+    assert redis_versions == {}
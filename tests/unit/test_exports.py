@@ -0,0 +1,85 @@
+import os
+import time
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from app import db
+from app.models.bot import Bot
+from app.services.analytics_service import analytics_service
+from app.services.cache_service import cache_service
+from app.services.media_service import media_service
+from app.tasks import analytics_tasks
+from app.tasks.analytics_tasks import (
+    EXPORT_JOB_TTL, delete_expired_exports, export_bot_analytics, get_export_status, submit_export
+)
+
+@pytest.fixture
+def jobs(app, tmp_path, monkeypatch):
+    """Keep job records in a dict and exports under tmp_path, and run
+    submitted jobs only when the test says so"""
+    records = {}
+    monkeypatch.setattr(cache_service, 'get', records.get)
+    monkeypatch.setattr(cache_service, 'set', lambda key, value, ttl=None: records.__setitem__(key, value))
+    monkeypatch.setattr(media_service, '_upload_folder', str(tmp_path))
+
+    submitted = []
+    monkeypatch.setattr(export_bot_analytics, 'apply_async', lambda args, task_id: submitted.append((args, task_id)))
+    monkeypatch.setattr(export_bot_analytics, 'update_state', lambda **kwargs: None)
+    # The Celery result has expired by the time the job is looked at
+    monkeypatch.setattr(export_bot_analytics, 'AsyncResult', lambda job_id: SimpleNamespace(state='PENDING'))
+    return submitted
+
+@pytest.fixture
+def bot(app, user):
+    bot = Bot(user_id=user.id, bot_token='1:token', bot_name='exported')
+    db.session.add(bot)
+    db.session.commit()
+    return bot
+
+def run(submitted):
+    args, task_id = submitted.pop()
+    export_bot_analytics.apply(args, task_id=task_id)
+    return task_id
+
+RANGE = (datetime(2024, 3, 1), datetime(2024, 3, 2))
+
+def test_finished_job_is_reported_after_its_result_expires(jobs, user, bot):
+    job_id = submit_export(user.id, bot.id, 'csv', *RANGE)
+    assert get_export_status(user.id, job_id)['status'] == 'pending'
+    run(jobs)
+
+    status = get_export_status(user.id, job_id)
+    assert status['status'] == 'success'
+    assert status['download_url'] == f'/api/analytics/exports/{job_id}/file'
+    assert os.path.exists(media_service.get_export_path(f'exports/bot_{bot.id}_analytics_{job_id}.csv'))
+    assert submit_export(user.id, bot.id, 'csv', *RANGE) == job_id
+
+def test_failed_job_is_reported_after_its_result_expires(jobs, user, bot, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(analytics_service, 'count_export_messages', fail)
+
+    job_id = submit_export(user.id, bot.id, 'csv', *RANGE)
+    run(jobs)
+    assert get_export_status(user.id, job_id)['status'] == 'failure'
+
+    # A failed job is started over rather than reused
+    assert submit_export(user.id, bot.id, 'csv', *RANGE) != job_id
+
+def test_expired_exports_are_deleted(jobs, user, bot):
+    job_id = submit_export(user.id, bot.id, 'csv', *RANGE)
+    run(jobs)
+    expired = media_service.get_export_path(f'exports/bot_{bot.id}_analytics_{job_id}.csv')
+    written = time.time() - EXPORT_JOB_TTL - 60
+    os.utime(expired, (written, written))
+
+    fresh_id = submit_export(user.id, bot.id, 'json', *RANGE)
+    run(jobs)
+
+    assert delete_expired_exports() == {'deleted': [f'exports/bot_{bot.id}_analytics_{job_id}.csv']}
+    assert not os.path.exists(expired)
+    assert os.path.exists(media_service.get_export_path(f'exports/bot_{bot.id}_analytics_{fresh_id}.json'))
+
+def test_cleanup_is_scheduled():
+    schedule = analytics_tasks.celery.conf.beat_schedule
+    assert schedule['delete_expired_exports']['task'] == delete_expired_exports.name
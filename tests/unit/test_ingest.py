@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime
+from app import db
+from app.models.analytics import Analytics
+from app.models.bot import Bot
+from app.services.ingest_service import ingest_service
+
+@pytest.fixture
+def bot(app, user):
+    bot = Bot(user_id=user.id, bot_token='1:token', bot_name='ingest')
+    db.session.add(bot)
+    db.session.commit()
+    return bot
+
+@pytest.fixture
+def flushed(monkeypatch):
+    """Collect the rows handed to analytics flush listeners"""
+    batches = []
+    # Transaction ids and the written channel need Postgres and Redis
+    monkeypatch.setattr(ingest_service, '_current_xid', lambda conn, table: None)
+    monkeypatch.setattr(ingest_service, '_publish', lambda table, xid, rows: None)
+    monkeypatch.setattr(ingest_service, '_listeners', {'analytics': [batches.append]})
+    return batches
+
+def rows(bot, *ingest_ids):
+    return [
+        {
+            'bot_id': bot.id,
+            'metric_type': 'messages',
+            'metric_value': {'count': 1},
+            'timestamp': datetime(2024, 3, 1, 10, minute).isoformat(),
+            'ingest_id': ingest_id
+        }
+        for minute, ingest_id in enumerate(ingest_ids)
+    ]
+
+def test_replayed_batch_is_written_once(bot, flushed):
+    assert ingest_service.insert_rows('analytics', rows(bot, 'a', 'b')) == 2
+    assert ingest_service.insert_rows('analytics', rows(bot, 'a', 'b', 'c')) == 1
+
+    assert Analytics.query.count() == 3
+    assert [[row['ingest_id'] for row in batch] for batch in flushed] == [['a', 'b'], ['c']]
+
+def test_rows_without_an_ingest_id_get_one(bot, flushed):
+    batch = rows(bot, None, None)
+    for row in batch:
+        del row['ingest_id']
+
+    assert ingest_service.insert_rows('analytics', batch) == 2
+    ingest_ids = {row.ingest_id for row in Analytics.query.all()}
+    assert len(ingest_ids) == 2 and None not in ingest_ids
+
+def test_retry_after_a_partial_batch_skips_committed_rows(bot, flushed, monkeypatch):
+    batch = rows(bot, 'a', 'b', 'c')
+    batch[1]['metric_type'] = None
+
+    # The bad row fails the batch, then stands in for a missing partition
+    # once the first row has been committed on its own
+    checks = []
+    def check_partition(table, error):
+        checks.append(error)
+        if len(checks) == 2:
+            raise error
+    monkeypatch.setattr(ingest_service, '_check_partition', check_partition)
+    with pytest.raises(Exception):
+        ingest_service.insert_rows('analytics', [dict(row) for row in batch])
+    assert Analytics.query.count() == 1
+
+    monkeypatch.setattr(ingest_service, '_check_partition', lambda table, error: None)
+    assert ingest_service.insert_rows('analytics', batch) == 1
+    assert sorted(row.ingest_id for row in Analytics.query.all()) == ['a', 'c']
+    assert [[row['ingest_id'] for row in batch] for batch in flushed] == [['c']]
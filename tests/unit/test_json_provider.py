@@ -0,0 +1,52 @@
+import json
+import uuid
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from flask import jsonify
+
+pytest.importorskip('orjson')
+numpy = pytest.importorskip('numpy')
+
+from app.json_provider import OrjsonProvider
+
+def test_app_uses_orjson(app):
+    assert isinstance(app.json, OrjsonProvider)
+
+def test_values_match_the_stdlib_provider(app):
+    value = {
+        'created_at': datetime(2024, 3, 1, 10, 30, 15),
+        'day': date(2024, 3, 1),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'price': Decimal('9.50'),
+        'counts': numpy.array([1, 2, 3]),
+        'total': numpy.int64(6),
+        1: 'non-string key'
+    }
+    assert json.loads(app.json.dumps(value)) == {
+        'created_at': '2024-03-01T10:30:15',
+        'day': '2024-03-01',
+        'id': '12345678-1234-5678-1234-567812345678',
+        'price': 9.5,
+        'counts': [1, 2, 3],
+        'total': 6,
+        '1': 'non-string key'
+    }
+
+def test_unserializable_values_raise(app):
+    with pytest.raises(TypeError):
+        app.json.dumps({'value': object()})
+
+def test_stdlib_options_fall_back(app):
+    assert app.json.dumps({'a': 1}, indent=2) == '{\n  "a": 1\n}'
+    assert app.json.loads('{"a": 1.5}', parse_float=Decimal) == {'a': Decimal('1.5')}
+
+def test_round_trip(app):
+    assert app.json.loads(app.json.dumps({'a': [1, 'b', None]})) == {'a': [1, 'b', None]}
+    assert app.json.loads(b'{"a": 1}') == {'a': 1}
+
+def test_responses_are_serialized_with_orjson(app):
+    with app.test_request_context():
+        response = jsonify({'when': datetime(2024, 3, 1)}, 2)
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'[{"when":"2024-03-01T00:00:00"},2]'
@@ -0,0 +1,65 @@
+import json
+import pytest
+from app.services.latency_histogram import LatencyHistogram
+
+def build(latencies):
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.record(latency)
+    return histogram
+
+def exact_percentile(latencies, percentile):
+    ordered = sorted(latencies)
+    rank = max(1, -(-percentile * len(ordered) // 100))
+    return ordered[rank - 1]
+
+def test_empty_histogram():
+    summary = LatencyHistogram().summary()
+    assert summary['count'] == 0
+    assert summary['mean_ms'] is None
+    assert summary['p50_ms'] is None
+    assert summary['p99_ms'] is None
+
+@pytest.mark.parametrize('percentile', [1, 50, 90, 99, 100])
+def test_percentiles_within_bucket_error(percentile):
+    latencies = [0.5 + (i * 37 % 1000) * 1.7 for i in range(1000)]
+    histogram = build(latencies)
+    exact = exact_percentile(latencies, percentile)
+    estimate = histogram.percentile(percentile)
+    assert abs(estimate - exact) <= exact * (LatencyHistogram.GROWTH - 1) + 0.01
+
+def test_percentiles_stay_within_observed_range():
+    histogram = build([120.0] * 10)
+    assert histogram.percentile(50) == 120.0
+    assert histogram.percentile(99) == 120.0
+
+    histogram = build([0.2, 0.3, 0.4])
+    assert histogram.min_ms <= histogram.percentile(50) <= histogram.max_ms
+
+def test_summary_counts_and_extremes():
+    summary = build([10, 20, 30, 40]).summary()
+    assert summary['count'] == 4
+    assert summary['mean_ms'] == 25
+    assert summary['min_ms'] == 10
+    assert summary['max_ms'] == 40
+    assert summary['p50_ms'] <= summary['p90_ms'] <= summary['p99_ms']
+
+def test_merge_matches_single_histogram():
+    first = [i * 1.3 for i in range(1, 500)]
+    second = [i * 11.0 for i in range(1, 200)]
+    merged = build(first).merge(build(second))
+    combined = build(first + second)
+    assert merged.summary() == combined.summary()
+
+def test_merge_into_empty():
+    merged = LatencyHistogram().merge(build([5, 7]))
+    assert merged.count == 2
+    assert merged.min_ms == 5
+    assert merged.max_ms == 7
+
+def test_dict_round_trip():
+    histogram = build([1.5, 42, 42, 900])
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+    assert restored.counts == histogram.counts
+    assert restored.summary() == histogram.summary()
+    assert LatencyHistogram.from_dict(None).count == 0
@@ -0,0 +1,86 @@
+import datetime
+from types import SimpleNamespace
+import pytest
+from app import db
+from app.models.advertisement import Advertisement
+from app.models.bot import Bot
+from app.services.pagination_service import pagination_service
+
+KEYS = (Advertisement.created_at, Advertisement.id)
+
+def test_cursor_round_trip():
+    row = SimpleNamespace(created_at=datetime.datetime(2024, 3, 18, 10, 30, 15, 123456), id=42)
+    cursor = pagination_service.encode_cursor(row, KEYS)
+    assert pagination_service.decode_cursor(cursor, KEYS) == [row.created_at, 42]
+
+def test_cursor_is_url_safe():
+    row = SimpleNamespace(created_at=datetime.datetime(2024, 1, 1), id=2 ** 40)
+    cursor = pagination_service.encode_cursor(row, KEYS)
+    assert '=' not in cursor
+    assert '+' not in cursor
+    assert '/' not in cursor
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    'bnVsbA',  # null
+    'WzFd',  # [1]: too few keys
+    'WyJ5ZXN0ZXJkYXkiLCAxXQ',  # ["yesterday", 1]
+    'WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwgImEiXQ',  # ["2024-01-01T00:00:00", "a"]
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        pagination_service.decode_cursor(cursor, KEYS)
+
+@pytest.mark.parametrize('limit', [0, pagination_service.MAX_LIMIT + 1])
+def test_limit_bounds(app, limit):
+    with pytest.raises(ValueError):
+        pagination_service.paginate(Advertisement.query, KEYS, limit=limit)
+
+def create_bots(owner_ids):
+    bots = [
+        Bot(user_id=owner_id, bot_token=f'{i}:token', bot_name=f'bot {i}')
+        for i, owner_id in enumerate(owner_ids)
+    ]
+    db.session.add_all(bots)
+    db.session.commit()
+    return bots
+
+def collect_pages(query, keys, limit, descending):
+    seen, cursor = [], None
+    while True:
+        page = pagination_service.paginate(query, keys, cursor=cursor, limit=limit, descending=descending)
+        seen.extend(item.id for item in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return seen
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_ties_are_broken_by_id(app, descending):
+    bots = create_bots([2, 2, 2, 1, 1, 2, 3, 1, 2, 2])
+    keys = (Bot.user_id, Bot.id)
+
+    seen = collect_pages(Bot.query, keys, limit=3, descending=descending)
+
+    expected = sorted(bots, key=lambda bot: (bot.user_id, bot.id), reverse=descending)
+    assert seen == [bot.id for bot in expected]
+
+def test_last_page_has_no_cursor(app):
+    create_bots([1, 1, 1, 1])
+    page = pagination_service.paginate(Bot.query, (Bot.user_id, Bot.id), limit=4)
+    assert len(page['items']) == 4
+    assert page['next_cursor'] is None
+
+def test_timestamp_ties_are_broken_by_id(app, user):
+    moment = datetime.datetime(2024, 3, 18, 12, 0, 0, 250000)
+    created_at = [moment] * 5 + [moment - datetime.timedelta(microseconds=1)] * 3 + [moment] * 2
+    ads = [
+        Advertisement(user_id=user.id, content=f'ad {i}', price=1, created_at=value)
+        for i, value in enumerate(created_at)
+    ]
+    db.session.add_all(ads)
+    db.session.commit()
+
+    seen = collect_pages(Advertisement.query, KEYS, limit=3, descending=True)
+
+    expected = sorted(ads, key=lambda ad: (ad.created_at, ad.id), reverse=True)
+    assert seen == [ad.id for ad in expected]
@@ -0,0 +1,80 @@
+import datetime
+import json
+import jwt
+import pytest
+from app import db
+from app.models.user import User
+from app.services.cache_service import cache_service
+from app.services.principal_cache_service import principal_cache_service
+
+def headers_for(app, user):
+    token = jwt.encode(
+        {
+            'public_id': user.public_id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        },
+        app.config['SECRET_KEY']
+    )
+    return {'x-access-token': token}
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    """Keep cache_service values in a dict instead of Redis"""
+    values = {}
+    monkeypatch.setattr(cache_service, 'get', lambda key: json.loads(values[key]) if key in values else None)
+    monkeypatch.setattr(cache_service, 'set', lambda key, value, ttl=None: values.__setitem__(key, json.dumps(value)))
+    monkeypatch.setattr(cache_service, 'delete', lambda keys: [values.pop(key, None) for key in keys])
+    monkeypatch.setattr(principal_cache_service, '_local', type(principal_cache_service._local)())
+    return values
+
+@pytest.fixture
+def admin(app):
+    admin = User(username='admin', password='testpass')
+    admin.role = 'admin'
+    db.session.add(admin)
+    db.session.commit()
+    return admin
+
+def cached(user):
+    key = principal_cache_service._cache_key(user.public_id)
+    return principal_cache_service._get_local(key), cache_service.get(key)
+
+def test_user_is_cached_after_first_request(client, user, auth_headers, redis_cache):
+    assert client.get('/api/auth/me', headers=auth_headers).status_code == 200
+    local, shared = cached(user)
+    assert local == shared
+    assert shared['username'] == 'testowner'
+    assert 'password_hash' not in shared
+
+def test_admin_update_invalidates_user(app, client, user, auth_headers, admin, redis_cache):
+    assert client.get('/api/users', headers=auth_headers).status_code == 403
+    assert cached(user)[1]['role'] == 'user'
+
+    response = client.put(f'/api/users/{user.id}', json={'role': 'admin'}, headers=headers_for(app, admin))
+    assert response.status_code == 200
+    assert cached(user) == (None, None)
+
+    # The next request loads the new role instead of the cached one
+    assert client.get('/api/users', headers=auth_headers).status_code == 200
+    assert cached(user)[1]['role'] == 'admin'
+
+def test_admin_delete_invalidates_user(app, client, user, auth_headers, admin, redis_cache):
+    public_id = user.public_id
+    assert client.get('/api/auth/me', headers=auth_headers).status_code == 200
+
+    response = client.delete(f'/api/users/{user.id}', headers=headers_for(app, admin))
+    assert response.status_code == 200
+
+    key = principal_cache_service._cache_key(public_id)
+    assert principal_cache_service._get_local(key) is None
+    assert key not in redis_cache
+    assert principal_cache_service.get_user(public_id) is None
+
+def test_profile_update_invalidates_user(client, user, auth_headers, redis_cache):
+    assert client.get('/api/auth/me', headers=auth_headers).status_code == 200
+
+    response = client.put('/api/users/me', json={'username': 'renamed'}, headers=auth_headers)
+    assert response.status_code == 200
+
+    assert client.get('/api/auth/me', headers=auth_headers).get_json()['username'] == 'renamed'
+    assert cached(user)[1]['username'] == 'renamed'
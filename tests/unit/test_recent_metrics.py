@@ -0,0 +1,108 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from app import db
+from app.models.bot import Bot
+from app.services.recent_metrics_service import RecentMetricsService
+from app.services.ingest_service import ingest_service
+from app.tasks import bot_tasks
+
+@pytest.fixture
+def service():
+    service = RecentMetricsService()
+    service._ready = True
+    return service
+
+def row(bot_id, metric_type, metric_value, minutes_ago=0):
+    timestamp = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    return {
+        'bot_id': bot_id,
+        'metric_type': metric_type,
+        'metric_value': metric_value,
+        'timestamp': timestamp.isoformat()
+    }
+
+def counts(service, bot_ids):
+    service._ensure_ready = lambda: True
+    return sorted(service.get_counts(bot_ids), key=repr)
+
+def test_batches_are_summed_per_bot_and_type(service):
+    service._apply(None, [
+        row(1, 'users', {'count': 3}),
+        row(1, 'messages', {'count': 5, 'failed': 1, 'types': {'text': 4, 'photo': 1}}, minutes_ago=30),
+        row(1, 'messages', {'count': 2, 'types': {'text': 2}}, minutes_ago=600),
+        row(2, 'messages', {'count': 7, 'types': {'text': 7}}),
+        row(1, 'hourly_stats', {'total_updates': 9})
+    ])
+
+    assert counts(service, [1]) == sorted([
+        (1, 'users', None, 3, 0),
+        (1, 'messages', None, 7, 1),
+        (None, 'message_types', 'text', 6, 0),
+        (None, 'message_types', 'photo', 1, 0)
+    ], key=repr)
+    assert (None, 'message_types', 'text', 13, 0) in counts(service, [1, 2])
+
+def test_rows_outside_the_window_are_ignored(service):
+    service._apply(None, [
+        row(1, 'users', {'count': 1}, minutes_ago=service.WINDOW_MINUTES + 1),
+        row(1, 'users', {'count': 2}, minutes_ago=-5)
+    ])
+    assert counts(service, [1]) == []
+
+def test_old_minutes_roll_out_of_the_window(service):
+    service._apply(None, [row(1, 'users', {'count': 4}, minutes_ago=10)])
+    service._advance(service._head + service.WINDOW_MINUTES - 11)
+    assert counts(service, [1]) == [(1, 'users', None, 4, 0)]
+    service._advance(service._head + 2)
+    assert counts(service, [1]) == []
+
+def test_batches_seen_by_the_warm_up_are_skipped(service):
+    service._snapshot = service._parse_snapshot('100:105:102,103')
+    for xid in ('99', '101', '102', '104', '105'):
+        service._apply(xid, [row(1, 'users', {'count': 1})])
+    # 102 was in progress and 105 started after the snapshot
+    assert counts(service, [1]) == [(1, 'users', None, 2, 0)]
+
+def test_callers_fail_fast_while_unsubscribed():
+    service = RecentMetricsService()
+    service.redis_url = 'redis://127.0.0.1:1/0'
+    service.enabled = True
+    service.subscribe_timeout = 0.2
+
+    assert service._ensure_ready() is False
+    started = time.monotonic()
+    for _ in range(5):
+        assert service._ensure_ready() is False
+    assert time.monotonic() - started < 0.1
+
+def test_resubscribing_backs_off():
+    service = RecentMetricsService()
+    delays = [service._retry_delay(failures) for failures in range(1, 10)]
+    assert delays[:4] == [1, 2, 4, 8]
+    assert delays == sorted(delays)
+    assert delays[-1] == service.max_retry_interval
+
+def test_collected_metrics_queue_dashboard_rows(app, user, monkeypatch):
+    bot = Bot(user_id=user.id, bot_token='1:token', bot_name='collector', status='running')
+    db.session.add(bot)
+    db.session.commit()
+
+    def update(user_id, content_type):
+        return SimpleNamespace(message=SimpleNamespace(
+            from_user=SimpleNamespace(id=user_id), chat_id=user_id, content_type=content_type
+        ))
+    updates = [update(1, 'text'), update(1, 'text'), update(2, 'photo'), SimpleNamespace(message=None)]
+    monkeypatch.setattr(bot_tasks.telegram, 'Bot', lambda token: SimpleNamespace(get_updates=lambda timeout: updates))
+    monkeypatch.setattr(bot_tasks.collect_bot_metrics, 'apply_async', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot_tasks.cohort_service, 'record_activity', lambda *args: None)
+    queued = []
+    monkeypatch.setattr(ingest_service, 'add', lambda table, row: queued.append(row))
+
+    bot_tasks.collect_bot_metrics(bot.id)
+
+    by_type = {row['metric_type']: row['metric_value'] for row in queued}
+    assert by_type['users'] == {'count': 2}
+    assert by_type['messages'] == {'count': 3, 'failed': 0, 'types': {'text': 2, 'photo': 1}}
+    assert by_type['hourly_stats']['total_updates'] == 4
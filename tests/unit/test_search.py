@@ -0,0 +1,46 @@
+import datetime
+import jwt
+import pytest
+from app import db
+from app.models.user import User
+from app.services.search_service import search_service
+
+@pytest.fixture
+def admin_headers(app):
+    admin = User(username='admin', password='testpass')
+    admin.role = 'admin'
+    db.session.add(admin)
+    db.session.commit()
+    token = jwt.encode(
+        {
+            'public_id': admin.public_id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        },
+        app.config['SECRET_KEY']
+    )
+    return {'x-access-token': token}
+
+@pytest.mark.parametrize('path, message', [
+    ('/api/search/channels?q=weather', 'Cannot search channels'),
+    ('/api/search/bots?q=we', 'at least 3 characters'),
+    ('/api/search/bots?q=%20%20we%20%20', 'at least 3 characters'),
+])
+def test_bad_searches_are_rejected(client, auth_headers, path, message):
+    response = client.get(path, headers=auth_headers)
+    assert response.status_code == 400
+    assert message in response.get_json()['message']
+
+def test_user_search_is_admin_only(client, auth_headers):
+    assert client.get('/api/search/users?q=testowner', headers=auth_headers).status_code == 403
+
+def test_short_user_search_falls_back_to_ilike(client, user, admin_headers):
+    for username in ('ABbot', 'cabin', 'other'):
+        db.session.add(User(username=username, password='testpass'))
+    db.session.commit()
+
+    response = client.get('/api/users?search=ab', headers=admin_headers)
+    assert response.status_code == 200
+    assert sorted(user['username'] for user in response.get_json()['users']) == ['ABbot', 'cabin']
+
+def test_like_wildcards_in_terms_are_escaped():
+    assert search_service._escape_like('100%_off\\') == '100\\%\\_off\\\\'